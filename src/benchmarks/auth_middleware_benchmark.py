@@ -0,0 +1,108 @@
+"""
+Measures the throughput of a minimal app behind the JWT middleware, on a
+public path and on an authenticated one with the verified token cache on
+and off.
+
+Requests are driven straight through the ASGI interface by concurrent
+tasks, so there is no network or server in the numbers. No database is
+needed.
+
+    python -m benchmarks.auth_middleware_benchmark --requests 20000
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from fastapi import FastAPI
+
+from cache.token_cache import VerifiedTokenCache
+from middleware.auth_middleware import JWTMiddleware
+from service.jwt_service import JWTService
+
+
+def build_app(jwt_service: JWTService, token_cache: VerifiedTokenCache) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"health": "ok"}
+
+    @app.get("/plans")
+    async def plans():
+        return {"data": []}
+
+    app.add_middleware(JWTMiddleware, jwt_service=jwt_service, token_cache=token_cache)
+    return app
+
+
+async def request(app: FastAPI, path: str, headers: list[tuple[bytes, bytes]]) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8081),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def throughput(app: FastAPI, path: str, headers: list[tuple[bytes, bytes]], requests: int, concurrency: int) -> float:
+    # Warm up, fills the token cache when it is enabled
+    for _ in range(100):
+        await request(app, path, headers)
+
+    async def worker(count: int):
+        for _ in range(count):
+            await request(app, path, headers)
+
+    start = perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+
+    return requests / (perf_counter() - start)
+
+
+async def run(requests: int, concurrency: int) -> None:
+    jwt_service = JWTService()
+    token = jwt_service.sign({  # type: ignore
+        "userId": "00000000-0000-0000-0000-000000000000",
+        "username": "benchmark",
+        "email": "benchmark@example.com",
+        "type": "user"
+    })
+    authorization = [(b"authorization", f"Bearer {token}".encode())]
+
+    cached = build_app(jwt_service, VerifiedTokenCache())
+    uncached = build_app(jwt_service, VerifiedTokenCache(max_size=0))
+
+    print(f"{requests} requests, {concurrency} concurrent (req/s)")
+    print(f"{'public':<28}{await throughput(cached, '/health', [], requests, concurrency):>10.0f}")
+    print(f"{'authenticated, cache off':<28}{await throughput(uncached, '/plans', authorization, requests, concurrency):>10.0f}")
+    print(f"{'authenticated, cache on':<28}{await throughput(cached, '/plans', authorization, requests, concurrency):>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Times the NumPy plan nutrition aggregation against a plain Python loop over
+the same rows, for weekly plans whose foods have many ingredients.
+
+No database is needed, rows are generated in memory.
+
+    python -m benchmarks.plan_nutrition_benchmark --ingredients 10 50 200
+"""
+import argparse
+import random
+from collections import namedtuple
+from statistics import median
+from time import perf_counter
+from typing import Callable
+
+from service.nutrition import NUTRIENTS, food_nutrition_matrix, plan_nutrition
+
+IngredientRow = namedtuple(
+    "IngredientRow", ["food_id", "measure_type", "quantity", *NUTRIENTS])
+SlotRow = namedtuple("SlotRow", ["day_id", "meal_moment_id", "id"])
+
+DAYS = list(range(1, 8))
+MOMENTS = list(range(1, 5))
+
+
+def generate(ingredients_per_food: int) -> tuple[list[SlotRow], list[IngredientRow]]:
+    slots = []
+    ingredients = []
+
+    for food_id, (day, moment) in enumerate(((d, m) for d in DAYS for m in MOMENTS), start=1):
+        slots.append(SlotRow(day, moment, food_id))
+        for _ in range(ingredients_per_food):
+            ingredients.append(IngredientRow(
+                food_id,
+                random.choice(["gram", "unit"]),
+                random.uniform(1, 300),
+                *(random.uniform(0, 400) for _ in NUTRIENTS)
+            ))
+
+    return slots, ingredients
+
+
+def python_loop(slots: list[SlotRow], ingredients: list[IngredientRow]) -> list[float]:
+    foods: dict[int, list[float]] = {}
+    for row in ingredients:
+        factor = row.quantity if row.measure_type == "unit" else row.quantity / 100.0
+        totals = foods.setdefault(row.food_id, [0.0] * len(NUTRIENTS))
+        for i, nutrient in enumerate(NUTRIENTS):
+            totals[i] += getattr(row, nutrient) * factor
+
+    week = [0.0] * len(NUTRIENTS)
+    days = {day: [0.0] * len(NUTRIENTS) for day in DAYS}
+    for slot in slots:
+        for i, value in enumerate(foods.get(slot.id, [0.0] * len(NUTRIENTS))):
+            days[slot.day_id][i] += value
+            week[i] += value
+
+    return week
+
+
+def vectorised(slots: list[SlotRow], ingredients: list[IngredientRow]) -> list[float]:
+    return plan_nutrition(slots, food_nutrition_matrix(ingredients), DAYS, MOMENTS).week.tolist()
+
+
+def measure(function: Callable, slots: list[SlotRow], ingredients: list[IngredientRow], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function(slots, ingredients)
+        timings.append((perf_counter() - start) * 1000)
+
+    return median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, nargs="+", default=[5, 20, 100, 500],
+                        help="Ingredients per food")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{len(DAYS) * len(MOMENTS)} slots, median of {args.repeat} runs (ms)")
+    print(f"{'ingredients':<14}{'rows':>8}{'python':>10}{'numpy':>10}")
+
+    for per_food in args.ingredients:
+        slots, ingredients = generate(per_food)
+
+        expected = python_loop(slots, ingredients)
+        assert all(abs(a - b) < 1e-6 * max(1.0, abs(a))
+                   for a, b in zip(expected, vectorised(slots, ingredients)))
+
+        print(f"{per_food:<14}{len(ingredients):>8}"
+              f"{measure(python_loop, slots, ingredients, args.repeat):>10.2f}"
+              f"{measure(vectorised, slots, ingredients, args.repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
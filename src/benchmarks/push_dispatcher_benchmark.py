@@ -0,0 +1,89 @@
+"""
+Measures how long the push dispatcher takes to drain 10k queued
+notifications against a local mock of the Expo push API, served by uvicorn
+with a configurable latency per request.
+
+    python -m benchmarks.push_dispatcher_benchmark --notifications 10000 --latency-ms 50
+"""
+import argparse
+import asyncio
+import socket
+import threading
+from itertools import count
+from time import perf_counter, sleep
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+from utils.push_dispatcher import ExpoPushDispatcher, PushMessage
+
+
+def mock_expo(latency: float) -> FastAPI:
+    app = FastAPI()
+    ids = count()
+
+    @app.post("/--/api/v2/push/send")
+    async def send(request: Request):
+        messages = await request.json()
+        await asyncio.sleep(latency)
+        return {"data": [{"status": "ok", "id": str(next(ids))} for _ in messages]}
+
+    return app
+
+
+def serve(app: FastAPI) -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        sleep(0.01)
+
+    return server, port
+
+
+async def drain(port: int, notifications: int, concurrency: int) -> tuple[float, float]:
+    dispatcher = ExpoPushDispatcher(
+        push_url=f"http://127.0.0.1:{port}/--/api/v2/push/send", concurrency=concurrency)
+    await dispatcher.start()
+
+    start = perf_counter()
+    for i in range(notifications):
+        dispatcher.enqueue(PushMessage(
+            to=f"ExponentPushToken[{i}]", title="Almuerzo", body="Es hora de almorzar"))
+    enqueued = perf_counter() - start
+
+    await dispatcher.join()
+    elapsed = perf_counter() - start
+    stats = dispatcher.stats()
+    await dispatcher.stop()
+
+    assert stats.sent == notifications, stats
+    return enqueued, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=10_000)
+    parser.add_argument("--latency-ms", type=float, default=50.0,
+                        help="Simulated Expo latency per request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    server, port = serve(mock_expo(args.latency_ms / 1000))
+
+    print(f"{args.notifications} notifications, {args.latency_ms:.0f}ms per Expo request")
+    print(f"{'workers':<10}{'enqueue (ms)':>14}{'drain (s)':>12}{'msg/s':>10}")
+    for concurrency in args.concurrency:
+        enqueued, elapsed = asyncio.run(drain(port, args.notifications, concurrency))
+        print(f"{concurrency:<10}{enqueued * 1000:>14.1f}{elapsed:>12.2f}"
+              f"{args.notifications / elapsed:>10.0f}")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from abc import ABCMeta, abstractmethod
+from typing import Iterable, Optional
+
+from cache.lru import LRUCache
+
+try:
+    import redis
+except ImportError:  # Optional, only needed for RESPONSE_CACHE_REDIS_URL
+    redis = None
+
+
+class ICacheBackend(metaclass=ABCMeta):
+    """
+    Cache shared by every worker (L2), values are serialized responses
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        pass
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        pass
+
+
+class InMemoryCacheBackend(ICacheBackend):
+    """
+    Process local stand-in for a shared backend, for tests and single worker
+    deployments
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.cache: LRUCache[bytes] = LRUCache(max_size)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        self.cache.set(key, value, ttl=ttl, tags=tags)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        self.cache.invalidate_tags(tags)
+
+
+class RedisCacheBackend(ICacheBackend):
+    """
+    Redis backend. Each tag is a set with the keys tagged with it, so
+    invalidating a tag deletes exactly those keys in every worker
+    """
+
+    def __init__(self, url: str, prefix: str = "food_service:cache:"):
+        if redis is None:
+            raise RuntimeError(
+                "redis is not installed, install it to use RESPONSE_CACHE_REDIS_URL")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)  # type: ignore
+
+    def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        ttl_ms = max(int(ttl * 1000), 1)
+
+        pipeline = self.client.pipeline()
+        pipeline.set(self.prefix + key, value, px=ttl_ms)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipeline.sadd(tag_key, key)
+            # Every entry shares the ttl, so the set outlives its keys
+            pipeline.pexpire(tag_key, ttl_ms)
+        pipeline.execute()
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            keys = self.client.smembers(tag_key)
+
+            pipeline = self.client.pipeline()
+            for key in keys:  # type: ignore
+                pipeline.delete(self.prefix + key.decode())
+            pipeline.delete(tag_key)
+            pipeline.execute()
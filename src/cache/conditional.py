@@ -0,0 +1,123 @@
+import inspect
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from fastapi import Request, status
+from fastapi.responses import Response
+
+from cache.response_cache import cache_version, serialize
+
+_REQUEST_PARAMETER = "conditional_request"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag, using the weak comparison
+    RFC 9110 asks for on If-None-Match
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _etag(func: Callable, version: str) -> str:
+    return f'"{func.__name__}-{version}"'
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_headers(etag))
+
+
+def _headers(etag: str) -> dict[str, str]:
+    # no-cache lets clients store the response but makes them revalidate it
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _with_etag(result: Any, etag: str) -> Response:
+    if not isinstance(result, Response):
+        result = Response(content=serialize(result), media_type="application/json")
+
+    result.headers.update(_headers(etag))
+    return result
+
+
+def conditional_get(version: Callable[..., Any]):
+    """
+    Answer a GET route with a strong ETag and 304 when If-None-Match matches.
+
+    Goes between @router.get and the handler (above @cached_response). The
+    version lookup runs first, so a 304 never runs the handler nor builds its
+    response.
+
+    Args:
+        version: Called with the handler's parameters, returns the current
+            version of what the route serves (or an awaitable of it), None
+            when it does not exist so the handler raises its usual error
+    """
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+        # FastAPI injects the request through this extra parameter, the
+        # handler keeps its own signature
+        request_parameter = inspect.Parameter(
+            _REQUEST_PARAMETER, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        wrapper_signature = signature.replace(
+            parameters=[*signature.parameters.values(), request_parameter])
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(**kwargs):
+                request: Request = kwargs.pop(_REQUEST_PARAMETER)
+
+                _version = version(**kwargs)
+                if inspect.isawaitable(_version):
+                    _version = await _version
+
+                if _version is None:
+                    return await func(**kwargs)
+
+                etag = _etag(func, _version)
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return _not_modified(etag)
+
+                token = cache_version.set(etag)
+                try:
+                    result = await func(**kwargs)
+                finally:
+                    cache_version.reset(token)
+
+                return _with_etag(result, etag)
+
+            async_wrapper.__signature__ = wrapper_signature  # type: ignore
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(**kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAMETER)
+
+            _version = version(**kwargs)
+            if _version is None:
+                return func(**kwargs)
+
+            etag = _etag(func, _version)
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return _not_modified(etag)
+
+            token = cache_version.set(etag)
+            try:
+                result = func(**kwargs)
+            finally:
+                cache_version.reset(token)
+
+            return _with_etag(result, etag)
+
+        wrapper.__signature__ = wrapper_signature  # type: ignore
+        return wrapper
+
+    return decorator
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Generic, Iterable, NamedTuple, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    size: int
+    max_size: int
+
+
+class _Entry(NamedTuple):
+    value: object
+    expires_at: Optional[float]
+    tags: frozenset[str]
+
+
+class LRUCache(Generic[V]):
+    """
+    Thread safe, size bounded LRU with per entry expiry and tags.
+
+    Entries can be tagged when set and dropped later by tag, so writes can
+    invalidate exactly the entries that depend on what they changed.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._tags: dict[str, set[str]] = dict()
+        self._lock = Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            if entry.expires_at is not None and monotonic() >= entry.expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value  # type: ignore
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        """
+        Args:
+            key: Entry key
+            value: Cached value
+            ttl: Seconds until the entry expires, defaults to the cache ttl.
+                The shorter of both is used
+            tags: Tags to invalidate the entry by
+        """
+        ttls = [t for t in (ttl, self.ttl) if t is not None]
+        expires_at = monotonic() + min(ttls) if ttls else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            entry = _Entry(value, expires_at, frozenset(tags))
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Drop every entry tagged with any of tags
+
+        Returns:
+            int: Number of entries dropped
+        """
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+
+            for key in keys:
+                self._remove(key)
+
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> LRUStats:
+        with self._lock:
+            return LRUStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                invalidations=self._invalidations,
+                size=len(self._entries),
+                max_size=self.max_size
+            )
+
+    def _remove(self, key: str) -> None:
+        # Caller holds the lock
+        entry = self._entries.pop(key)
+
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is None:
+                continue
+
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
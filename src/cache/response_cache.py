@@ -0,0 +1,221 @@
+import inspect
+import json
+import logging
+from contextvars import ContextVar
+from functools import wraps
+from os import getenv
+from typing import Any, Callable, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from cache.backend import ICacheBackend, RedisCacheBackend
+from cache.lru import LRUCache
+from models.health import ResponseCacheStats
+
+# Version of the resource being served, set by conditional_get so a cached
+# response is never served under an ETag of a later version
+cache_version: ContextVar[Optional[str]] = ContextVar("cache_version", default=None)
+
+
+class ResponseCache:
+    """
+    Two tier cache of serialized responses.
+
+    L1 is an in-process LRU, L2 an optional backend shared by every worker.
+    Reads go L1 then L2, writes fill both. Invalidating a tag drops its
+    entries from both tiers; other workers' L1 only keeps them until they
+    expire, so the L1 ttl should stay short.
+    """
+
+    def __init__(self, local: Optional[LRUCache[bytes]] = None, shared: Optional[ICacheBackend] = None, ttl: float = 30.0, shared_ttl: float = 300.0):
+        self.local: LRUCache[bytes] = local or LRUCache(max_size=2048, ttl=ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+
+        self._shared_hits = 0
+        self._shared_misses = 0
+        self._shared_errors = 0
+
+    def get(self, key: str, tags: Iterable[str] = ()) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+
+        try:
+            value = self.shared.get(key)
+        except Exception:
+            # The shared tier is an optimization, never fail a request on it
+            logging.exception("Shared response cache get failed")
+            self._shared_errors += 1
+            return None
+
+        if value is None:
+            self._shared_misses += 1
+            return None
+
+        self._shared_hits += 1
+        self.local.set(key, value, ttl=self.ttl, tags=tags)
+        return value
+
+    def set(self, key: str, value: bytes, tags: Iterable[str] = ()) -> None:
+        tags = list(tags)
+        self.local.set(key, value, ttl=self.ttl, tags=tags)
+
+        if self.shared is None:
+            return
+
+        try:
+            self.shared.set(key, value, self.shared_ttl, tags)
+        except Exception:
+            logging.exception("Shared response cache set failed")
+            self._shared_errors += 1
+
+    def invalidate(self, *tags: str) -> None:
+        self.local.invalidate_tags(tags)
+
+        if self.shared is None:
+            return
+
+        try:
+            self.shared.invalidate_tags(tags)
+        except Exception:
+            logging.exception("Shared response cache invalidation failed")
+            self._shared_errors += 1
+
+    async def invalidate_async(self, *tags: str) -> None:
+        """
+        Same as invalidate for async callers, the shared tier round-trip runs in
+        the threadpool instead of on the event loop
+        """
+        if self.shared is None:
+            self.invalidate(*tags)
+            return
+
+        await run_in_threadpool(self.invalidate, *tags)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> ResponseCacheStats:
+        local = self.local.stats()
+        lookups = local.hits + local.misses
+
+        return ResponseCacheStats(
+            hits=local.hits,
+            misses=local.misses,
+            hit_ratio=local.hits / lookups if lookups else 0.0,
+            evictions=local.evictions,
+            expirations=local.expirations,
+            invalidations=local.invalidations,
+            size=local.size,
+            max_size=local.max_size,
+            shared_enabled=self.shared is not None,
+            shared_hits=self._shared_hits,
+            shared_misses=self._shared_misses,
+            shared_errors=self._shared_errors
+        )
+
+
+def serialize(result: Any) -> bytes:
+    if isinstance(result, BaseModel):
+        return result.model_dump_json().encode()
+
+    return json.dumps(jsonable_encoder(result)).encode()
+
+
+def _cache_key(func: Callable, kwargs: dict) -> str:
+    key = f"{func.__module__}.{func.__name__}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+
+    version = cache_version.get()
+    return key if version is None else f"{key}@{version}"
+
+
+def _response(value: bytes, status: str) -> Response:
+    return Response(content=value, media_type="application/json", headers={"X-Cache": status})
+
+
+def cached_response(tags: Callable[..., Iterable[str]], cache: Optional[ResponseCache] = None):
+    """
+    Cache a GET route's JSON response by route and parameters.
+
+    Goes between @router.get and the handler. The handler keeps its
+    signature, so FastAPI still parses and documents its parameters.
+
+    Args:
+        tags: Called with the handler's parameters, returns the tags writes
+            invalidate the response by
+        cache: Defaults to response_cache
+    """
+    def decorator(func: Callable):
+        def _cache() -> ResponseCache:
+            return cache or response_cache
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(**kwargs):
+                key = _cache_key(func, kwargs)
+                _tags = list(tags(**kwargs))
+
+                if _cache().shared is None:
+                    value = _cache().get(key, _tags)
+                else:
+                    value = await run_in_threadpool(_cache().get, key, _tags)
+
+                if value is not None:
+                    return _response(value, "HIT")
+
+                result = await func(**kwargs)
+                if isinstance(result, Response):
+                    return result
+
+                value = serialize(result)
+                if _cache().shared is None:
+                    _cache().set(key, value, _tags)
+                else:
+                    await run_in_threadpool(_cache().set, key, value, _tags)
+
+                return _response(value, "MISS")
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(**kwargs):
+            key = _cache_key(func, kwargs)
+            _tags = list(tags(**kwargs))
+
+            value = _cache().get(key, _tags)
+            if value is not None:
+                return _response(value, "HIT")
+
+            result = func(**kwargs)
+            if isinstance(result, Response):
+                return result
+
+            value = serialize(result)
+            _cache().set(key, value, _tags)
+
+            return _response(value, "MISS")
+
+        return wrapper
+
+    return decorator
+
+
+def _shared_backend() -> Optional[ICacheBackend]:
+    url = getenv("RESPONSE_CACHE_REDIS_URL")
+    return RedisCacheBackend(url) if url else None
+
+
+response_cache = ResponseCache(
+    local=LRUCache(
+        max_size=int(getenv("RESPONSE_CACHE_SIZE", "2048")),
+        ttl=float(getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+    ),
+    shared=_shared_backend(),
+    ttl=float(getenv("RESPONSE_CACHE_TTL_SECONDS", "30")),
+    shared_ttl=float(getenv("RESPONSE_CACHE_SHARED_TTL_SECONDS", "300"))
+)
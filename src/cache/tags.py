@@ -0,0 +1,21 @@
+"""
+Tags of the cached responses, shared by the routes that cache them and the
+writes that invalidate them
+"""
+
+PLANS = "plans"
+INGREDIENTS = "ingredients"
+# Plan totals depend on the ingredients of every food in the plan
+PLAN_NUTRITION = "plan_nutrition"
+
+
+def plan(plan_id: int) -> str:
+    return f"plan:{plan_id}"
+
+
+def food(food_id: int) -> str:
+    return f"food:{food_id}"
+
+
+def extra_food(extra_food_id: int) -> str:
+    return f"extra_food:{extra_food_id}"
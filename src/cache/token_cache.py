@@ -0,0 +1,69 @@
+from hashlib import sha256
+from os import getenv
+from time import time
+from typing import Optional
+
+from cache.lru import LRUCache
+from models.health import TokenCacheStats
+
+
+class VerifiedTokenCache:
+    """
+    Bounded cache of the payloads of already verified JWTs.
+
+    Keyed by a digest of the token so raw tokens are not kept in memory.
+    An entry lives for the cache ttl and never past the token's exp, so an
+    expired token always goes back through full verification.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: Optional[float] = 300.0):
+        self.cache: LRUCache[dict] = LRUCache(max_size=max_size, ttl=ttl)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        payload = self.cache.get(self._key(token))
+        # Callers store the payload in request.state, never hand out the
+        # cached dict itself
+        return dict(payload) if payload is not None else None
+
+    def put(self, token: str, payload: dict) -> None:
+        if self.cache.max_size <= 0:
+            return
+
+        ttl = None
+        exp = payload.get("exp")
+
+        if exp is not None:
+            ttl = float(exp) - time()
+            if ttl <= 0:
+                return
+
+        self.cache.set(self._key(token), dict(payload), ttl=ttl)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> TokenCacheStats:
+        stats = self.cache.stats()
+        lookups = stats.hits + stats.misses
+
+        return TokenCacheStats(
+            hits=stats.hits,
+            misses=stats.misses,
+            hit_ratio=stats.hits / lookups if lookups else 0.0,
+            evictions=stats.evictions,
+            expirations=stats.expirations,
+            size=stats.size,
+            max_size=stats.max_size
+        )
+
+
+_ttl = float(getenv("JWT_CACHE_TTL_SECONDS", "300"))
+
+verified_token_cache = VerifiedTokenCache(
+    max_size=int(getenv("JWT_CACHE_SIZE", "10000")),
+    ttl=_ttl if _ttl > 0 else None
+)
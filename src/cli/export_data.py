@@ -0,0 +1,49 @@
+"""
+Exports foods, plans, extra foods or water consumption as NDJSON or CSV, like
+GET /export/{kind} but without going through the API.
+
+Rows are read with a server side cursor and written as they come, so exports
+of any size use the same memory. The format and compression are taken from
+the output file name unless given, and the export goes to stdout without one.
+
+    python -m cli.export_data foods -o foods.csv.gz
+    python -m cli.export_data extra_foods --user-id 42 --start-date 2025-01-01 --end-date 2025-01-31
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+from models.export import ExportFormat, ExportKind, ExportParams
+from service.export_service import ExportService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", type=ExportKind, choices=list(ExportKind))
+    parser.add_argument("-o", "--output", type=Path,
+                        help="File to write, stdout by default")
+    parser.add_argument("--format", type=ExportFormat, choices=list(ExportFormat),
+                        help="csv for .csv outputs, ndjson otherwise")
+    parser.add_argument("--gzip", action="store_true",
+                        help="Compress the export, the default for .gz outputs")
+    parser.add_argument("--user-id", help="Only rows of this user")
+    parser.add_argument("--start-date", type=date.fromisoformat, help="Only rows from this day")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Only rows up to this day, included")
+    args = parser.parse_args()
+
+    suffixes = [suffix.lower() for suffix in args.output.suffixes] if args.output else []
+    format = args.format or (ExportFormat.CSV if ".csv" in suffixes else ExportFormat.NDJSON)
+    gzip = args.gzip or ".gz" in suffixes
+
+    params = ExportParams(user_id=args.user_id, start_date=args.start_date, end_date=args.end_date)
+    chunks = ExportService().export(args.kind, format, params, gzip)
+
+    with (args.output.open("wb") if args.output else sys.stdout.buffer) as output:
+        for chunk in chunks:
+            output.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
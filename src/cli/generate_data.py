@@ -0,0 +1,412 @@
+"""
+Fills the database with a synthetic dataset at production scale: ingredients,
+foods and their ingredients, weekly plans, users on those plans, and the extra
+foods, water goals and water logs of every user over the last days.
+
+Distributions are skewed like real usage: a few foods show up in most plans,
+a few plans have most users, and some users log many meals and glasses of
+water a day while others barely open the app. Rows are streamed to the
+database with COPY, about 1.7 million per unit of scale, and the whole dataset
+is loaded in one transaction. The same seed, scale and end date always
+generate the same rows.
+
+Generated rows are named (or keyed, for users) with the `Carga` prefix and
+are replaced on every run, the rest of the database is left alone.
+--truncate empties the tables instead, which is much faster at large scales
+but also drops every other row.
+
+    python -m cli.generate_data --scale 1
+    python -m cli.generate_data --scale 20 --seed 7 --days 60 --truncate
+"""
+import argparse
+import io
+import logging
+import random
+from datetime import date, datetime, time, timedelta
+from itertools import accumulate
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy import Connection, text
+
+from database.database import engine
+
+# Names of the generated rows start with it
+PREFIX = "Carga"
+
+# Ids of the generated users start with it, e.g. carga-000000000042
+USER_PREFIX = "carga-"
+
+# Rows per unit of scale
+INGREDIENTS = 500
+FOODS = 2_000
+PLANS = 200
+USERS = 10_000
+
+# Lines sent per COPY statement
+COPY_CHUNK = 50_000
+
+# Users whose extra foods and water logs are generated and copied together
+USER_CHUNK = 2_000
+
+DISHES = ["Pasta", "Ensalada", "Batido", "Sopa", "Omelette", "Wrap", "Tarta", "Guiso", "Tostada", "Bowl"]
+MAINS = ["pollo", "frutas", "verduras", "atún", "pavo", "espinaca", "calabaza", "lentejas", "arroz", "avena"]
+OBJECTIVES = ["Ganar peso de forma saludable", "Pérdida de peso", "Mantener el peso", "Ganar masa muscular"]
+
+# Meal moment -> hours of the day extra foods are eaten at
+MOMENT_HOURS = {"Desayuno": (7, 10), "Almuerzo": (12, 15), "Merienda": (16, 18), "Cena": (20, 23)}
+
+# Generated tables, in load order, with the columns copied into them
+TABLES: dict[str, tuple[str, ...]] = {
+    "ingredients": ("id", "name", "measure_type", "calories", "protein", "carbs", "fiber", "saturated_fats",
+                    "monounsaturated_fats", "polyunsaturated_fats", "trans_fats", "cholesterol"),
+    "foods": ("id", "name", "description", "price"),
+    "food_ingredients": ("food_id", "ingredient_id", "quantity"),
+    "plans": ("id_plan", "title", "plan_description", "objetive"),
+    "foodplanlink": ("food_id", "plan_id", "day_id", "meal_moment_id", "updated_at"),
+    "users": ("id_user", "id_plan", "updated_at"),
+    "extra_foods": ("id_extra_food", "name", "description", "day", "moment", "date"),
+    "extrafood_user_link": ("id_extra_food", "id_user"),
+    "extrafood_ingredient": ("id_extra_food", "ingredient_id", "quantity"),
+    "user_water_goals": ("goal_id", "id_user", "goal_ml", "start_date", "end_date"),
+    "water_consumption": ("consumption_id", "id_user", "consumption_date", "amount_ml"),
+}
+
+# Table -> serial id column, generated rows get explicit ids after the
+# current maximum
+SERIAL_IDS = {
+    "ingredients": "id",
+    "foods": "id",
+    "plans": "id_plan",
+    "extra_foods": "id_extra_food",
+    "user_water_goals": "goal_id",
+    "water_consumption": "consumption_id",
+}
+
+REPLACE = [
+    text("DELETE FROM extra_foods WHERE name LIKE :prefix"),
+    text("DELETE FROM users WHERE id_user LIKE :user_prefix"),
+    text("DELETE FROM plans WHERE title LIKE :prefix"),
+    text("DELETE FROM foods WHERE name LIKE :prefix"),
+    text("DELETE FROM ingredients WHERE name LIKE :prefix"),
+]
+
+TRUNCATE = text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+
+
+def _line(*values: Any) -> str:
+    """
+    Row in the COPY text format. Values never contain tabs, newlines nor
+    backslashes.
+    """
+    return "\t".join("\\N" if value is None else str(value) for value in values) + "\n"
+
+
+def _popularity(count: int, skew: float) -> list[float]:
+    """
+    Cumulative Zipf weights of count items: the item of rank r is picked
+    in proportion to 1 / r^skew
+    """
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class DatasetGenerator:
+    """
+    Rows of every generated table, in the COPY text format.
+
+    All the randomness comes from one seeded generator consumed in a fixed
+    order, so tables must be generated in TABLES order. Ids start at
+    first_ids (1 by default) for the tables with a serial id.
+    """
+
+    def __init__(
+        self,
+        scale: float = 1.0,
+        seed: int = 0,
+        days: int = 30,
+        end_date: Optional[date] = None,
+        first_ids: Optional[dict[str, int]] = None,
+        day_ids: Optional[dict[str, int]] = None,
+        moment_ids: Optional[dict[str, int]] = None
+    ):
+        """
+        Args:
+            days: Days of extra foods and water logs per user, up to end_date
+            day_ids: Week day name -> id, in week order
+            moment_ids: Meal moment name -> id, in the order of the day
+        """
+        self.rng = random.Random(seed)
+        self.days = days
+        self.end_date = end_date or date.today()
+        self.first_ids = first_ids or {}
+
+        self.day_ids = day_ids or {name: i for i, name in enumerate(
+            ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"], start=1)}
+        self.moment_ids = moment_ids or {name: i for i, name in enumerate(MOMENT_HOURS, start=1)}
+
+        self.ingredient_ids = self._ids("ingredients", INGREDIENTS * scale)
+        self.food_ids = self._ids("foods", FOODS * scale)
+        self.plan_ids = self._ids("plans", PLANS * scale)
+        self.user_ids = [f"{USER_PREFIX}{i:012d}" for i in range(1, max(1, round(USERS * scale)) + 1)]
+
+        # Popular foods and plans are spread over the id range
+        self._foods_by_popularity = self.rng.sample(self.food_ids, len(self.food_ids))
+        self._food_weights = _popularity(len(self.food_ids), 1.1)
+        self._ingredients_by_popularity = self.rng.sample(self.ingredient_ids, len(self.ingredient_ids))
+        self._ingredient_weights = _popularity(len(self.ingredient_ids), 0.8)
+        self._plans_by_popularity = self.rng.sample(self.plan_ids, len(self.plan_ids))
+        self._plan_weights = _popularity(len(self.plan_ids), 1.2)
+
+        self._next_ids = {table: self.first_ids.get(table, 1) for table in ("extra_foods", "user_water_goals", "water_consumption")}
+
+    def _ids(self, table: str, count: float) -> list[int]:
+        first = self.first_ids.get(table, 1)
+        return list(range(first, first + max(1, round(count))))
+
+    def _next_id(self, table: str) -> int:
+        next_id = self._next_ids[table]
+        self._next_ids[table] = next_id + 1
+        return next_id
+
+    def _popular_foods(self, k: int) -> list[int]:
+        return self.rng.choices(self._foods_by_popularity, cum_weights=self._food_weights, k=k)
+
+    def _popular_ingredients(self, k: int) -> list[int]:
+        # Distinct, an ingredient is only once in a food
+        return list(dict.fromkeys(self.rng.choices(
+            self._ingredients_by_popularity, cum_weights=self._ingredient_weights, k=k)))
+
+    def ingredients(self) -> Iterator[str]:
+        rng = self.rng
+        for ingredient_id in self.ingredient_ids:
+            yield _line(
+                ingredient_id,
+                f"{PREFIX} ingrediente {ingredient_id}",
+                "unit" if rng.random() < 0.1 else "gram",
+                round(rng.uniform(10, 700), 1),
+                round(rng.uniform(0, 35), 1),
+                round(rng.uniform(0, 85), 1),
+                round(rng.uniform(0, 12), 1),
+                round(rng.uniform(0, 12), 1),
+                round(rng.uniform(0, 12), 1),
+                round(rng.uniform(0, 8), 1),
+                round(rng.uniform(0, 0.6), 2),
+                round(rng.uniform(0, 150), 1)
+            )
+
+    def foods(self) -> Iterator[str]:
+        rng = self.rng
+        for food_id in self.food_ids:
+            yield _line(
+                food_id,
+                f"{PREFIX} {rng.choice(DISHES)} de {rng.choice(MAINS)} {food_id}",
+                f"Comida sintética {food_id}",
+                round(rng.uniform(2, 20), 2)
+            )
+
+    def food_ingredients(self) -> Iterator[str]:
+        rng = self.rng
+        for food_id in self.food_ids:
+            # Mostly 3 to 7 ingredients, a few long recipes
+            count = min(2 + int(rng.expovariate(1 / 3)), 15)
+            for ingredient_id in self._popular_ingredients(count):
+                yield _line(food_id, ingredient_id, round(rng.uniform(5, 250), 1))
+
+    def plans(self) -> Iterator[str]:
+        rng = self.rng
+        for plan_id in self.plan_ids:
+            yield _line(
+                plan_id,
+                f"{PREFIX} plan {plan_id}",
+                f"Plan sintético {plan_id}",
+                rng.choice(OBJECTIVES)
+            )
+
+    def food_plan_links(self) -> Iterator[str]:
+        rng = self.rng
+        updated_at = datetime.combine(self.end_date, time())
+        for plan_id in self.plan_ids:
+            for day_id in self.day_ids.values():
+                for moment_id in self.moment_ids.values():
+                    # Some slots are left empty
+                    if rng.random() < 0.9:
+                        yield _line(self._popular_foods(1)[0], plan_id, day_id, moment_id, updated_at)
+
+    def users(self) -> Iterator[str]:
+        rng = self.rng
+        updated_at = datetime.combine(self.end_date, time())
+        for user_id in self.user_ids:
+            plan_id = None
+            if rng.random() < 0.8:
+                plan_id = rng.choices(self._plans_by_popularity, cum_weights=self._plan_weights)[0]
+            yield _line(user_id, plan_id, updated_at)
+
+    def user_activity(self, user_id: str) -> dict[str, list[str]]:
+        """
+        Extra foods (with their user link and ingredients), water goals and
+        water logs of one user, by table
+        """
+        rng = self.rng
+        rows: dict[str, list[str]] = {table: [] for table in (
+            "extra_foods", "extrafood_user_link", "extrafood_ingredient", "user_water_goals", "water_consumption")}
+
+        # 1 for most users, up to 5 for the few that log everything
+        activity = min(rng.paretovariate(2.0), 5.0)
+        day_names = list(self.day_ids)
+        moments = list(MOMENT_HOURS)
+        first_day = self.end_date - timedelta(days=self.days - 1)
+
+        # The current goal, and an older one for some users
+        goal_start = first_day
+        if rng.random() < 0.3:
+            goal_start = first_day + timedelta(days=rng.randrange(max(1, self.days)))
+            rows["user_water_goals"].append(_line(
+                self._next_id("user_water_goals"), user_id, 1500 + 250 * rng.randrange(7),
+                first_day - timedelta(days=30), goal_start))
+        rows["user_water_goals"].append(_line(
+            self._next_id("user_water_goals"), user_id, 1500 + 250 * rng.randrange(7), goal_start, None))
+
+        for offset in range(self.days):
+            day = first_day + timedelta(days=offset)
+
+            if rng.random() < min(0.95, 0.25 * activity):
+                for _ in range(min(1 + int(rng.expovariate(1.0)), len(moments))):
+                    moment = rng.choice(moments)
+                    start_hour, end_hour = MOMENT_HOURS[moment]
+                    eaten_at = datetime.combine(day, time(rng.randrange(start_hour, end_hour), rng.randrange(60)))
+                    extra_food_id = self._next_id("extra_foods")
+
+                    rows["extra_foods"].append(_line(
+                        extra_food_id, f"{PREFIX} extra {extra_food_id}", "Comida extra sintética",
+                        day_names[day.weekday()], moment, eaten_at))
+                    rows["extrafood_user_link"].append(_line(extra_food_id, user_id))
+                    for ingredient_id in self._popular_ingredients(rng.randint(1, 4)):
+                        rows["extrafood_ingredient"].append(_line(
+                            extra_food_id, ingredient_id, round(rng.uniform(5, 150), 1)))
+
+            if rng.random() < min(0.98, 0.4 * activity):
+                for _ in range(rng.randint(1, 3 + int(activity * 2))):
+                    rows["water_consumption"].append(_line(
+                        self._next_id("water_consumption"), user_id, day, 150 + 50 * rng.randrange(8)))
+
+        return rows
+
+
+def _copy(cursor, table: str, lines: Iterable[str]) -> int:
+    """
+    COPY lines into table, COPY_CHUNK lines per statement. Returns the
+    number of rows copied.
+    """
+    statement = f"COPY {table} ({', '.join(TABLES[table])}) FROM STDIN"
+    copied = 0
+    chunk: list[str] = []
+
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == COPY_CHUNK:
+            cursor.copy_expert(statement, io.StringIO("".join(chunk)))
+            copied += len(chunk)
+            chunk = []
+
+    if chunk:
+        cursor.copy_expert(statement, io.StringIO("".join(chunk)))
+        copied += len(chunk)
+
+    return copied
+
+
+def generate(
+    connection: Connection,
+    scale: float = 1.0,
+    seed: int = 0,
+    days: int = 30,
+    end_date: Optional[date] = None,
+    truncate: bool = False
+) -> dict[str, int]:
+    """
+    Replace the generated rows (or, with truncate, everything in the
+    generated tables) with a new dataset, in the connection's transaction.
+    Returns the rows copied by table.
+    """
+    if truncate:
+        connection.execute(TRUNCATE)
+    else:
+        for statement in REPLACE:
+            connection.execute(statement, {"prefix": f"{PREFIX} %", "user_prefix": f"{USER_PREFIX}%"})
+
+    # Nobody else can insert and take the ids given to the generated rows
+    connection.execute(text(f"LOCK TABLE {', '.join(SERIAL_IDS)} IN SHARE ROW EXCLUSIVE MODE"))
+
+    first_ids = {
+        table: connection.execute(text(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")).scalar_one()
+        for table, column in SERIAL_IDS.items()
+    }
+    day_ids = {name: day_id for day_id, name in connection.execute(text("SELECT id, name FROM week_days ORDER BY id"))}
+    moment_ids = {name: moment_id for moment_id, name in connection.execute(
+        text("SELECT id, name FROM meal_moments ORDER BY id"))}
+
+    generator = DatasetGenerator(scale, seed, days, end_date, first_ids, day_ids, moment_ids)
+    cursor = connection.connection.cursor()
+    counts = dict.fromkeys(TABLES, 0)
+
+    start = perf_counter()
+    for table, rows in (
+        ("ingredients", generator.ingredients()),
+        ("foods", generator.foods()),
+        ("food_ingredients", generator.food_ingredients()),
+        ("plans", generator.plans()),
+        ("foodplanlink", generator.food_plan_links()),
+        ("users", generator.users()),
+    ):
+        counts[table] = _copy(cursor, table, rows)
+        logging.info(f"{counts[table]} rows copied into {table}")
+
+    for i in range(0, len(generator.user_ids), USER_CHUNK):
+        chunk: dict[str, list[str]] = {}
+        for user_id in generator.user_ids[i:i + USER_CHUNK]:
+            for table, rows in generator.user_activity(user_id).items():
+                chunk.setdefault(table, []).extend(rows)
+
+        for table, rows in chunk.items():
+            counts[table] += _copy(cursor, table, rows)
+
+        logging.info(f"Activity of {min(i + USER_CHUNK, len(generator.user_ids))} users copied")
+
+    for table, column in SERIAL_IDS.items():
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+            f"(SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}), false)"))
+
+    connection.execute(text("SELECT refresh_food_nutrition(NULL)"))
+    connection.execute(text("SELECT refresh_extra_food_nutrition(NULL)"))
+
+    logging.info(f"{sum(counts.values())} rows generated in {perf_counter() - start:.1f}s")
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"{FOODS} foods, {PLANS} plans and {USERS} users per unit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=30,
+                        help="Days of extra foods and water logs per user")
+    parser.add_argument("--end-date", type=date.fromisoformat,
+                        help="Last day of activity, today by default")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Empty the generated tables first, every row in them is lost")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with engine.begin() as connection:
+        generate(connection, args.scale, args.seed, args.days, args.end_date, args.truncate)
+
+    # Fresh statistics, or the first queries are planned for empty tables
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Bulk imports ingredients, foods and the ingredients of foods from CSV or
+NDJSON files, like POST /import/{kind} but without going through the API.
+
+Files are imported in dependency order, ingredients and foods before the
+links between them, each in its own transaction. Rows are matched with the
+catalog by name: existing rows are updated and the rest inserted. The format
+is taken from the extension, .csv or .ndjson/.jsonl.
+
+    python -m cli.import_catalog --ingredients ingredients.csv --foods foods.ndjson
+    python -m cli.import_catalog --food-ingredients recipes.csv --chunk-size 20000
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from models.catalog_import import ImportFormat, ImportKind
+from service.catalog_import_service import CatalogImportService, ImportProgress
+
+
+def _format(path: Path) -> ImportFormat:
+    if path.suffix.lower() == ".csv":
+        return ImportFormat.CSV
+    if path.suffix.lower() in (".ndjson", ".jsonl"):
+        return ImportFormat.NDJSON
+
+    raise SystemExit(f"Unknown format of {path}, expected .csv, .ndjson or .jsonl")
+
+
+def _report(progress: ImportProgress) -> None:
+    logging.info(f"{progress.kind.value}: {progress.rows} rows read, {progress.rejected} rejected")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=Path)
+    parser.add_argument("--foods", type=Path)
+    parser.add_argument("--food-ingredients", type=Path,
+                        help="Rows with food, ingredient and quantity, matched by name")
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="Rows validated and copied at a time")
+    args = parser.parse_args()
+
+    files = [
+        (ImportKind.INGREDIENTS, args.ingredients),
+        (ImportKind.FOODS, args.foods),
+        (ImportKind.FOOD_INGREDIENTS, args.food_ingredients),
+    ]
+    if not any(path for _, path in files):
+        parser.error("Nothing to import, pass at least one file")
+
+    logging.basicConfig(level=logging.INFO)
+
+    service = CatalogImportService(chunk_size=args.chunk_size)
+    failed = False
+
+    for kind, path in files:
+        if path is None:
+            continue
+
+        with path.open(encoding="utf-8-sig", newline="") as source:
+            result = service.import_catalog(kind, _format(path), source, progress=_report)
+
+        for error in result.errors:
+            logging.warning(f"{path}:{error.line}: {error.error}")
+
+        logging.info(
+            f"{path}: {result.inserted} inserted, {result.updated} updated, {result.rejected} rejected")
+        failed = failed or result.rejected > 0
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
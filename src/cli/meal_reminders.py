@@ -0,0 +1,56 @@
+"""
+Runs the meal reminder scheduler and the push dispatcher on their own,
+for nodes dedicated to sending reminders instead of serving the API. Any
+number of them can run alongside API instances with MEAL_REMINDERS_ENABLED.
+
+    python -m cli.meal_reminders
+    python -m cli.meal_reminders --once # Schedule and send what is due, then exit
+"""
+import argparse
+import asyncio
+import logging
+
+from service.meal_reminder_scheduler import MealReminderScheduler
+from service.meal_reminder_service import meal_reminder_service_from_env
+from utils.push_dispatcher import push_dispatcher
+
+
+async def run(once: bool) -> None:
+    await push_dispatcher.start()
+
+    try:
+        if once:
+            service = meal_reminder_service_from_env()
+            scheduled = await asyncio.to_thread(service.schedule_upcoming)
+            sent = await asyncio.to_thread(service.dispatch_due)
+            logging.info(f"{scheduled} meal reminders scheduled, {sent} sent")
+            return
+
+        scheduler = MealReminderScheduler()
+        await scheduler.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await scheduler.stop()
+
+    finally:
+        await push_dispatcher.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true",
+                        help="Run a single scheduling and sending pass")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        asyncio.run(run(args.once))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
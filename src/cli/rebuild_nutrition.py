@@ -0,0 +1,42 @@
+"""
+Rebuilds the food_nutrition and extra_food_nutrition summaries.
+
+Backfills databases created before the tables existed and repairs rows after
+ingredient data was changed outside the API. Without ids every summary is
+rebuilt, in a single transaction.
+
+    python -m cli.rebuild_nutrition
+    python -m cli.rebuild_nutrition --foods 1 2 3 --extra-foods 7
+"""
+import argparse
+import logging
+
+from repository.food_repository import FoodRepository
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--foods", type=int, nargs="+",
+                        help="Only rebuild these food ids")
+    parser.add_argument("--extra-foods", type=int, nargs="+",
+                        help="Only rebuild these extra food ids")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    rebuild_all = not args.foods and not args.extra_foods
+
+    with FoodRepository().transaction() as repository:
+        if rebuild_all or args.foods:
+            repository.refresh_food_nutrition(args.foods)
+            logging.info(f"Food nutrition rebuilt for {args.foods or 'every food'}")
+
+        if rebuild_all or args.extra_foods:
+            repository.refresh_extra_food_nutrition(args.extra_foods)
+            logging.info(
+                f"Extra food nutrition rebuilt for {args.extra_foods or 'every extra food'}")
+
+
+if __name__ == "__main__":
+    main()
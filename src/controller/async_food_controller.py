@@ -0,0 +1,180 @@
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from models.params import GetAllFoodsParams, PostFoodBody, GetExtraFoodsParams
+from models.response import CustomResponse, PaginatedResponse
+from service.async_food_service import AsyncFoodService, IAsyncFoodService
+from models.foodPlans import Food, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, PlanAssignmentDTO, PlanDTO, PlanCloneDTO, PlanNutrition, PlanSlotsBatchDTO, PlanTemplate, PlanTemplateDTO, TemplateInstance, TemplateInstanceDTO, WeeklyPlan, Plan, PlanAssignment, ExtraFoodDTO, ExtraFood
+
+
+class AsyncFoodController:
+    def __init__(self, service: Optional[IAsyncFoodService] = None):
+        self.service = service or AsyncFoodService()
+
+    async def get_plans(self) -> CustomResponse[list[Plan]]:
+        _plans = await self.service.get_plans()
+
+        return CustomResponse(data=_plans)
+
+    async def get_plan(self, plan_id: int) -> CustomResponse[WeeklyPlan]:
+        _weekly_plan = await self.service.get_weekly_plan_by_id(plan_id)
+
+        return CustomResponse(data=_weekly_plan)
+
+    async def get_plan_nutrition(self, plan_id: int) -> CustomResponse[PlanNutrition]:
+        _nutrition = await self.service.get_plan_nutrition(plan_id)
+
+        return CustomResponse(data=_nutrition)
+
+    async def add_plan(self, plan: PlanDTO) -> CustomResponse[Plan]:
+        _plan = await self.service.save_food_plan(plan)
+
+        return CustomResponse(data=_plan)
+
+    async def get_user_plan(self, userId: str) -> CustomResponse[Plan]:
+        _plan = await self.service.get_food_plan_by_user_id(userId)
+
+        return CustomResponse(data=_plan)
+
+    async def put_user_plan(self, userId: str, assignment: PlanAssignmentDTO) -> CustomResponse[PlanAssignment]:
+        _plan_assignment = await self.service.put_user_plan(userId, assignment)
+
+        return CustomResponse(data=_plan_assignment)
+
+    async def get_foods_from_plan(self, plan_id: int) -> CustomResponse[list[Food]]:
+        _foods = await self.service.get_foods_from_plan(plan_id)
+
+        return CustomResponse(data=_foods)
+
+    async def get_foods_from_user_plan(self, user_id: str) -> CustomResponse[list[Food]]:
+        _foods = await self.service.get_foods_from_user_plan(user_id)
+
+        return CustomResponse(data=_foods)
+
+    async def add_food_to_user_plan(self, userId: str, food: FoodLinkDTO) -> CustomResponse[WeeklyPlan]:
+        _foods = await self.service.save_food_to_user_plan(userId, food)
+
+        return CustomResponse(data=_foods)
+
+    async def remove_food_from_user_plan(self, userId: str, data: FoodTimeDTO) -> CustomResponse[WeeklyPlan]:
+        _foods = await self.service.remove_food_from_user_plan(userId, data)
+
+        return CustomResponse(data=_foods)
+
+    async def create_plan_from_preferences(self, user_id: str, preferences: list, plan: PlanDTO) -> CustomResponse[Plan]:
+        _plan = await self.service.create_food_plan_by_preferences(
+            user_id=user_id,
+            preferences=preferences,
+            plan=plan
+        )
+
+        return CustomResponse(data=_plan)
+
+    async def update_food_in_plan(self, plan_id: int, data: FoodLinkDTO) -> CustomResponse[WeeklyPlan]:
+        _plan = await self.service.update_food_in_plan(plan_id, data)
+
+        return CustomResponse(data=_plan)
+
+    async def edit_plan_slots(self, plan_id: int, batch: PlanSlotsBatchDTO) -> CustomResponse[WeeklyPlan]:
+        _plan = await self.service.edit_plan_slots(plan_id, batch)
+
+        return CustomResponse(data=_plan)
+
+    async def set_plan_template(self, plan_id: int, template: PlanTemplateDTO) -> CustomResponse[PlanTemplate]:
+        _template = await self.service.set_plan_template(plan_id, template)
+
+        return CustomResponse(data=_template)
+
+    async def clone_plan(self, plan_id: int, data: PlanCloneDTO) -> CustomResponse[Plan]:
+        _plan = await self.service.clone_plan(plan_id, data)
+
+        return CustomResponse(data=_plan)
+
+    async def instantiate_template(self, template_id: int, user_ids: list[str]) -> CustomResponse[list[TemplateInstance]]:
+        _instances = await self.service.instantiate_template(template_id, user_ids)
+
+        return CustomResponse(data=_instances)
+
+    async def instantiate_template_for_user(self, user_id: str, data: TemplateInstanceDTO) -> CustomResponse[Plan]:
+        _plan = await self.service.instantiate_template_for_user(user_id, data)
+
+        return CustomResponse(data=_plan)
+
+    async def get_food_by_id(self, food_id: int) -> CustomResponse[Food]:
+        _food = await self.service.get_food_by_id(food_id)
+
+        return CustomResponse(data=_food)
+
+    async def get_all_foods(self, params: GetAllFoodsParams) -> PaginatedResponse[Food]:
+        _foods, _next_cursor = await self.service.get_all_foods(params)
+
+        return PaginatedResponse(data=_foods, next_cursor=_next_cursor)
+
+    def stream_all_foods(self, params: GetAllFoodsParams) -> StreamingResponse:
+        _foods = self.service.stream_all_foods(params)
+
+        return StreamingResponse(
+            (food.model_dump_json() + "\n" async for food in _foods),
+            media_type="application/x-ndjson"
+        )
+
+    async def add_food_in_db(self, body: PostFoodBody) -> CustomResponse[Food]:
+        food = await self.service.save_food_in_db(data=body)
+
+        return CustomResponse(data=food)
+
+    async def add_ingredient(self, ingredient: IngredientDTO) -> CustomResponse[Ingredient]:
+        _ingredient = await self.service.save_ingredient(ingredient)
+        return CustomResponse(data=_ingredient)
+
+    async def get_nutritional_values(self, food_id: int) -> CustomResponse[dict]:
+        nutrition = await self.service.get_food_nutritional_values(food_id)
+        if nutrition is None:
+            raise HTTPException(status_code=404, detail="Food not found or has no nutritional data")
+        return CustomResponse(data=nutrition)
+
+    async def get_foods_nutritional_values(self, food_ids: list[int]) -> CustomResponse[dict[int, Optional[dict]]]:
+        nutrition = await self.service.get_foods_nutritional_values(food_ids)
+        return CustomResponse(data=nutrition)
+
+    async def get_extra_foods_nutritional_values(self, extra_food_ids: list[int]) -> CustomResponse[dict[int, Optional[dict]]]:
+        nutrition = await self.service.get_extra_foods_nutritional_values(extra_food_ids)
+        return CustomResponse(data=nutrition)
+
+    async def get_ingredients_by_food_id(self, food_id: int) -> list[FoodIngredientDTO]:
+        return await self.service.get_ingredients_by_food_id(food_id)
+
+    async def get_all_ingredients(self) -> list[Ingredient]:
+        return await self.service.get_all_ingredients()
+
+    async def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        return await self.service.search_ingredients(search_name, limit)
+
+    async def add_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> CustomResponse[ExtraFood]:
+        _extraFoods = await self.service.save_extra_food(extraFood, userId)
+        return CustomResponse(data=_extraFoods)
+
+    async def get_extra_foods(self, params: GetExtraFoodsParams) -> CustomResponse[list[ExtraFood]]:
+        _extraFoods = await self.service.get_extra_foods(params)
+        return CustomResponse(data=_extraFoods)
+
+    async def get_ingredients_by_extra_food_id(self, extra_food_id: int) -> list[FoodIngredientDTO]:
+        return await self.service.get_ingredients_by_extra_food_id(extra_food_id)
+
+    async def get_nutritional_values_extrafood(self, extraFood_id: int) -> CustomResponse[dict]:
+        nutrition = await self.service.get_food_nutritional_values_extrafood(extraFood_id)
+        if nutrition is None:
+            raise HTTPException(status_code=404, detail="extra Food not found or has no nutritional data")
+        return CustomResponse(data=nutrition)
+
+    async def get_plans_version(self) -> str:
+        return await self.service.get_plans_version()
+
+    async def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        return await self.service.get_weekly_plan_version(plan_id)
+
+    async def get_food_version(self, food_id: int) -> Optional[str]:
+        return await self.service.get_food_version(food_id)
+
+    async def get_ingredients_version(self) -> str:
+        return await self.service.get_ingredients_version()
@@ -0,0 +1,19 @@
+import io
+from typing import BinaryIO, Optional
+
+from models.catalog_import import ImportFormat, ImportKind, ImportResult
+from models.response import CustomResponse
+from service.catalog_import_service import CatalogImportService, ICatalogImportService
+
+
+class CatalogImportController:
+    def __init__(self, service: Optional[ICatalogImportService] = None):
+        self.service = service or CatalogImportService()
+
+    def import_catalog(self, kind: ImportKind, format: ImportFormat, body: BinaryIO) -> CustomResponse[ImportResult]:
+        # newline="" so the CSV reader sees line breaks inside quoted values
+        source = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        try:
+            return CustomResponse(data=self.service.import_catalog(kind, format, source))
+        finally:
+            source.close()
@@ -0,0 +1,26 @@
+from typing import Optional
+
+from fastapi.responses import StreamingResponse
+
+from models.export import ExportFormat, ExportKind, ExportParams
+from service.export_service import ExportService, IExportService
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+class ExportController:
+    def __init__(self, service: Optional[IExportService] = None):
+        self.service = service or ExportService()
+
+    def export(self, kind: ExportKind, format: ExportFormat, params: ExportParams, gzip: bool) -> StreamingResponse:
+        _chunks = self.service.export(kind, format, params, gzip)
+        filename = f"{kind.value}.{format.value}" + (".gz" if gzip else "")
+
+        return StreamingResponse(
+            _chunks,
+            media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
@@ -1,9 +1,10 @@
 from typing import Optional
 from models.params import GetAllFoodsParams, PostFoodBody, GetExtraFoodsParams
-from models.response import CustomResponse
+from models.response import CustomResponse, PaginatedResponse
 from service.food_service import FoodService, IFoodService
-from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, PlanAssignmentDTO, PlanDTO, WeeklyPlan, Plan, PlanAssignment, ExtraFoodDTO, ExtraFood
-from fastapi import Path
+from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, PlanAssignmentDTO, PlanDTO, PlanCloneDTO, PlanNutrition, PlanSlotsBatchDTO, PlanTemplate, PlanTemplateDTO, TemplateInstance, TemplateInstanceDTO, WeeklyPlan, Plan, PlanAssignment, ExtraFoodDTO, ExtraFood
+from fastapi import HTTPException, Path
+from fastapi.responses import StreamingResponse
 
 class FoodController:
     def __init__(self, service: Optional[IFoodService] = None):
@@ -19,6 +20,11 @@ class FoodController:
 
         return CustomResponse(data=_weekly_plan)
 
+    def get_plan_nutrition(self, plan_id: int) -> CustomResponse[PlanNutrition]:
+        _nutrition = self.service.get_plan_nutrition(plan_id)
+
+        return CustomResponse(data=_nutrition)
+
     def add_plan(self, plan: PlanDTO) -> CustomResponse[Plan]:
         _plan = self.service.save_food_plan(plan)
 
@@ -68,15 +74,48 @@ class FoodController:
 
         return CustomResponse(data=_plan)
 
+    def edit_plan_slots(self, plan_id: int, batch: PlanSlotsBatchDTO) -> CustomResponse[WeeklyPlan]:
+        _plan = self.service.edit_plan_slots(plan_id, batch)
+
+        return CustomResponse(data=_plan)
+
+    def set_plan_template(self, plan_id: int, template: PlanTemplateDTO) -> CustomResponse[PlanTemplate]:
+        _template = self.service.set_plan_template(plan_id, template)
+
+        return CustomResponse(data=_template)
+
+    def clone_plan(self, plan_id: int, data: PlanCloneDTO) -> CustomResponse[Plan]:
+        _plan = self.service.clone_plan(plan_id, data)
+
+        return CustomResponse(data=_plan)
+
+    def instantiate_template(self, template_id: int, user_ids: list[str]) -> CustomResponse[list[TemplateInstance]]:
+        _instances = self.service.instantiate_template(template_id, user_ids)
+
+        return CustomResponse(data=_instances)
+
+    def instantiate_template_for_user(self, user_id: str, data: TemplateInstanceDTO) -> CustomResponse[Plan]:
+        _plan = self.service.instantiate_template_for_user(user_id, data)
+
+        return CustomResponse(data=_plan)
+
     def get_food_by_id(self, food_id: int) -> CustomResponse[Food]:
         _food = self.service.get_food_by_id(food_id)
 
         return CustomResponse(data=_food)
 
-    def get_all_foods(self, params: GetAllFoodsParams) -> CustomResponse[list[Food]]:
-        _foods = self.service.get_all_foods(params)
+    def get_all_foods(self, params: GetAllFoodsParams) -> PaginatedResponse[Food]:
+        _foods, _next_cursor = self.service.get_all_foods(params)
 
-        return CustomResponse(data=_foods)
+        return PaginatedResponse(data=_foods, next_cursor=_next_cursor)
+
+    def stream_all_foods(self, params: GetAllFoodsParams) -> StreamingResponse:
+        _foods = self.service.stream_all_foods(params)
+
+        return StreamingResponse(
+            (food.model_dump_json() + "\n" for food in _foods),
+            media_type="application/x-ndjson"
+        )
     
     def add_food_in_db(self, body: PostFoodBody) -> CustomResponse[Food]:
         food = self.service.save_food_in_db(data=body)
@@ -93,11 +132,22 @@ class FoodController:
             raise HTTPException(status_code=404, detail="Food not found or has no nutritional data")
         return CustomResponse(data=nutrition)
     
+    def get_foods_nutritional_values(self, food_ids: list[int]) -> CustomResponse[dict[int, Optional[dict]]]:
+        nutrition = self.service.get_foods_nutritional_values(food_ids)
+        return CustomResponse(data=nutrition)
+
+    def get_extra_foods_nutritional_values(self, extra_food_ids: list[int]) -> CustomResponse[dict[int, Optional[dict]]]:
+        nutrition = self.service.get_extra_foods_nutritional_values(extra_food_ids)
+        return CustomResponse(data=nutrition)
+
     def get_ingredients_by_food_id(self, food_id: int) -> list[FoodIngredientDTO]:
         return self.service.get_ingredients_by_food_id(food_id)
 
     def get_all_ingredients(self) -> list[Ingredient]:
         return self.service.get_all_ingredients()
+
+    def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        return self.service.search_ingredients(search_name, limit)
     
     def add_extra_food(self, extraFood: ExtraFoodDTO, userId: str)  -> CustomResponse[ExtraFood]:
         _extraFoods = self.service.save_extra_food(extraFood, userId)
@@ -115,3 +165,15 @@ class FoodController:
         if nutrition is None:
             raise HTTPException(status_code=404, detail="extra Food not found or has no nutritional data")
         return CustomResponse(data=nutrition)
+
+    def get_plans_version(self) -> str:
+        return self.service.get_plans_version()
+
+    def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        return self.service.get_weekly_plan_version(plan_id)
+
+    def get_food_version(self, food_id: int) -> Optional[str]:
+        return self.service.get_food_version(food_id)
+
+    def get_ingredients_version(self) -> str:
+        return self.service.get_ingredients_version()
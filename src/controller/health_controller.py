@@ -2,7 +2,7 @@ from typing import Optional
 from fastapi import status
 from fastapi.responses import JSONResponse
 
-from models.health import Health, HealthDB
+from models.health import Health, HealthDB, LogPipelineStats, ResponseCacheStats, TokenCacheStats
 from service.health_service import HealthService, IHealthService
 
 
@@ -15,3 +15,12 @@ class HealthController:
 
     def get_health_db(self) -> HealthDB:
         return self.service.get_health_db()
+
+    def get_cache_stats(self) -> ResponseCacheStats:
+        return self.service.get_cache_stats()
+
+    def get_token_cache_stats(self) -> TokenCacheStats:
+        return self.service.get_token_cache_stats()
+
+    def get_log_stats(self) -> LogPipelineStats:
+        return self.service.get_log_stats()
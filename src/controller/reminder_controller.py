@@ -0,0 +1,15 @@
+from typing import Optional
+
+from models.reminders import PushTokenDTO
+from models.response import CustomResponse
+from service.meal_reminder_service import IMealReminderService, MealReminderService
+
+
+class ReminderController:
+    def __init__(self, service: Optional[IMealReminderService] = None):
+        self.service = service or MealReminderService()
+
+    def put_push_token(self, user_id: str, push_token: PushTokenDTO) -> CustomResponse[PushTokenDTO]:
+        self.service.save_push_token(user_id, push_token.token)
+
+        return CustomResponse(data=push_token)
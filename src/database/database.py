@@ -1,13 +1,36 @@
 from os import getenv
-from sqlalchemy import create_engine
-from sqlalchemy.pool import QueuePool
+from typing import Optional
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from metrics.database import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
 
 DATABASE_URL = getenv("DATABASE_URL", "")
 
+# Selects the asyncio data path (asyncpg + async routes) instead of the
+# threadpool + psycopg2 one. Both share the same pool sizing so they can be
+# compared on the same hardware.
+ASYNC_DATABASE = getenv("ASYNC_DATABASE", "false").lower() == "true"
+
 
-engine = create_engine(
+# The pools time their checkouts and every statement is timed by repository
+# method, see metrics.database
+engine = instrument_engine(create_engine(
     DATABASE_URL,
-    poolclass=QueuePool,
+    poolclass=InstrumentedQueuePool,
     pool_size=5,
-    max_overflow=10
-)
+    max_overflow=10,
+    pool_logging_name="sync"
+), "sync")
+
+async_engine: Optional[AsyncEngine] = None
+
+if ASYNC_DATABASE:
+    async_engine = create_async_engine(
+        make_url(DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_logging_name="async"
+    )
+    instrument_engine(async_engine.sync_engine, "async")
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 import logging
 from os import getenv
 import os
@@ -8,13 +9,46 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
+from metrics.http import MetricsMiddleware
+from metrics.query_recorder import QueryRecorderMiddleware, query_recorder_settings
 from middleware.auth_middleware import JWTMiddleware
 from middleware.error_handler import error_handler
-from starlette.middleware.base import BaseHTTPMiddleware
 
-from routes import health_routes, food_routes
+from database.database import ASYNC_DATABASE
+from routes import health_routes, food_routes, async_food_routes, metrics_routes, reminder_routes, catalog_import_routes, export_routes
+from service.meal_reminder_scheduler import MealReminderScheduler
+from service.reference_data import reference_data_registry
+from utils.log_pipeline import log_pipeline
+from utils.push_dispatcher import push_dispatcher
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        reference_data_registry.refresh()
+    except Exception:
+        logging.exception(
+            "Could not load reference data at startup, it will be loaded on first use")
+
+    await push_dispatcher.start()
+
+    # Every instance can run the scheduler, they share the work through the
+    # meal_reminders queue
+    scheduler = None
+    if getenv("MEAL_REMINDERS_ENABLED", "false").lower() == "true":
+        scheduler = MealReminderScheduler()
+    if scheduler is not None:
+        await scheduler.start()
+
+    yield
+
+    if scheduler is not None:
+        await scheduler.stop()
+
+    await push_dispatcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 env_path: str = getenv("ENV_PATH", "../.env")
 env_path = os.path.abspath(env_path)
@@ -37,11 +71,26 @@ app.add_middleware(
 )
 
 # Add JWT middleware
-app.add_middleware(BaseHTTPMiddleware, dispatch=JWTMiddleware())
+app.add_middleware(JWTMiddleware)
+
+# Logs the requests that run too many or too slow statements
+app.add_middleware(QueryRecorderMiddleware, **query_recorder_settings())
+
+# Outermost, so the auth middleware is measured too
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(health_routes.router, prefix="/health", tags=["health"])
-app.include_router(food_routes.router, tags=["food"])
+app.include_router(metrics_routes.router, prefix="/metrics", tags=["metrics"])
+
+if ASYNC_DATABASE:
+    app.include_router(async_food_routes.router, tags=["food"])
+else:
+    app.include_router(food_routes.router, tags=["food"])
+
+app.include_router(reminder_routes.router, tags=["reminders"])
+app.include_router(catalog_import_routes.router, tags=["import"])
+app.include_router(export_routes.router, tags=["export"])
 
 
 @app.get("/favicon.ico", include_in_schema=False)
@@ -49,8 +98,7 @@ async def favicon():
     return None
 
 if __name__ == "__main__":
-    logging.basicConfig(
-        level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s - %(asctime)s', filename='logs.log')
+    log_pipeline.install()
 
     HOST: str = getenv("HOST", "0.0.0.0")
     PORT: int = int(getenv("PORT", 8081))
@@ -0,0 +1,190 @@
+import inspect
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metrics.query_recorder import current_recording
+from metrics.registry import LabelValues, metrics_registry
+
+# Label of the statements run outside an instrumented repository method
+UNNAMED_QUERY = "other"
+
+# Repository method running the current statements, e.g. FoodRepository.get_plans
+current_query_name: ContextVar[Optional[str]] = ContextVar("current_query_name", default=None)
+
+_QUERY_START = "metrics_query_start"
+
+query_duration = metrics_registry.histogram(
+    "db_query_duration_seconds", "Statement execution time by repository method", ("query",))
+query_errors = metrics_registry.counter(
+    "db_query_errors_total", "Statements that raised, by repository method", ("query",))
+pool_checkout = metrics_registry.histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool, waiting for one and connecting included",
+    ("pool",))
+pool_timeouts = metrics_registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a connection", ("pool",))
+
+# Pool name -> engine, read at scrape time by the pool gauges
+_engines: dict[str, Engine] = {}
+
+
+def _pool_stats(read: Callable[[QueuePool], float]) -> Callable[[], dict[LabelValues, float]]:
+    def collect() -> dict[LabelValues, float]:
+        return {
+            (name,): read(engine.pool)  # type: ignore
+            for name, engine in list(_engines.items())
+            if isinstance(engine.pool, QueuePool)
+        }
+
+    return collect
+
+
+metrics_registry.gauge("db_pool_size", "Connections the pool keeps open", ("pool",),
+                       callback=_pool_stats(lambda pool: pool.size()))
+metrics_registry.gauge("db_pool_checked_out", "Connections in use", ("pool",),
+                       callback=_pool_stats(lambda pool: pool.checkedout()))
+metrics_registry.gauge("db_pool_checked_in", "Idle connections in the pool", ("pool",),
+                       callback=_pool_stats(lambda pool: pool.checkedin()))
+metrics_registry.gauge("db_pool_overflow", "Connections open beyond pool_size, negative while the pool fills up",
+                       ("pool",), callback=_pool_stats(lambda pool: pool.overflow()))
+
+
+class _CheckoutTiming:
+    """
+    Times every checkout of a queue pool. The pool is labelled with its
+    pool_logging_name, which survives the pool being recreated.
+    """
+
+    def _do_get(self):
+        name = getattr(self, "_orig_logging_name", None) or "default"
+        start = perf_counter()
+
+        try:
+            return super()._do_get()  # type: ignore
+        except PoolTimeoutError:
+            pool_timeouts.inc(pool=name)
+            raise
+        finally:
+            pool_checkout.observe(perf_counter() - start, pool=name)
+
+
+class InstrumentedQueuePool(_CheckoutTiming, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTiming, AsyncAdaptedQueuePool):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_QUERY_START, []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = perf_counter() - conn.info[_QUERY_START].pop()
+    query = current_query_name.get() or UNNAMED_QUERY
+    query_duration.observe(elapsed, query=query)
+
+    # Statements of the current request, see metrics.query_recorder
+    recording = current_recording.get()
+    if recording is not None:
+        recording.record(statement, query, elapsed)
+
+
+def _handle_error(context) -> None:
+    starts = context.connection.info.get(_QUERY_START) if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+    query_errors.inc(query=current_query_name.get() or UNNAMED_QUERY)
+
+
+def instrument_engine(engine: Engine, name: str) -> Engine:
+    """
+    Time every statement of engine by the repository method running it and
+    expose its pool as name in the pool gauges. Async engines are
+    instrumented through their sync_engine.
+    """
+    if name in _engines:
+        return engine
+
+    _engines[name] = engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    return engine
+
+
+class named_query:
+    """
+    Name the statements run inside the block. Nested names keep the
+    outermost one, so a repository method calling another is reported once.
+
+    Restores the previous name with set() instead of a reset token, so it
+    also works across the steps of a generator consumed from other contexts.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._previous: Optional[str] = None
+
+    def __enter__(self) -> None:
+        self._previous = current_query_name.get()
+        if self._previous is None:
+            current_query_name.set(self.name)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        current_query_name.set(self._previous)
+
+
+def _instrumented(name: str, func: Callable) -> Callable:
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+
+            try:
+                while True:
+                    with named_query(name):
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                    yield item
+            finally:
+                # Releases a server side cursor when the consumer stops early
+                iterator.close()
+
+        return generator_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with named_query(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+R = TypeVar("R", bound=type)
+
+
+def instrument_repository(cls: R) -> R:
+    """
+    Class decorator naming the statements of every public method of a
+    repository after the method, e.g. FoodRepository.get_plans
+    """
+    for attribute, value in list(vars(cls).items()):
+        # transaction() only hands out a bound repository, the statements
+        # run through its methods
+        if attribute.startswith("_") or attribute == "transaction" or not inspect.isfunction(value):
+            continue
+
+        setattr(cls, attribute, _instrumented(f"{cls.__name__}.{attribute}", value))
+
+    return cls
@@ -0,0 +1,70 @@
+from time import perf_counter
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics.registry import MetricsRegistry, metrics_registry
+
+# Label of the requests no route matched, so scanners cannot blow up the
+# number of series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware counting requests by route template, method and
+    status, timing them and tracking how many are in flight.
+
+    Routes are labelled with their template (/plans/{plan_id}), which the
+    router leaves in the scope, never with the raw path.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        registry = registry or metrics_registry
+
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by route, method and status",
+            ("route", "method", "status"))
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency until the response starts",
+            ("route", "method"))
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "HTTP requests being served")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status = 500
+        elapsed: Optional[float] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = perf_counter() - start
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            # Answered by the exception handlers outside this middleware,
+            # e.g. the 401 of the auth middleware
+            if elapsed is None:
+                status = getattr(e, "status_code", 500)
+            raise
+        finally:
+            self.in_flight.dec()
+
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+
+            self.requests.inc(route=route_label, method=method, status=str(status))
+            self.duration.observe(
+                elapsed if elapsed is not None else perf_counter() - start,
+                route=route_label, method=method)
@@ -0,0 +1,216 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import getenv
+from time import perf_counter
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Statements are logged cut to this many characters
+_STATEMENT_LOG_LENGTH = 300
+
+
+class QueryRecord(NamedTuple):
+    statement: str
+    query: str
+    duration: float
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Statement with its whitespace collapsed. Parameters are bound, so the
+    same query with other values has the same shape.
+    """
+    return " ".join(statement.split())
+
+
+class QueryRecording:
+    """
+    Statements run during a request (or a record_queries block), in order.
+
+    With a budget, the statement that goes over it raises
+    QueryBudgetExceeded, failing the request that ran it.
+    """
+
+    def __init__(self, budget: Optional[int] = None, budget_of: Optional[Callable[[], Optional[int]]] = None):
+        """
+        Args:
+            budget_of: Looks the budget up when the first statement is
+                recorded, used when it is only known after routing
+        """
+        self.records: list[QueryRecord] = []
+        self.budget = budget
+        self.budget_of = budget_of
+
+    @property
+    def count(self) -> int:
+        return len(self.records)
+
+    @property
+    def total_time(self) -> float:
+        return sum(record.duration for record in self.records)
+
+    def record(self, statement: str, query: str, duration: float) -> None:
+        self.records.append(QueryRecord(statement, query, duration))
+
+        if self.budget is None and self.budget_of is not None:
+            self.budget = self.budget_of()
+            self.budget_of = None
+
+        if self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded(
+                f"{self.count} statements run, the budget is {self.budget}: {self.queries()}")
+
+    def queries(self) -> list[str]:
+        return [record.query for record in self.records]
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """
+        Statement shapes run at least threshold times, the usual sign of an
+        N+1 (one query per item of a previous result)
+        """
+        shapes = Counter(statement_shape(record.statement) for record in self.records)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+current_recording: ContextVar[Optional[QueryRecording]] = ContextVar("current_recording", default=None)
+
+
+@contextmanager
+def record_queries(budget: Optional[int] = None) -> Iterator[QueryRecording]:
+    """
+    Record the statements run inside the block, for tests and benchmarks.
+    With a budget, going over it raises QueryBudgetExceeded.
+    """
+    recording = QueryRecording(budget)
+    token = current_recording.set(recording)
+
+    try:
+        yield recording
+    finally:
+        current_recording.reset(token)
+
+
+def query_budget(max_statements: int):
+    """
+    Declare how many statements a route may run. Goes right above the
+    handler; over budget requests are logged, and fail when budgets are
+    enforced (QUERY_BUDGETS_ENFORCE=true, meant for tests).
+    """
+    def decorator(func: Callable) -> Callable:
+        func.query_budget = max_statements  # type: ignore
+        return func
+
+    return decorator
+
+
+class QueryRecorderMiddleware:
+    """
+    Pure ASGI middleware recording the statements of every request.
+
+    Logs the requests that run more than max_statements statements, spend
+    more than slow_request seconds in the database, run a statement slower
+    than slow_statement seconds, repeat a statement shape repeat_threshold
+    times or go over their route's query_budget, with their statement list.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_statements: int = 20,
+        slow_request: float = 0.5,
+        slow_statement: float = 0.2,
+        repeat_threshold: int = 5,
+        enforce_budgets: bool = False
+    ):
+        self.app = app
+        self.max_statements = max_statements
+        self.slow_request = slow_request
+        self.slow_statement = slow_statement
+        self.repeat_threshold = repeat_threshold
+        self.enforce_budgets = enforce_budgets
+
+    @staticmethod
+    def _route_budget(scope: Scope) -> Optional[int]:
+        # The router leaves the matched endpoint in the scope
+        return getattr(scope.get("endpoint"), "query_budget", None)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recording = QueryRecording(
+            budget_of=(lambda: self._route_budget(scope)) if self.enforce_budgets else None)
+        token = current_recording.set(recording)
+        start = perf_counter()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_recording.reset(token)
+            if recording.records:
+                self._report(scope, recording, perf_counter() - start)
+
+    def _report(self, scope: Scope, recording: QueryRecording, elapsed: float) -> None:
+        problems = []
+        budget = self._route_budget(scope)
+
+        if budget is not None and recording.count > budget:
+            problems.append(f"over its budget of {budget} statements")
+        if recording.count > self.max_statements:
+            problems.append(f"more than {self.max_statements} statements")
+        if recording.total_time > self.slow_request:
+            problems.append(f"more than {self.slow_request * 1000:.0f}ms in the database")
+
+        slow = [record for record in recording.records if record.duration > self.slow_statement]
+        if slow:
+            problems.append(f"{len(slow)} statements slower than {self.slow_statement * 1000:.0f}ms")
+
+        repeated = recording.repeated(self.repeat_threshold)
+        if repeated:
+            problems.append(f"{len(repeated)} statements repeated, possible N+1")
+
+        if not problems:
+            return
+
+        route = getattr(scope.get("route"), "path", scope["path"])
+        logging.warning(
+            f"{scope['method']} {route} ran {recording.count} statements in "
+            f"{recording.total_time * 1000:.1f}ms: {', '.join(problems)}",
+            extra={
+                "route": route,
+                "method": scope["method"],
+                "statements": recording.count,
+                "db_time_ms": round(recording.total_time * 1000, 3),
+                "request_time_ms": round(elapsed * 1000, 3),
+                "queries": [
+                    {
+                        "query": record.query,
+                        "duration_ms": round(record.duration * 1000, 3),
+                        "statement": statement_shape(record.statement)[:_STATEMENT_LOG_LENGTH]
+                    }
+                    for record in recording.records
+                ],
+                "repeated": {shape[:_STATEMENT_LOG_LENGTH]: count for shape, count in repeated.items()}
+            }
+        )
+
+
+def query_recorder_settings() -> dict[str, Any]:
+    """
+    QueryRecorderMiddleware arguments from the environment
+    """
+    return {
+        "max_statements": int(getenv("QUERY_LOG_MAX_STATEMENTS", "20")),
+        "slow_request": float(getenv("QUERY_LOG_SLOW_REQUEST_MS", "500")) / 1000,
+        "slow_statement": float(getenv("QUERY_LOG_SLOW_STATEMENT_MS", "200")) / 1000,
+        "repeat_threshold": int(getenv("QUERY_LOG_REPEAT_THRESHOLD", "5")),
+        "enforce_budgets": getenv("QUERY_BUDGETS_ENFORCE", "false").lower() == "true"
+    }
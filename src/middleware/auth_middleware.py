@@ -1,53 +1,79 @@
+import re
+
 from fastapi import Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from cache.token_cache import VerifiedTokenCache, verified_token_cache
 from models.errors.errors import AuthenticationError
 from service.jwt_service import JWTService
 
 
 class JWTMiddleware:
-    def __init__(self, jwt_service: JWTService | None = None, security: HTTPBearer | None = None):
+    """
+    Pure ASGI middleware that authenticates every request outside the public
+    routes and stores the JWT payload in request.state.user.
+
+    Public paths are matched by a single precompiled regex straight on the
+    scope, so they never build a Request nor parse headers.
+    """
+
+    def __init__(self, app: ASGIApp, jwt_service: JWTService | None = None, security: HTTPBearer | None = None, token_cache: VerifiedTokenCache | None = None):
+        self.app = app
         self.jwt_service = jwt_service or JWTService()
         self.security = security or HTTPBearer()
+        self.token_cache = token_cache or verified_token_cache
         self.__public_routes = [
             "/health",
+            "/metrics",
             "/docs",
             "/redoc",
             "/openapi.json",
             "/favicon.ico",
             "/food",
         ]
+        # "/" exactly, or any path starting with a public route
+        self.__public_path = re.compile(
+            r"/\Z|" + "|".join(re.escape(route) for route in self.__public_routes))
+        self.__public_methods = frozenset(("OPTIONS", "REDIRECT"))
 
-    async def __call__(self, request: Request, call_next):
-        if request.method == "OPTIONS" or request.method == "REDIRECT":
-            response = await call_next(request)
-            return response
-
-        if request.url.path == "/":
-            response = await call_next(request)
-            return response
-
-        referer: str = request.headers.get("referer", "")
-        if referer and (referer.startswith("http://127.0.0.1:") or referer.startswith("http://localhost:")) and referer.endswith("docs"):
-            response = await call_next(request)
-            return response
-
-        for route in self.__public_routes:
-            if request.url.path.startswith(route):
-                response = await call_next(request)
-                return response
-
-        if request.url.path == "/":
-            response = await call_next(request)
-            return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.__is_public(scope):
+            await self.app(scope, receive, send)
+            return
 
+        request = Request(scope)
         credentials: HTTPAuthorizationCredentials | None = await self.security(request)
 
         if not credentials:
             raise AuthenticationError()
 
         token = credentials.credentials
-        payload = self.jwt_service.verify(token)
+        payload = self.token_cache.get(token)
+
+        if payload is None:
+            payload = self.jwt_service.verify(token)
+            if isinstance(payload, dict):
+                self.token_cache.put(token, payload)
 
         request.state.user = payload
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
+
+    def __is_public(self, scope: Scope) -> bool:
+        if scope["method"] in self.__public_methods:
+            return True
+
+        if self.__public_path.match(scope["path"]):
+            return True
+
+        return self.__is_docs_request(scope)
+
+    @staticmethod
+    def __is_docs_request(scope: Scope) -> bool:
+        # Requests made from a local Swagger UI
+        for name, value in scope["headers"]:
+            if name == b"referer":
+                referer = value.decode("latin-1")
+                return (referer.startswith("http://127.0.0.1:") or referer.startswith("http://localhost:")) and referer.endswith("docs")
+
+        return False
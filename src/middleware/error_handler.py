@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 from fastapi import HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -7,6 +8,19 @@ from models.errors.errors import CustomHTTPException
 from models.response import ErrorDTO
 
 
+def log_error(request: Request, content: ErrorDTO, e: Optional[Exception] = None) -> None:
+    # Only queues the record, the log pipeline writes it off the request path
+    logging.error(
+        str(content),
+        exc_info=e,
+        extra={
+            "status": content.status,
+            "method": request.method,
+            "path": request.url.path
+        }
+    )
+
+
 def error_handler(request: Request, e: Exception) -> JSONResponse:
     match e:
         case RequestValidationError():
@@ -19,7 +33,7 @@ def error_handler(request: Request, e: Exception) -> JSONResponse:
                 instance=str(request.url)
             )
 
-            logging.error(str(content))
+            log_error(request, content)
 
             return JSONResponse(
                 dict(content),
@@ -35,7 +49,7 @@ def error_handler(request: Request, e: Exception) -> JSONResponse:
                 instance=str(request.url)
             )
 
-            logging.error(str(content))
+            log_error(request, content)
 
             return JSONResponse(
                 content=dict(content),
@@ -51,7 +65,7 @@ def error_handler(request: Request, e: Exception) -> JSONResponse:
                 instance=str(request.url)
             )
 
-            logging.error(str(content))
+            log_error(request, content)
 
             return JSONResponse(
                 dict(content),
@@ -67,7 +81,7 @@ def error_handler(request: Request, e: Exception) -> JSONResponse:
                 instance=str(request.url)
             )
 
-            logging.error(str(content))
+            log_error(request, content, e)
 
             return JSONResponse(
                 dict(content),
@@ -0,0 +1,41 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from models.foodPlans import IngredientDTO
+
+
+class ImportKind(str, Enum):
+    INGREDIENTS = "ingredients"
+    FOODS = "foods"
+    FOOD_INGREDIENTS = "food_ingredients"
+
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class IngredientImportDTO(IngredientDTO):
+    id: Optional[int] = Field(None, description="Ignored, ingredients are matched by name")
+
+
+class FoodIngredientImportDTO(BaseModel):
+    food: str = Field(..., min_length=1, max_length=64, description="Name of the food")
+    ingredient: str = Field(..., min_length=1, max_length=64, description="Name of the ingredient")
+    quantity: float = Field(..., ge=0, description="Quantity of the ingredient in grams or units")
+
+
+class ImportRowError(BaseModel):
+    line: int = Field(..., description="Line of the row in the input, the CSV header is line 1")
+    error: str = Field(..., description="Why the row was rejected")
+
+
+class ImportResult(BaseModel):
+    kind: ImportKind = Field(..., description="What was imported")
+    rows: int = Field(..., description="Rows read from the input")
+    inserted: int = Field(..., description="Rows created")
+    updated: int = Field(..., description="Existing rows whose values changed")
+    rejected: int = Field(..., description="Rows not imported, invalid or referencing unknown names")
+    errors: list[ImportRowError] = Field(..., description="Rejected rows, the first ones only when there are many")
@@ -0,0 +1,29 @@
+from datetime import date
+from enum import Enum
+from typing import Optional
+
+
+class ExportKind(str, Enum):
+    FOODS = "foods"
+    PLANS = "plans"
+    EXTRA_FOODS = "extra_foods"
+    WATER_CONSUMPTION = "water_consumption"
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+# Exports of rows logged by users, filtered by user and date
+USER_EXPORTS = (ExportKind.EXTRA_FOODS, ExportKind.WATER_CONSUMPTION)
+
+
+class ExportParams:
+    user_id: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
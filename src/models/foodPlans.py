@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Dict, Optional, Union
+from typing import Annotated, List, Dict, Optional, Union
 from enum import Enum
 
 class PlanDTO(BaseModel):
@@ -94,6 +94,55 @@ class PlanAssignment(PlanAssignmentDTO):
         description="Date when the plan was updated",
     )
 
+class PlanTemplateDTO(BaseModel):
+    is_template: bool = Field(
+        ...,
+        title="Template",
+        description="Whether the plan is a template users can get a copy of",
+    )
+
+
+class PlanTemplate(PlanTemplateDTO):
+    plan_id: int = Field(
+        ...,
+        title="Plan ID",
+        description="Unique identifier for the plan",
+    )
+
+
+class PlanCloneDTO(BaseModel):
+    title: Optional[str] = Field(
+        None,
+        title="Plan title",
+        description="Title of the copy, the original's by default",
+        max_length=64,
+        min_length=1
+    )
+
+
+class TemplateInstanceDTO(BaseModel):
+    template_id: int = Field(
+        ...,
+        title="Template ID",
+        description="Plan flagged as template to copy",
+    )
+
+
+class TemplateInstancesDTO(BaseModel):
+    user_ids: List[Annotated[str, Field(min_length=1, max_length=36)]] = Field(
+        ...,
+        title="User IDs",
+        description="Users that get their own copy of the template, replacing their current plan",
+        min_length=1,
+        max_length=10000,
+    )
+
+
+class TemplateInstance(BaseModel):
+    user_id: str = Field(..., title="User ID")
+    plan_id: int = Field(..., title="Plan ID", description="The user's copy of the template")
+
+
 class MeasureType(str, Enum):
     GRAM = "gram"
     UNIT = "unit"
@@ -228,6 +277,35 @@ class FoodLinkDTO(FoodTimeDTO):
         description="Unique identifier for the food item",
     )
 
+
+class SlotOperationType(str, Enum):
+    SET = "set"
+    REPLACE = "replace"
+    CLEAR = "clear"
+
+
+class SlotOperationDTO(FoodTimeDTO):
+    op: SlotOperationType = Field(
+        ...,
+        title="Operation",
+        description="set fills an empty slot, replace changes the food of a filled one and clear empties it",
+    )
+    food_id: Optional[int] = Field(
+        None,
+        title="Food ID",
+        description="Food of the slot, required by set and replace",
+    )
+
+
+class PlanSlotsBatchDTO(BaseModel):
+    operations: List[SlotOperationDTO] = Field(
+        ...,
+        title="Operations",
+        description="Slot operations applied together, each slot at most once",
+        min_length=1,
+        max_length=100,
+    )
+
 class ExtraFoodDTO(BaseModel):
     name: str = Field(
         ...,
@@ -283,3 +361,43 @@ class ExtraFood(ExtraFoodDTO):
         title="Creation date",
         description="Date when the food item was created",
     )
+
+class NutritionValues(BaseModel):
+    calories: float = Field(..., description="Calories")
+    protein: float = Field(..., description="Protein in grams")
+    carbs: float = Field(..., description="Carbohydrates in grams")
+    fiber: float = Field(..., description="Fiber in grams")
+    saturated_fats: float = Field(..., description="Saturated fats in grams")
+    monounsaturated_fats: float = Field(..., description="Monounsaturated fats in grams")
+    polyunsaturated_fats: float = Field(..., description="Polyunsaturated fats in grams")
+    trans_fats: float = Field(..., description="Trans fats in grams")
+    cholesterol: float = Field(..., description="Cholesterol in mg")
+
+class DayNutrition(BaseModel):
+    total: NutritionValues = Field(
+        ...,
+        title="Day total",
+        description="Sum of every meal of the day",
+    )
+    moments: Dict[str, Optional[NutritionValues]] = Field(
+        ...,
+        title="Meals",
+        description="Nutrition of the food assigned to each moment, null when there is none",
+    )
+
+class PlanNutrition(BaseModel):
+    id_plan: int = Field(
+        ...,
+        title="Plan ID",
+        description="Unique identifier for the plan",
+    )
+    week: NutritionValues = Field(
+        ...,
+        title="Week total",
+        description="Sum of every meal of the week",
+    )
+    days: Dict[str, DayNutrition] = Field(
+        ...,
+        title="Days",
+        description="Totals and meals of each day of the week",
+    )
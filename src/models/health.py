@@ -7,3 +7,36 @@ class Health(BaseModel):
 
 class HealthDB(BaseModel):
     db_health: str
+
+
+class ResponseCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
+    size: int
+    max_size: int
+    shared_enabled: bool
+    shared_hits: int
+    shared_misses: int
+    shared_errors: int
+
+
+class TokenCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    size: int
+    max_size: int
+
+
+class LogPipelineStats(BaseModel):
+    queued: int
+    queue_size: int
+    written: int
+    dropped: int
+    running: bool
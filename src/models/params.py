@@ -18,8 +18,14 @@ class PostPlanBody(BaseModel):
     )
 
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
 class GetAllFoodsParams:
     search_name: Optional[str] = None
+    cursor: Optional[int] = None
+    limit: int = DEFAULT_PAGE_SIZE
 
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+
+class PushTokenDTO(BaseModel):
+    token: str = Field(
+        ...,
+        title="Push token",
+        description="Expo push token of the user's device",
+        examples=["ExponentPushToken[xxxxxxxxxxxxxxxxxxxxxx]"],
+        min_length=1,
+        max_length=255,
+    )
@@ -1,4 +1,4 @@
-from typing import Generic, TypeVar
+from typing import Generic, Optional, TypeVar
 from pydantic import BaseModel, Field
 
 T = TypeVar("T")
@@ -8,6 +8,15 @@ class CustomResponse(BaseModel, Generic[T]):
     data: T
 
 
+class PaginatedResponse(BaseModel, Generic[T]):
+    data: list[T]
+    next_cursor: Optional[int] = Field(
+        None,
+        description="Cursor to request the next page with, null on the last page",
+        title="Next cursor",
+    )
+
+
 class ErrorDTO(BaseModel):
     type: str = Field(
         ...,
@@ -0,0 +1,399 @@
+from abc import ABCMeta, abstractmethod
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional, Sequence, List, TypeVar
+from sqlalchemy import Connection, Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from database.database import async_engine
+from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, Plan, PlanAssignment, PlanAssignmentDTO, PlanDTO, PlanTemplate, TemplateInstance, ExtraFood, ExtraFoodDTO
+from models.params import GetAllFoodsParams, GetExtraFoodsParams
+from repository.food_repository import STREAM_BATCH_SIZE, FoodRepository
+
+T = TypeVar("T")
+
+
+class IAsyncFoodRepository(metaclass=ABCMeta):
+    @abstractmethod
+    def transaction(self) -> AbstractAsyncContextManager["IAsyncFoodRepository"]:
+        pass
+
+    @abstractmethod
+    async def get_plans(self) -> list[Plan]:
+        pass
+
+    @abstractmethod
+    async def get_plan_by_id(self, plan_id: int) -> Optional[Plan]:
+        pass
+
+    @abstractmethod
+    async def get_weekly_plan_by_id(self, plan_id: int) -> Sequence[Row[Any]]:
+        pass
+
+    @abstractmethod
+    async def save_plan(self, plan: PlanDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    async def materialize_plan(self, user_id: str, plan: PlanDTO, slots: list[tuple[int, int, int]]) -> Plan:
+        pass
+
+    @abstractmethod
+    async def apply_slot_operations(self, plan_id: int, operations: list[tuple[str, int, int, Optional[int]]]) -> list[tuple[int, int, Food]]:
+        pass
+
+    @abstractmethod
+    async def set_plan_template(self, plan_id: int, is_template: bool) -> Optional[PlanTemplate]:
+        pass
+
+    @abstractmethod
+    async def clone_plan(self, plan_id: int, title: Optional[str]) -> Optional[Plan]:
+        pass
+
+    @abstractmethod
+    async def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        pass
+
+    @abstractmethod
+    async def get_plan_by_user_id(self, user_id: str) -> Optional[Plan]:
+        pass
+
+    @abstractmethod
+    async def save_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
+        pass
+
+    @abstractmethod
+    async def update_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
+        pass
+
+    @abstractmethod
+    async def get_foods_from_plan(self, plan_id: int) -> list[Food]:
+        pass
+
+    @abstractmethod
+    async def remove_food_from_plan(self, plan_id: int, data: FoodTimeDTO) -> None:
+        pass
+
+    @abstractmethod
+    async def update_food_weekly_plan(self, plan_id: int, data: FoodLinkDTO) -> Food:
+        pass
+
+    @abstractmethod
+    async def save_food_weekly_plan(self, plan_id: int, day: int, moment: int, food_id: int) -> Food:
+        pass
+
+    @abstractmethod
+    async def get_day_by_name(self, day: str) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    async def get_moment_by_name(self, moment: str) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    async def get_matching_food_ids(self, foods: list[str]) -> list[int]:
+        pass
+
+    @abstractmethod
+    async def get_days(self) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def get_moments(self) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def get_food_by_id_from_plan(self, plan_id: int, food_id: int) -> Optional[Food]:
+        pass
+
+    @abstractmethod
+    async def get_food_by_id(self, food_id: int) -> Optional[Food]:
+        pass
+
+    @abstractmethod
+    async def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
+        pass
+
+    @abstractmethod
+    def stream_all_foods(self, params: GetAllFoodsParams) -> AsyncIterator[Food]:
+        pass
+
+    @abstractmethod
+    async def search_foods(self, search_name: str, limit: int) -> list[Food]:
+        pass
+
+    @abstractmethod
+    async def save_food(self, food: FoodDTO) -> Food:
+        pass
+
+    @abstractmethod
+    async def save_ingredient(self, ingredient: IngredientDTO) -> Ingredient:
+        pass
+
+    @abstractmethod
+    async def save_food_ingredients(self, food_id: int, ingredients: List[FoodIngredientDTO]) -> None:
+        pass
+
+    @abstractmethod
+    async def save_extra_food_ingredients(self, extraFoodId: int, ingredients: List[FoodIngredientDTO]) -> None:
+        pass
+
+    @abstractmethod
+    async def link_food_to_plan(self, food_id: int, plan_id: int, day_id: Optional[int], meal_moment_id: Optional[int]) -> None:
+        pass
+
+    @abstractmethod
+    async def save_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> ExtraFood:
+        pass
+
+    @abstractmethod
+    async def link_extra_food_with_user(self, extraFoodId: int, userid: str) -> None:
+        pass
+
+    @abstractmethod
+    async def get_extra_foods(self, params: GetExtraFoodsParams) -> list[ExtraFood]:
+        pass
+
+    @abstractmethod
+    async def get_all_ingredients(self) -> list[Ingredient]:
+        pass
+
+    @abstractmethod
+    async def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def get_nutritional_values(self, food_id: Optional[int], extraFood_id: Optional[int]) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    async def get_ingredients_by_food_id(self, food_id: Optional[int], extraFoodId: Optional[int]) -> list[FoodIngredientDTO]:
+        pass
+
+    @abstractmethod
+    async def get_plan_ingredients(self, plan_id: int) -> Sequence[Row[Any]]:
+        pass
+
+    @abstractmethod
+    async def get_nutritional_values_by_ids(self, food_ids: Optional[list[int]], extraFood_ids: Optional[list[int]]) -> dict[int, dict]:
+        pass
+
+    @abstractmethod
+    async def refresh_food_nutrition(self, food_ids: Optional[list[int]]) -> None:
+        pass
+
+    @abstractmethod
+    async def refresh_extra_food_nutrition(self, extra_food_ids: Optional[list[int]]) -> None:
+        pass
+
+    @abstractmethod
+    async def get_plans_version(self) -> str:
+        pass
+
+    @abstractmethod
+    async def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def get_food_version(self, food_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def get_ingredients_version(self) -> str:
+        pass
+
+
+class AsyncFoodRepository(IAsyncFoodRepository):
+    """
+    Asyncio counterpart of FoodRepository.
+
+    Queries are not duplicated: every operation runs the sync repository
+    against a connection adapted from the async engine with `run_sync`, so the
+    statements go through asyncpg without blocking the event loop.
+    """
+
+    def __init__(self, engine_: Optional[AsyncEngine] = None, connection: Optional[AsyncConnection] = None):
+        _engine = engine_ or async_engine
+
+        if _engine is None:
+            raise ValueError(
+                "Async database engine is not configured, set ASYNC_DATABASE=true")
+
+        self.engine: AsyncEngine = _engine
+        self.connection = connection
+
+    async def _run(self, operation: Callable[[FoodRepository], T]) -> T:
+        def _operation(connection: Connection) -> T:
+            return operation(FoodRepository(connection=connection))
+
+        if self.connection is not None:
+            return await self.connection.run_sync(_operation)
+
+        async with self.engine.begin() as connection:
+            return await connection.run_sync(_operation)
+
+    @asynccontextmanager
+    async def _connect(self) -> AsyncIterator[AsyncConnection]:
+        if self.connection is not None:
+            yield self.connection
+            return
+
+        async with self.engine.connect() as connection:
+            yield connection
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["AsyncFoodRepository"]:
+        """
+        Unit of work spanning several repository calls, see
+        FoodRepository.transaction
+        """
+        if self.connection is not None:
+            yield self
+            return
+
+        async with self.engine.begin() as connection:
+            yield AsyncFoodRepository(self.engine, connection)
+
+    async def get_plans(self) -> list[Plan]:
+        return await self._run(lambda repository: repository.get_plans())
+
+    async def get_plan_by_id(self, plan_id: int) -> Optional[Plan]:
+        return await self._run(lambda repository: repository.get_plan_by_id(plan_id))
+
+    async def get_weekly_plan_by_id(self, plan_id: int) -> Sequence[Row[Any]]:
+        return await self._run(lambda repository: repository.get_weekly_plan_by_id(plan_id))
+
+    async def save_plan(self, plan: PlanDTO) -> Plan:
+        return await self._run(lambda repository: repository.save_plan(plan))
+
+    async def materialize_plan(self, user_id: str, plan: PlanDTO, slots: list[tuple[int, int, int]]) -> Plan:
+        return await self._run(lambda repository: repository.materialize_plan(user_id, plan, slots))
+
+    async def apply_slot_operations(self, plan_id: int, operations: list[tuple[str, int, int, Optional[int]]]) -> list[tuple[int, int, Food]]:
+        return await self._run(lambda repository: repository.apply_slot_operations(plan_id, operations))
+
+    async def set_plan_template(self, plan_id: int, is_template: bool) -> Optional[PlanTemplate]:
+        return await self._run(lambda repository: repository.set_plan_template(plan_id, is_template))
+
+    async def clone_plan(self, plan_id: int, title: Optional[str]) -> Optional[Plan]:
+        return await self._run(lambda repository: repository.clone_plan(plan_id, title))
+
+    async def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        return await self._run(lambda repository: repository.instantiate_template(template_id, user_ids))
+
+    async def get_plan_by_user_id(self, user_id: str) -> Optional[Plan]:
+        return await self._run(lambda repository: repository.get_plan_by_user_id(user_id))
+
+    async def save_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
+        return await self._run(lambda repository: repository.save_user_plan(user_id, assignment))
+
+    async def update_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
+        return await self._run(lambda repository: repository.update_user_plan(user_id, assignment))
+
+    async def get_foods_from_plan(self, plan_id: int) -> list[Food]:
+        return await self._run(lambda repository: repository.get_foods_from_plan(plan_id))
+
+    async def remove_food_from_plan(self, plan_id: int, data: FoodTimeDTO) -> None:
+        return await self._run(lambda repository: repository.remove_food_from_plan(plan_id, data))
+
+    async def update_food_weekly_plan(self, plan_id: int, data: FoodLinkDTO) -> Food:
+        return await self._run(lambda repository: repository.update_food_weekly_plan(plan_id, data))
+
+    async def save_food_weekly_plan(self, plan_id: int, day: int, moment: int, food_id: int) -> Food:
+        return await self._run(lambda repository: repository.save_food_weekly_plan(plan_id, day, moment, food_id))
+
+    async def get_day_by_name(self, day: str) -> Optional[int]:
+        return await self._run(lambda repository: repository.get_day_by_name(day))
+
+    async def get_moment_by_name(self, moment: str) -> Optional[int]:
+        return await self._run(lambda repository: repository.get_moment_by_name(moment))
+
+    async def get_matching_food_ids(self, foods: list[str]) -> list[int]:
+        return await self._run(lambda repository: repository.get_matching_food_ids(foods))
+
+    async def get_days(self) -> list[dict]:
+        return await self._run(lambda repository: repository.get_days())
+
+    async def get_moments(self) -> list[dict]:
+        return await self._run(lambda repository: repository.get_moments())
+
+    async def get_food_by_id_from_plan(self, plan_id: int, food_id: int) -> Optional[Food]:
+        return await self._run(lambda repository: repository.get_food_by_id_from_plan(plan_id, food_id))
+
+    async def get_food_by_id(self, food_id: int) -> Optional[Food]:
+        return await self._run(lambda repository: repository.get_food_by_id(food_id))
+
+    async def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
+        return await self._run(lambda repository: repository.get_all_foods(params))
+
+    async def stream_all_foods(self, params: GetAllFoodsParams) -> AsyncIterator[Food]:
+        query, _params = FoodRepository.all_foods_query(params, paginated=False)
+
+        async with self._connect() as connection:
+            result = await connection.stream(
+                query, _params, execution_options={"yield_per": STREAM_BATCH_SIZE}
+            )
+
+            async for row in result:
+                yield Food(**row._mapping)
+
+    async def search_foods(self, search_name: str, limit: int) -> list[Food]:
+        return await self._run(lambda repository: repository.search_foods(search_name, limit))
+
+    async def save_food(self, food: FoodDTO) -> Food:
+        return await self._run(lambda repository: repository.save_food(food))
+
+    async def save_ingredient(self, ingredient: IngredientDTO) -> Ingredient:
+        return await self._run(lambda repository: repository.save_ingredient(ingredient))
+
+    async def save_food_ingredients(self, food_id: int, ingredients: List[FoodIngredientDTO]) -> None:
+        return await self._run(lambda repository: repository.save_food_ingredients(food_id, ingredients))
+
+    async def save_extra_food_ingredients(self, extraFoodId: int, ingredients: List[FoodIngredientDTO]) -> None:
+        return await self._run(lambda repository: repository.save_extra_food_ingredients(extraFoodId, ingredients))
+
+    async def link_food_to_plan(self, food_id: int, plan_id: int, day_id: Optional[int], meal_moment_id: Optional[int]) -> None:
+        return await self._run(lambda repository: repository.link_food_to_plan(food_id, plan_id, day_id, meal_moment_id))
+
+    async def save_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> ExtraFood:
+        return await self._run(lambda repository: repository.save_extra_food(extraFood, userId))
+
+    async def link_extra_food_with_user(self, extraFoodId: int, userid: str) -> None:
+        return await self._run(lambda repository: repository.link_extra_food_with_user(extraFoodId, userid))
+
+    async def get_extra_foods(self, params: GetExtraFoodsParams) -> list[ExtraFood]:
+        return await self._run(lambda repository: repository.get_extra_foods(params))
+
+    async def get_all_ingredients(self) -> list[Ingredient]:
+        return await self._run(lambda repository: repository.get_all_ingredients())
+
+    async def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        return await self._run(lambda repository: repository.search_ingredients(search_name, limit))
+
+    async def get_nutritional_values(self, food_id: Optional[int], extraFood_id: Optional[int]) -> Optional[dict]:
+        return await self._run(lambda repository: repository.get_nutritional_values(food_id, extraFood_id))
+
+    async def get_ingredients_by_food_id(self, food_id: Optional[int], extraFoodId: Optional[int]) -> list[FoodIngredientDTO]:
+        return await self._run(lambda repository: repository.get_ingredients_by_food_id(food_id, extraFoodId))
+
+    async def get_plan_ingredients(self, plan_id: int) -> Sequence[Row[Any]]:
+        return await self._run(lambda repository: repository.get_plan_ingredients(plan_id))
+
+    async def get_nutritional_values_by_ids(self, food_ids: Optional[list[int]], extraFood_ids: Optional[list[int]]) -> dict[int, dict]:
+        return await self._run(lambda repository: repository.get_nutritional_values_by_ids(food_ids, extraFood_ids))
+
+    async def refresh_food_nutrition(self, food_ids: Optional[list[int]]) -> None:
+        return await self._run(lambda repository: repository.refresh_food_nutrition(food_ids))
+
+    async def refresh_extra_food_nutrition(self, extra_food_ids: Optional[list[int]]) -> None:
+        return await self._run(lambda repository: repository.refresh_extra_food_nutrition(extra_food_ids))
+
+    async def get_plans_version(self) -> str:
+        return await self._run(lambda repository: repository.get_plans_version())
+
+    async def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        return await self._run(lambda repository: repository.get_weekly_plan_version(plan_id))
+
+    async def get_food_version(self, food_id: int) -> Optional[str]:
+        return await self._run(lambda repository: repository.get_food_version(food_id))
+
+    async def get_ingredients_version(self) -> str:
+        return await self._run(lambda repository: repository.get_ingredients_version())
@@ -0,0 +1,340 @@
+import csv
+import io
+from abc import ABCMeta, abstractmethod
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any, Iterator, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Connection, Engine, text
+
+from database.database import engine
+from metrics.database import instrument_repository
+from models.catalog_import import ImportKind, ImportRowError
+
+# Staging table of every kind, with the columns copied into it after the
+# line of the row in the input
+STAGING: dict[ImportKind, tuple[str, tuple[str, ...]]] = {
+    ImportKind.INGREDIENTS: ("import_ingredients", (
+        "name", "measure_type", "calories", "protein", "carbs", "fiber", "saturated_fats",
+        "monounsaturated_fats", "polyunsaturated_fats", "trans_fats", "cholesterol")),
+    ImportKind.FOODS: ("import_foods", ("name", "description", "price", "image_url")),
+    ImportKind.FOOD_INGREDIENTS: ("import_food_ingredients", ("food", "ingredient", "quantity")),
+}
+
+CREATE_STAGING = {
+    ImportKind.INGREDIENTS: """
+        CREATE TEMPORARY TABLE import_ingredients (
+            line INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            measure_type TEXT NOT NULL,
+            calories FLOAT NOT NULL,
+            protein FLOAT NOT NULL,
+            carbs FLOAT NOT NULL,
+            fiber FLOAT NOT NULL,
+            saturated_fats FLOAT NOT NULL,
+            monounsaturated_fats FLOAT NOT NULL,
+            polyunsaturated_fats FLOAT NOT NULL,
+            trans_fats FLOAT NOT NULL,
+            cholesterol FLOAT NOT NULL
+        ) ON COMMIT DROP
+    """,
+    ImportKind.FOODS: """
+        CREATE TEMPORARY TABLE import_foods (
+            line INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            price NUMERIC(10, 2) NOT NULL,
+            image_url TEXT
+        ) ON COMMIT DROP
+    """,
+    ImportKind.FOOD_INGREDIENTS: """
+        CREATE TEMPORARY TABLE import_food_ingredients (
+            line INTEGER NOT NULL,
+            food TEXT NOT NULL,
+            ingredient TEXT NOT NULL,
+            quantity FLOAT NOT NULL
+        ) ON COMMIT DROP
+    """,
+}
+
+# Names are matched ignoring case. When the input has the same name twice the
+# last row wins, when the table does the oldest row is updated.
+MERGE_INGREDIENTS = text("""
+    WITH latest AS (
+        SELECT DISTINCT ON (lower(name)) *
+        FROM import_ingredients
+        ORDER BY lower(name), line DESC
+    ),
+    existing AS (
+        SELECT DISTINCT ON (lower(name)) lower(name) AS key, id
+        FROM ingredients
+        ORDER BY lower(name), id
+    ),
+    updated AS (
+        UPDATE ingredients i
+        SET
+            measure_type = l.measure_type,
+            calories = l.calories,
+            protein = l.protein,
+            carbs = l.carbs,
+            fiber = l.fiber,
+            saturated_fats = l.saturated_fats,
+            monounsaturated_fats = l.monounsaturated_fats,
+            polyunsaturated_fats = l.polyunsaturated_fats,
+            trans_fats = l.trans_fats,
+            cholesterol = l.cholesterol
+        FROM latest l
+        JOIN existing e ON e.key = lower(l.name)
+        WHERE i.id = e.id
+            AND (i.measure_type, i.calories, i.protein, i.carbs, i.fiber, i.saturated_fats,
+                 i.monounsaturated_fats, i.polyunsaturated_fats, i.trans_fats, i.cholesterol)
+                IS DISTINCT FROM
+                (l.measure_type, l.calories, l.protein, l.carbs, l.fiber, l.saturated_fats,
+                 l.monounsaturated_fats, l.polyunsaturated_fats, l.trans_fats, l.cholesterol)
+        RETURNING i.id
+    ),
+    inserted AS (
+        INSERT INTO ingredients (name, measure_type, calories, protein, carbs, fiber, saturated_fats,
+                                 monounsaturated_fats, polyunsaturated_fats, trans_fats, cholesterol)
+        SELECT l.name, l.measure_type, l.calories, l.protein, l.carbs, l.fiber, l.saturated_fats,
+               l.monounsaturated_fats, l.polyunsaturated_fats, l.trans_fats, l.cholesterol
+        FROM latest l
+        WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.key = lower(l.name))
+        ORDER BY l.line
+        RETURNING id
+    )
+    SELECT
+        (SELECT count(*) FROM inserted) AS inserted,
+        (SELECT count(*) FROM updated) AS updated,
+        ARRAY(
+            SELECT DISTINCT fi.food_id
+            FROM food_ingredients fi
+            JOIN updated u ON u.id = fi.ingredient_id
+        ) AS food_ids,
+        ARRAY(
+            SELECT DISTINCT efi.id_extra_food
+            FROM extrafood_ingredient efi
+            JOIN updated u ON u.id = efi.ingredient_id
+        ) AS extra_food_ids
+""")
+
+MERGE_FOODS = text("""
+    WITH latest AS (
+        SELECT DISTINCT ON (lower(name)) *
+        FROM import_foods
+        ORDER BY lower(name), line DESC
+    ),
+    existing AS (
+        SELECT DISTINCT ON (lower(name)) lower(name) AS key, id
+        FROM foods
+        ORDER BY lower(name), id
+    ),
+    updated AS (
+        UPDATE foods f
+        SET description = l.description, price = l.price, image_url = l.image_url
+        FROM latest l
+        JOIN existing e ON e.key = lower(l.name)
+        WHERE f.id = e.id
+            AND (f.description, f.price, f.image_url) IS DISTINCT FROM (l.description, l.price, l.image_url)
+        RETURNING f.id
+    ),
+    inserted AS (
+        INSERT INTO foods (name, description, price, image_url)
+        SELECT l.name, l.description, l.price, l.image_url
+        FROM latest l
+        WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.key = lower(l.name))
+        ORDER BY l.line
+        RETURNING id
+    )
+    SELECT
+        (SELECT count(*) FROM inserted) AS inserted,
+        (SELECT count(*) FROM updated) AS updated,
+        ARRAY(SELECT id FROM updated) AS food_ids
+""")
+
+# Names resolved to ids, the oldest row when a name is repeated
+_RESOLVE_LINKS = """
+    foods_by_name AS (
+        SELECT DISTINCT ON (lower(name)) lower(name) AS key, id
+        FROM foods
+        ORDER BY lower(name), id
+    ),
+    ingredients_by_name AS (
+        SELECT DISTINCT ON (lower(name)) lower(name) AS key, id
+        FROM ingredients
+        ORDER BY lower(name), id
+    ),
+    resolved AS (
+        SELECT s.line, s.food, s.ingredient, s.quantity, f.id AS food_id, i.id AS ingredient_id
+        FROM import_food_ingredients s
+        LEFT JOIN foods_by_name f ON f.key = lower(s.food)
+        LEFT JOIN ingredients_by_name i ON i.key = lower(s.ingredient)
+    )
+"""
+
+UNRESOLVED_LINKS = text(f"""
+    WITH {_RESOLVE_LINKS}
+    SELECT
+        line,
+        food,
+        ingredient,
+        food_id IS NULL AS unknown_food,
+        ingredient_id IS NULL AS unknown_ingredient,
+        count(*) OVER () AS total
+    FROM resolved
+    WHERE food_id IS NULL OR ingredient_id IS NULL
+    ORDER BY line
+    LIMIT :limit
+""")
+
+MERGE_LINKS = text(f"""
+    WITH {_RESOLVE_LINKS},
+    latest AS (
+        SELECT DISTINCT ON (food_id, ingredient_id) food_id, ingredient_id, quantity
+        FROM resolved
+        WHERE food_id IS NOT NULL AND ingredient_id IS NOT NULL
+        ORDER BY food_id, ingredient_id, line DESC
+    ),
+    merged AS (
+        INSERT INTO food_ingredients (food_id, ingredient_id, quantity)
+        SELECT food_id, ingredient_id, quantity
+        FROM latest
+        ON CONFLICT (food_id, ingredient_id) DO UPDATE
+        SET quantity = EXCLUDED.quantity
+        WHERE food_ingredients.quantity IS DISTINCT FROM EXCLUDED.quantity
+        RETURNING food_id, xmax = 0 AS inserted
+    )
+    SELECT
+        count(*) FILTER (WHERE inserted) AS inserted,
+        count(*) FILTER (WHERE NOT inserted) AS updated,
+        ARRAY(SELECT DISTINCT food_id FROM merged) AS food_ids
+    FROM merged
+""")
+
+# Plans embedding the foods, their cached responses are stale after a merge
+PLANS_OF_FOODS = text("""
+    SELECT plan_id FROM foodplanlink WHERE food_id = ANY(:food_ids)
+    UNION
+    SELECT plan_id FROM foodplanlink_general WHERE food_id = ANY(:food_ids)
+""")
+
+
+class MergeResult(NamedTuple):
+    inserted: int
+    updated: int
+    # Rows left out by the merge, e.g. links to unknown foods
+    rejected: int
+    errors: list[ImportRowError]
+    # Foods whose data or nutrition changed
+    food_ids: list[int]
+    # Plans with any of those foods
+    plan_ids: list[int]
+    # Extra foods whose nutrition changed
+    extra_food_ids: list[int]
+
+
+class ICatalogImportRepository(metaclass=ABCMeta):
+    @abstractmethod
+    def transaction(self) -> AbstractContextManager["ICatalogImportRepository"]:
+        pass
+
+    @abstractmethod
+    def create_staging(self, kind: ImportKind) -> None:
+        pass
+
+    @abstractmethod
+    def copy_to_staging(self, kind: ImportKind, rows: Sequence[tuple[Any, ...]]) -> None:
+        pass
+
+    @abstractmethod
+    def merge(self, kind: ImportKind, max_errors: int) -> MergeResult:
+        pass
+
+
+@instrument_repository
+class CatalogImportRepository(ICatalogImportRepository):
+    """
+    Bulk loads of the catalog: rows are copied into a temporary staging table
+    with COPY and merged into the real table with a few set-based statements,
+    all in one transaction.
+    """
+
+    def __init__(self, engine_: Optional[Engine] = None, connection: Optional[Connection] = None):
+        self.engine = engine_ or engine
+        self.connection = connection
+
+    @contextmanager
+    def transaction(self) -> Iterator["CatalogImportRepository"]:
+        """
+        Yields a repository bound to a single connection, the staging tables
+        only exist in its transaction
+        """
+        if self.connection is not None:
+            yield self
+            return
+
+        with self.engine.begin() as connection:
+            yield CatalogImportRepository(self.engine, connection)
+
+    def _connection(self) -> Connection:
+        if self.connection is None:
+            raise RuntimeError("Catalog imports run inside transaction()")
+
+        return self.connection
+
+    def create_staging(self, kind: ImportKind) -> None:
+        self._connection().execute(text(CREATE_STAGING[kind]))
+
+    def copy_to_staging(self, kind: ImportKind, rows: Sequence[tuple[Any, ...]]) -> None:
+        """
+        Args:
+            rows: Values of the staging columns, line first
+        """
+        table, columns = STAGING[kind]
+
+        # CSV quoting copes with any text, empty unquoted values are NULL
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        cursor = self._connection().connection.cursor()
+        cursor.copy_expert(f"COPY {table} (line, {', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def merge(self, kind: ImportKind, max_errors: int) -> MergeResult:
+        connection = self._connection()
+        rejected = 0
+        errors: list[ImportRowError] = []
+        extra_food_ids: list[int] = []
+
+        if kind == ImportKind.INGREDIENTS:
+            # The nutrition of their foods is refreshed by the ingredients trigger
+            result = connection.execute(MERGE_INGREDIENTS).one()
+            extra_food_ids = list(result.extra_food_ids)
+        elif kind == ImportKind.FOODS:
+            result = connection.execute(MERGE_FOODS).one()
+        else:
+            unresolved = connection.execute(UNRESOLVED_LINKS, {"limit": max_errors}).fetchall()
+            rejected = unresolved[0].total if unresolved else 0
+            errors = [
+                ImportRowError(line=row.line, error=", ".join(
+                    message for missing, message in (
+                        (row.unknown_food, f"Unknown food {row.food!r}"),
+                        (row.unknown_ingredient, f"Unknown ingredient {row.ingredient!r}")
+                    ) if missing))
+                for row in unresolved
+            ]
+
+            result = connection.execute(MERGE_LINKS).one()
+
+        food_ids = list(result.food_ids)
+        plan_ids: list[int] = []
+
+        if food_ids:
+            if kind == ImportKind.FOOD_INGREDIENTS:
+                connection.execute(
+                    text("SELECT refresh_food_nutrition(CAST(:food_ids AS INTEGER[]))"),
+                    {"food_ids": food_ids}
+                )
+
+            plan_ids = list(connection.execute(PLANS_OF_FOODS, {"food_ids": food_ids}).scalars())
+
+        return MergeResult(result.inserted, result.updated, rejected, errors, food_ids, plan_ids, extra_food_ids)
@@ -0,0 +1,156 @@
+from abc import ABCMeta, abstractmethod
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import Engine, TextClause, text
+
+from database.database import engine
+from metrics.database import instrument_repository
+from models.export import ExportKind, ExportParams
+
+# Rows fetched from the server side cursor at a time
+EXPORT_BATCH_SIZE = 2000
+
+FOODS = text("""
+    SELECT
+        f.id,
+        f.name,
+        f.description,
+        CAST(f.price AS FLOAT) AS price,
+        f.image_url,
+        f.created_at,
+        n.calories,
+        n.protein,
+        n.carbs,
+        n.fiber,
+        n.saturated_fats,
+        n.monounsaturated_fats,
+        n.polyunsaturated_fats,
+        n.trans_fats,
+        n.cholesterol
+    FROM foods f
+    LEFT JOIN food_nutrition n ON n.food_id = f.id
+    ORDER BY f.id
+""")
+
+# Slots as {day: {moment: {id, name}}}, in week and meal order
+PLANS = text("""
+    SELECT
+        p.id_plan,
+        p.title,
+        p.plan_description,
+        p.objetive,
+        p.created_at,
+        COALESCE(grid.slots, '{}'::json) AS slots,
+        COALESCE(general.food_ids, '{}') AS general_food_ids
+    FROM plans p
+    LEFT JOIN LATERAL (
+        SELECT json_object_agg(days.day, days.moments ORDER BY days.day_id) AS slots
+        FROM (
+            SELECT
+                d.id AS day_id,
+                d.name AS day,
+                json_object_agg(m.name, json_build_object('id', f.id, 'name', f.name) ORDER BY m.id) AS moments
+            FROM foodplanlink l
+            JOIN week_days d ON d.id = l.day_id
+            JOIN meal_moments m ON m.id = l.meal_moment_id
+            JOIN foods f ON f.id = l.food_id
+            WHERE l.plan_id = p.id_plan
+            GROUP BY d.id, d.name
+        ) days
+    ) grid ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT array_agg(g.food_id ORDER BY g.food_id) AS food_ids
+        FROM foodplanlink_general g
+        WHERE g.plan_id = p.id_plan
+    ) general ON TRUE
+    ORDER BY p.id_plan
+""")
+
+_USER_RANGE = """
+    (CAST(:user_id AS VARCHAR) IS NULL OR {user} = :user_id)
+    AND (CAST(:start_date AS DATE) IS NULL OR {day} >= :start_date)
+    AND (CAST(:end_date AS DATE) IS NULL OR {day} < CAST(:end_date AS DATE) + 1)
+"""
+
+EXTRA_FOODS = text(f"""
+    SELECT
+        l.id_user,
+        e.id_extra_food,
+        e.name,
+        e.description,
+        e.image_url,
+        e.day,
+        e.moment,
+        e.date,
+        e.created_at,
+        n.calories,
+        n.protein,
+        n.carbs,
+        n.fiber,
+        n.saturated_fats,
+        n.monounsaturated_fats,
+        n.polyunsaturated_fats,
+        n.trans_fats,
+        n.cholesterol
+    FROM extra_foods e
+    JOIN extrafood_user_link l ON l.id_extra_food = e.id_extra_food
+    LEFT JOIN extra_food_nutrition n ON n.id_extra_food = e.id_extra_food
+    WHERE {_USER_RANGE.format(user="l.id_user", day="e.date")}
+    ORDER BY l.id_user, e.date, e.id_extra_food
+""")
+
+WATER_CONSUMPTION = text(f"""
+    SELECT
+        w.id_user,
+        w.consumption_id,
+        w.consumption_date,
+        w.amount_ml,
+        w.created_at
+    FROM water_consumption w
+    WHERE {_USER_RANGE.format(user="w.id_user", day="w.consumption_date")}
+    ORDER BY w.id_user, w.consumption_date, w.consumption_id
+""")
+
+NUTRITION_COLUMNS = ["calories", "protein", "carbs", "fiber", "saturated_fats", "monounsaturated_fats",
+                     "polyunsaturated_fats", "trans_fats", "cholesterol"]
+
+# Query of every export with the columns it returns, the CSV header
+EXPORTS: dict[ExportKind, tuple[TextClause, list[str]]] = {
+    ExportKind.FOODS: (FOODS, ["id", "name", "description", "price", "image_url", "created_at", *NUTRITION_COLUMNS]),
+    ExportKind.PLANS: (PLANS, ["id_plan", "title", "plan_description", "objetive", "created_at", "slots", "general_food_ids"]),
+    ExportKind.EXTRA_FOODS: (EXTRA_FOODS, ["id_user", "id_extra_food", "name", "description", "image_url", "day",
+                                           "moment", "date", "created_at", *NUTRITION_COLUMNS]),
+    ExportKind.WATER_CONSUMPTION: (WATER_CONSUMPTION, ["id_user", "consumption_id", "consumption_date", "amount_ml", "created_at"]),
+}
+
+
+class IExportRepository(metaclass=ABCMeta):
+    @abstractmethod
+    def stream_rows(self, kind: ExportKind, params: ExportParams) -> Iterator[tuple[Any, ...]]:
+        pass
+
+
+@instrument_repository
+class ExportRepository(IExportRepository):
+    def __init__(self, engine_: Optional[Engine] = None):
+        self.engine = engine_ or engine
+
+    def stream_rows(self, kind: ExportKind, params: ExportParams) -> Iterator[tuple[Any, ...]]:
+        """
+        Rows of the export, in the order of its EXPORTS columns. The connection
+        is held until the rows are exhausted or the iterator closed.
+        """
+        query, _ = EXPORTS[kind]
+
+        # Server side cursor, rows are fetched in batches as they are consumed
+        with self.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=EXPORT_BATCH_SIZE
+            ).execute(query, {
+                "user_id": params.user_id,
+                "start_date": params.start_date,
+                "end_date": params.end_date,
+            })
+
+            for row in result:
+                yield tuple(row)
@@ -1,15 +1,81 @@
 from abc import ABCMeta, abstractmethod
-from typing import Any, Optional, Sequence, List
-from sqlalchemy import Engine, Row, text
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any, Iterator, Optional, Sequence, List
+from sqlalchemy import Connection, Engine, Row, TextClause, text
 from database.database import engine
+from metrics.database import instrument_repository
 from models.errors.errors import EntityAlreadyExistsError, NotFoundError
-from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, Plan, PlanAssignment, PlanAssignmentDTO, PlanDTO, WeeklyPlan, ExtraFood, ExtraFoodDTO
+from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, Plan, PlanAssignment, PlanAssignmentDTO, PlanDTO, PlanTemplate, TemplateInstance, WeeklyPlan, ExtraFood, ExtraFoodDTO
 from models.params import GetAllFoodsParams, GetExtraFoodsParams
 from sqlalchemy.exc import IntegrityError
 from models.foodPlans import MeasureType
 
+# Rows fetched per round-trip when streaming through a server side cursor
+STREAM_BATCH_SIZE = 1000
+
+
+def _clone_plans_query(templates_only: bool, assign: bool) -> TextClause:
+    """
+    Copies the plan :plan_id, its slots and its general foods once per entry
+    of :user_ids with INSERT ... SELECT, in a single statement. Plan ids are
+    taken up front, so every copy is known along with its user and assigned
+    to it when assign is set. Returns no rows when the plan does not exist,
+    or is not a template when templates_only is set.
+    """
+    assignment = """,
+        assignment AS (
+            INSERT INTO users (id_user, id_plan, updated_at)
+            SELECT c.user_id, c.id_plan, NOW()
+            FROM copies c
+            ON CONFLICT (id_user) DO UPDATE
+            SET
+                id_plan = EXCLUDED.id_plan,
+                updated_at = EXCLUDED.updated_at
+        )""" if assign else ""
+
+    return text(f"""
+        WITH source AS (
+            SELECT title, plan_description, objetive
+            FROM plans
+            WHERE id_plan = :plan_id {"AND is_template" if templates_only else ""}
+        ),
+        copies AS (
+            SELECT u.user_id, u.position, nextval(pg_get_serial_sequence('plans', 'id_plan')) AS id_plan
+            FROM source
+            CROSS JOIN unnest(CAST(:user_ids AS VARCHAR[])) WITH ORDINALITY AS u(user_id, position)
+        ),
+        new_plans AS (
+            INSERT INTO plans (id_plan, title, plan_description, objetive)
+            SELECT c.id_plan, COALESCE(CAST(:title AS VARCHAR), s.title), s.plan_description, s.objetive
+            FROM copies c
+            CROSS JOIN source s
+            ORDER BY c.position
+            RETURNING id_plan, title, plan_description, objetive, created_at
+        ),
+        new_slots AS (
+            INSERT INTO foodplanlink (plan_id, day_id, meal_moment_id, food_id, updated_at)
+            SELECT c.id_plan, l.day_id, l.meal_moment_id, l.food_id, NOW()
+            FROM copies c
+            JOIN foodplanlink l ON l.plan_id = :plan_id
+        ),
+        new_general AS (
+            INSERT INTO foodplanlink_general (food_id, plan_id, updated_at)
+            SELECT g.food_id, c.id_plan, NOW()
+            FROM copies c
+            JOIN foodplanlink_general g ON g.plan_id = :plan_id
+        ){assignment}
+        SELECT c.user_id, p.id_plan, p.title, p.plan_description, p.objetive, p.created_at
+        FROM copies c
+        JOIN new_plans p ON p.id_plan = c.id_plan
+        ORDER BY c.position
+    """)
+
 
 class IFoodRepository(metaclass=ABCMeta):
+    @abstractmethod
+    def transaction(self) -> AbstractContextManager["IFoodRepository"]:
+        pass
+
     @abstractmethod
     def get_plans(self) -> list[Plan]:
         pass
@@ -26,6 +92,26 @@ class IFoodRepository(metaclass=ABCMeta):
     def save_plan(self, plan: PlanDTO) -> Plan:
         pass
 
+    @abstractmethod
+    def materialize_plan(self, user_id: str, plan: PlanDTO, slots: list[tuple[int, int, int]]) -> Plan:
+        pass
+
+    @abstractmethod
+    def apply_slot_operations(self, plan_id: int, operations: list[tuple[str, int, int, Optional[int]]]) -> list[tuple[int, int, Food]]:
+        pass
+
+    @abstractmethod
+    def set_plan_template(self, plan_id: int, is_template: bool) -> Optional[PlanTemplate]:
+        pass
+
+    @abstractmethod
+    def clone_plan(self, plan_id: int, title: Optional[str]) -> Optional[Plan]:
+        pass
+
+    @abstractmethod
+    def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        pass
+
     @abstractmethod
     def get_plan_by_user_id(self, user_id: str) -> Optional[Plan]:
         pass
@@ -47,11 +133,11 @@ class IFoodRepository(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def update_food_weekly_plan(self, plan_id: int, data: FoodLinkDTO) -> None:
+    def update_food_weekly_plan(self, plan_id: int, data: FoodLinkDTO) -> Food:
         pass
 
     @abstractmethod
-    def save_food_weekly_plan(self, plan_id: int, day: int, moment: int, food_id: int) -> None:
+    def save_food_weekly_plan(self, plan_id: int, day: int, moment: int, food_id: int) -> Food:
         pass
 
     @abstractmethod
@@ -86,6 +172,14 @@ class IFoodRepository(metaclass=ABCMeta):
     def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
         pass
 
+    @abstractmethod
+    def stream_all_foods(self, params: GetAllFoodsParams) -> Iterator[Food]:
+        pass
+
+    @abstractmethod
+    def search_foods(self, search_name: str, limit: int) -> list[Food]:
+        pass
+
     @abstractmethod
     def save_food(self, food: FoodDTO) -> Food:
         pass
@@ -118,13 +212,81 @@ class IFoodRepository(metaclass=ABCMeta):
     def get_all_ingredients(self) -> list[Ingredient]:
         pass
 
+    @abstractmethod
+    def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        pass
+
     @abstractmethod
     def get_ingredients_by_food_id(self, food_id: Optional[int], extraFoodId:Optional[int]) -> list[FoodIngredientDTO]:
         pass
 
+    @abstractmethod
+    def get_plan_ingredients(self, plan_id: int) -> Sequence[Row[Any]]:
+        pass
+
+    @abstractmethod
+    def get_nutritional_values_by_ids(self, food_ids: Optional[list[int]], extraFood_ids: Optional[list[int]]) -> dict[int, dict]:
+        pass
+
+    @abstractmethod
+    def refresh_food_nutrition(self, food_ids: Optional[list[int]]) -> None:
+        pass
+
+    @abstractmethod
+    def refresh_extra_food_nutrition(self, extra_food_ids: Optional[list[int]]) -> None:
+        pass
+
+    @abstractmethod
+    def get_plans_version(self) -> str:
+        pass
+
+    @abstractmethod
+    def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def get_food_version(self, food_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def get_ingredients_version(self) -> str:
+        pass
+
+@instrument_repository
 class FoodRepository(IFoodRepository):
-    def __init__(self, engine_: Optional[Engine] = None):
+    def __init__(self, engine_: Optional[Engine] = None, connection: Optional[Connection] = None):
         self.engine = engine_ or engine
+        self.connection = connection
+
+    @contextmanager
+    def _begin(self) -> Iterator[Connection]:
+        # When bound to a connection (e.g. driven by the async repository) the
+        # caller owns the transaction, otherwise each call gets its own one.
+        if self.connection is not None:
+            yield self.connection
+            return
+
+        with self.engine.begin() as connection:
+            yield connection
+
+    @contextmanager
+    def transaction(self) -> Iterator["FoodRepository"]:
+        """
+        Unit of work spanning several repository calls
+
+        Yields a repository bound to a single connection, every call made
+        through it shares that connection and is committed once on exit, or
+        rolled back as a whole if anything raises.
+
+        Returns:
+            FoodRepository: The repository bound to the transaction
+        """
+        if self.connection is not None:
+            yield self
+            return
+
+        with self.engine.begin() as connection:
+            yield FoodRepository(self.engine, connection)
 
     def get_plans(self) -> list[Plan]:
         query = text("""
@@ -132,7 +294,7 @@ class FoodRepository(IFoodRepository):
             FROM plans
         """)
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query).fetchall()
 
             return [Plan(**row._mapping) for row in result]
@@ -147,7 +309,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"plan_id": plan_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if result:
@@ -156,29 +318,21 @@ class FoodRepository(IFoodRepository):
     def get_weekly_plan_by_id(self, plan_id: int) -> Sequence[Row[Any]]:
         query = text("""
             SELECT
-                wd.id AS day_id,
-                wd.name AS day_name,
-                mm.id AS meal_moment_id,
-                mm.name AS meal_moment_name,
-                f.id AS food_id,
-                f.name AS food_name,
-                f.description AS food_description,
-                f.price AS food_price,
-                f.created_at AS food_created_at
-            FROM
-                week_days wd
-            CROSS JOIN meal_moments mm
-            LEFT JOIN foodplanlink fpl
-                ON fpl.plan_id = :plan_id
-                AND fpl.day_id = wd.id
-                AND fpl.meal_moment_id = mm.id
-            LEFT JOIN foods f ON f.id = fpl.food_id
-            ORDER BY wd.id, mm.id
+                fpl.day_id,
+                fpl.meal_moment_id,
+                f.id,
+                f.name,
+                f.description,
+                f.price,
+                f.created_at
+            FROM foodplanlink fpl
+            JOIN foods f ON f.id = fpl.food_id
+            WHERE fpl.plan_id = :plan_id
         """)
 
         params = {"plan_id": plan_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             return connection.execute(query, params).fetchall()
 
     def save_plan(self, plan: PlanDTO) -> Plan:
@@ -194,7 +348,67 @@ class FoodRepository(IFoodRepository):
             "objetive": plan.objetive
         }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
+            result = connection.execute(query, params).fetchone()
+
+            if not result:
+                raise Exception("Error saving plan")
+
+            return Plan(**result._mapping)
+
+    def materialize_plan(self, user_id: str, plan: PlanDTO, slots: list[tuple[int, int, int]]) -> Plan:
+        """
+        Creates a plan, fills its weekly grid and assigns it to the user in a
+        single statement
+
+        Args:
+            user_id: The user the plan is assigned to
+            plan: The plan to create
+            slots: (day_id, meal_moment_id, food_id) for every slot of the grid
+
+        Returns:
+            Plan: The created plan
+        """
+        query = text("""
+            WITH new_plan AS (
+                INSERT INTO plans (title, plan_description, objetive)
+                VALUES (:title, :plan_description, :objetive)
+                RETURNING id_plan, title, plan_description, objetive, created_at
+            ),
+            new_slots AS (
+                INSERT INTO foodplanlink (plan_id, day_id, meal_moment_id, food_id, updated_at)
+                SELECT np.id_plan, s.day_id, s.meal_moment_id, s.food_id, NOW()
+                FROM new_plan np
+                CROSS JOIN unnest(
+                    CAST(:day_ids AS INTEGER[]),
+                    CAST(:meal_moment_ids AS INTEGER[]),
+                    CAST(:food_ids AS INTEGER[])
+                ) AS s(day_id, meal_moment_id, food_id)
+            ),
+            assignment AS (
+                INSERT INTO users (id_user, id_plan, updated_at)
+                SELECT :user_id, np.id_plan, NOW()
+                FROM new_plan np
+                ON CONFLICT (id_user) DO UPDATE
+                SET
+                    id_plan = EXCLUDED.id_plan,
+                    updated_at = EXCLUDED.updated_at
+            )
+            SELECT id_plan, title, plan_description, objetive, created_at
+            FROM new_plan
+        """)
+
+        params = {
+            "title": plan.title,
+            "plan_description": plan.plan_description,
+            "objetive": plan.objetive,
+            "user_id": user_id,
+            "day_ids": [day_id for day_id, _, _ in slots],
+            "meal_moment_ids": [moment_id for _, moment_id, _ in slots],
+            "food_ids": [food_id for _, _, food_id in slots],
+        }
+
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if not result:
@@ -212,7 +426,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"user_id": user_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if result:
@@ -227,7 +441,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"user_id": user_id, "plan_id": assignment.plan_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if not result:
@@ -247,7 +461,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"user_id": user_id, "plan_id": assignment.plan_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if not result:
@@ -270,10 +484,171 @@ class FoodRepository(IFoodRepository):
 
         params = {"plan_id": plan_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchall()
             return [Food(**row._mapping) for row in result]
 
+    def set_plan_template(self, plan_id: int, is_template: bool) -> Optional[PlanTemplate]:
+        query = text("""
+            UPDATE plans
+            SET is_template = :is_template
+            WHERE id_plan = :plan_id
+            RETURNING id_plan AS plan_id, is_template
+        """)
+
+        with self._begin() as connection:
+            result = connection.execute(query, {"plan_id": plan_id, "is_template": is_template}).fetchone()
+
+            return PlanTemplate(**result._mapping) if result else None
+
+    def clone_plan(self, plan_id: int, title: Optional[str]) -> Optional[Plan]:
+        """
+        Copies a plan with its slots and general foods, None when the plan
+        does not exist
+        """
+        params = {"plan_id": plan_id, "user_ids": [None], "title": title}
+
+        with self._begin() as connection:
+            result = connection.execute(_clone_plans_query(templates_only=False, assign=False), params).fetchone()
+
+            if not result:
+                return None
+
+            return Plan(id_plan=result.id_plan, title=result.title, plan_description=result.plan_description,
+                        objetive=result.objetive, created_at=result.created_at)
+
+    def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        """
+        Gives every user their own copy of a template and assigns it to them,
+        in one statement whatever the number of users. Users are created when
+        missing.
+
+        Args:
+            template_id: A plan flagged as template
+            user_ids: Users to copy the template for, without duplicates
+
+        Returns:
+            list[TemplateInstance]: The copy of every user, in the order of
+                user_ids. Empty when the plan is not a template
+        """
+        params = {"plan_id": template_id, "user_ids": user_ids, "title": None}
+
+        with self._begin() as connection:
+            result = connection.execute(_clone_plans_query(templates_only=True, assign=True), params)
+
+            return [TemplateInstance(user_id=row.user_id, plan_id=row.id_plan) for row in result]
+
+    def apply_slot_operations(self, plan_id: int, operations: list[tuple[str, int, int, Optional[int]]]) -> list[tuple[int, int, Food]]:
+        """
+        Applies set, replace and clear operations to slots of a plan in one
+        transaction: the plan is locked, every operation checked with a
+        single query and all of them written with another. Nothing is written
+        when any of them fails.
+
+        Args:
+            plan_id: The plan to edit
+            operations: (op, day_id, meal_moment_id, food_id), each slot once.
+                set needs an empty slot, replace a filled one, clear empties
+                the slot whatever its state
+
+        Returns:
+            list[tuple[int, int, Food]]: (day_id, meal_moment_id, food) of
+                every slot set or replaced
+        """
+        lock = text("""
+            SELECT id_plan
+            FROM plans
+            WHERE id_plan = :plan_id
+            FOR UPDATE
+        """)
+
+        operations_cte = """
+            WITH operations AS (
+                SELECT *
+                FROM unnest(
+                    CAST(:ops AS TEXT[]),
+                    CAST(:day_ids AS INTEGER[]),
+                    CAST(:meal_moment_ids AS INTEGER[]),
+                    CAST(:food_ids AS INTEGER[])
+                ) WITH ORDINALITY AS o(op, day_id, meal_moment_id, food_id, position)
+            )
+        """
+
+        check = text(operations_cte + """
+            SELECT
+                o.position,
+                o.food_id IS NOT NULL AND f.id IS NULL AS unknown_food,
+                o.op = 'set' AND l.plan_id IS NOT NULL AS filled,
+                o.op = 'replace' AND l.plan_id IS NULL AS empty
+            FROM operations o
+            LEFT JOIN foodplanlink l
+                ON l.plan_id = :plan_id AND l.day_id = o.day_id AND l.meal_moment_id = o.meal_moment_id
+            LEFT JOIN foods f ON f.id = o.food_id
+            WHERE (o.food_id IS NOT NULL AND f.id IS NULL)
+                OR (o.op = 'set' AND l.plan_id IS NOT NULL)
+                OR (o.op = 'replace' AND l.plan_id IS NULL)
+            ORDER BY o.position
+        """)
+
+        # Checked under the plan lock, so set and replace are the same upsert
+        apply = text(operations_cte + """,
+            cleared AS (
+                DELETE FROM foodplanlink l
+                USING operations o
+                WHERE o.op = 'clear'
+                    AND l.plan_id = :plan_id
+                    AND l.day_id = o.day_id
+                    AND l.meal_moment_id = o.meal_moment_id
+            ),
+            written AS (
+                INSERT INTO foodplanlink (plan_id, day_id, meal_moment_id, food_id, updated_at)
+                SELECT :plan_id, o.day_id, o.meal_moment_id, o.food_id, NOW()
+                FROM operations o
+                WHERE o.op IN ('set', 'replace')
+                ON CONFLICT (plan_id, day_id, meal_moment_id) DO UPDATE
+                SET food_id = EXCLUDED.food_id, updated_at = EXCLUDED.updated_at
+                RETURNING day_id, meal_moment_id, food_id
+            )
+            SELECT w.day_id, w.meal_moment_id, f.id, f.name, f.description, f.price, f.created_at
+            FROM written w
+            JOIN foods f ON f.id = w.food_id
+        """)
+
+        params = {
+            "plan_id": plan_id,
+            "ops": [op for op, _, _, _ in operations],
+            "day_ids": [day_id for _, day_id, _, _ in operations],
+            "meal_moment_ids": [moment_id for _, _, moment_id, _ in operations],
+            "food_ids": [food_id for _, _, _, food_id in operations],
+        }
+
+        with self._begin() as connection:
+            if connection.execute(lock, params).fetchone() is None:
+                raise NotFoundError(f"Plan with id {plan_id} not found")
+
+            failed = connection.execute(check, params).fetchall()
+
+            unknown_food = [str(row.position) for row in failed if row.unknown_food]
+            if unknown_food:
+                raise NotFoundError(f"Food not found in operations {', '.join(unknown_food)}")
+
+            empty = [str(row.position) for row in failed if row.empty]
+            if empty:
+                raise NotFoundError(f"Meal entry not found in plan for the replace operations {', '.join(empty)}")
+
+            filled = [str(row.position) for row in failed if row.filled]
+            if filled:
+                raise EntityAlreadyExistsError(
+                    title="A food in that moment already exists",
+                    detail=f"The slots of the set operations {', '.join(filled)} already have a food"
+                )
+
+            return [
+                (row.day_id, row.meal_moment_id, Food(
+                    id=row.id, name=row.name, description=row.description, price=row.price, created_at=row.created_at))
+                for row in connection.execute(apply, params)
+            ]
+
     def remove_food_from_plan(self, plan_id: int, data: FoodTimeDTO) -> None:
         query = text("""
             DELETE FROM foodplanlink
@@ -288,14 +663,20 @@ class FoodRepository(IFoodRepository):
             "moment_id": data.moment
         }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             connection.execute(query, params)
 
-    def update_food_weekly_plan(self, plan_id: int, data: FoodLinkDTO) -> None:
+    def update_food_weekly_plan(self, plan_id: int, data: FoodLinkDTO) -> Food:
         query = text("""
-            UPDATE foodplanlink
-            SET food_id = :food_id
-            WHERE plan_id = :plan_id AND day_id = :day_id AND meal_moment_id = :moment_id
+            WITH updated AS (
+                UPDATE foodplanlink
+                SET food_id = :food_id, updated_at = NOW()
+                WHERE plan_id = :plan_id AND day_id = :day_id AND meal_moment_id = :moment_id
+                RETURNING food_id
+            )
+            SELECT f.id, f.name, f.description, f.price, f.created_at
+            FROM updated
+            JOIN foods f ON f.id = updated.food_id
         """)
 
         params = {
@@ -305,15 +686,23 @@ class FoodRepository(IFoodRepository):
             "moment_id": data.moment
         }
 
-        with self.engine.begin() as conn:
-            result = conn.execute(query, params)
-            if result.rowcount == 0:
+        with self._begin() as conn:
+            result = conn.execute(query, params).fetchone()
+            if result is None:
                 raise NotFoundError(detail="Meal entry not found in plan")
 
-    def save_food_weekly_plan(self, plan_id: int, day: int, moment: int, food_id: int) -> None:
+            return Food(**result._mapping)
+
+    def save_food_weekly_plan(self, plan_id: int, day: int, moment: int, food_id: int) -> Food:
         query = text("""
-            INSERT INTO foodplanlink (plan_id, day_id, meal_moment_id, food_id, updated_at)
-            VALUES (:plan_id, :day_id, :moment_id, :food_id, NOW())
+            WITH inserted AS (
+                INSERT INTO foodplanlink (plan_id, day_id, meal_moment_id, food_id, updated_at)
+                VALUES (:plan_id, :day_id, :moment_id, :food_id, NOW())
+                RETURNING food_id
+            )
+            SELECT f.id, f.name, f.description, f.price, f.created_at
+            FROM inserted
+            JOIN foods f ON f.id = inserted.food_id
         """)
 
         params = {
@@ -324,8 +713,10 @@ class FoodRepository(IFoodRepository):
         }
 
         try:
-            with self.engine.begin() as connection:
-                connection.execute(query, params)
+            with self._begin() as connection:
+                result = connection.execute(query, params).one()
+
+                return Food(**result._mapping)
 
         except IntegrityError:
             raise EntityAlreadyExistsError(
@@ -343,7 +734,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"name": day}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).scalar_one()
 
             return result if result else None
@@ -358,7 +749,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"name": moment}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).scalar_one()
 
             return result if result else None
@@ -370,9 +761,9 @@ class FoodRepository(IFoodRepository):
             WHERE id IN ({','.join([f":food{i}" for i in range(len(foods))])})
         """)
 
-        params = {f"food{i}": food_id for i, food_id in enumerate(foods)}
+        params = {f"food{i}": int(food_id) for i, food_id in enumerate(foods)}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchall()
 
             return [row.id for row in result]
@@ -383,7 +774,7 @@ class FoodRepository(IFoodRepository):
             FROM week_days
         """)
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query).fetchall()
 
             return [dict(row._mapping) for row in result]
@@ -394,7 +785,7 @@ class FoodRepository(IFoodRepository):
             FROM meal_moments
         """)
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query).fetchall()
 
             return [dict(row._mapping) for row in result]
@@ -409,7 +800,7 @@ class FoodRepository(IFoodRepository):
 
         params = {"plan_id": plan_id, "food_id": food_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if result:
@@ -430,34 +821,99 @@ class FoodRepository(IFoodRepository):
 
         params = {"food_id": food_id}
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if result:
                 return Food(**result._mapping)
 
-    def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
-        query = text("""
-            SELECT id, name, description, price, created_at
-            FROM foods
-        """)
+    @staticmethod
+    def all_foods_query(params: GetAllFoodsParams, paginated: bool = True) -> tuple[TextClause, dict[str, Any]]:
+        """
+        Keyset query over the foods catalog, ordered by id and starting after
+        params.cursor
+
+        Args:
+            params: Search filter, cursor and page size
+            paginated: Whether to apply params.limit
 
+        Returns:
+            tuple[TextClause, dict[str, Any]]: The query and its parameters
+        """
+        filters = ["TRUE"]
         _params: dict[str, Any] = dict()
 
-        if params.search_name:
-            query = text("""
-                SELECT id, name, description, price, created_at
-                FROM foods
-                WHERE name ILIKE :search_name
-            """)
+        if params.cursor is not None:
+            filters.append("id > :cursor")
+            _params["cursor"] = params.cursor
 
+        if params.search_name:
+            # Same expression as foods_name_trgm_idx so the index is used
+            filters.append(
+                "f_unaccent(lower(name)) LIKE f_unaccent(lower(:search_name))")
             _params["search_name"] = f"%{params.search_name}%"
 
-        with self.engine.begin() as connection:
+        limit = ""
+        if paginated:
+            limit = "LIMIT :limit"
+            _params["limit"] = params.limit
+
+        query = text(f"""
+            SELECT id, name, description, price, created_at
+            FROM foods
+            WHERE {" AND ".join(filters)}
+            ORDER BY id
+            {limit}
+        """)
+
+        return query, _params
+
+    def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
+        query, _params = self.all_foods_query(params)
+
+        with self._begin() as connection:
             result = connection.execute(query, _params).fetchall()
 
             return [Food(**row._mapping) for row in result]
 
+    def stream_all_foods(self, params: GetAllFoodsParams) -> Iterator[Food]:
+        query, _params = self.all_foods_query(params, paginated=False)
+
+        # Server side cursor, rows are fetched in batches as they are consumed
+        with self._begin() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=STREAM_BATCH_SIZE
+            ).execute(query, _params)
+
+            for row in result:
+                yield Food(**row._mapping)
+
+    def search_foods(self, search_name: str, limit: int) -> list[Food]:
+        """
+        Ranked search over the foods catalog. Matches names containing the
+        term or similar to it, ignoring case and accents, best match first.
+        Served by foods_name_trgm_idx
+        """
+        query = text("""
+            SELECT id, name, description, price, created_at
+            FROM foods
+            WHERE f_unaccent(lower(name)) LIKE f_unaccent(lower(:pattern))
+                OR f_unaccent(lower(:search_name)) <% f_unaccent(lower(name))
+            ORDER BY
+                word_similarity(f_unaccent(lower(:search_name)), f_unaccent(lower(name))) DESC,
+                id
+            LIMIT :limit
+        """)
+
+        with self._begin() as connection:
+            result = connection.execute(query, {
+                "search_name": search_name,
+                "pattern": f"%{search_name}%",
+                "limit": limit
+            }).fetchall()
+
+            return [Food(**row._mapping) for row in result]
+
     def save_food(self, food: FoodDTO) -> Food:
         query = text("""
             INSERT INTO foods (name, description, price, image_url)
@@ -472,7 +928,7 @@ class FoodRepository(IFoodRepository):
             "image_url": food.image_url
         }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if not result:
@@ -486,13 +942,16 @@ class FoodRepository(IFoodRepository):
             VALUES (:food_id, :ingredient_id, :quantity)
         """)
 
-        with self.engine.begin() as connection:
-            for item in ingredients:
-                connection.execute(query, {
-                    "food_id": food_id,
-                    "ingredient_id": item.ingredient_id,
-                    "quantity": item.quantity
-                })
+        with self._begin() as connection:
+            # One executemany for every ingredient instead of a round trip each
+            if ingredients:
+                connection.execute(query, [
+                    {"food_id": food_id, "ingredient_id": item.ingredient_id, "quantity": item.quantity}
+                    for item in ingredients
+                ])
+
+            # Same connection, so the summary is refreshed in this transaction
+            FoodRepository(self.engine, connection).refresh_food_nutrition([food_id])
 
     def save_extra_food_ingredients(self, extraFoodId: int, ingredients: List[FoodIngredientDTO]) -> None:
         query = text("""
@@ -500,13 +959,15 @@ class FoodRepository(IFoodRepository):
             VALUES (:id_extra_food, :ingredient_id, :quantity)
         """)
 
-        with self.engine.begin() as connection:
-            for item in ingredients:
-                connection.execute(query, {
-                    "id_extra_food": extraFoodId,
-                    "ingredient_id": item.ingredient_id,
-                    "quantity": item.quantity
-                })
+        with self._begin() as connection:
+            if ingredients:
+                connection.execute(query, [
+                    {"id_extra_food": extraFoodId, "ingredient_id": item.ingredient_id, "quantity": item.quantity}
+                    for item in ingredients
+                ])
+
+            # Same connection, so the summary is refreshed in this transaction
+            FoodRepository(self.engine, connection).refresh_extra_food_nutrition([extraFoodId])
 
     def link_food_to_plan(self, food_id: int, plan_id: int, day_id: Optional[int], meal_moment_id: Optional[int]) -> None:
         if day_id is None and meal_moment_id is None:
@@ -532,7 +993,7 @@ class FoodRepository(IFoodRepository):
                 "meal_moment_id": meal_moment_id
             }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             connection.execute(query, params)
 
     def save_ingredient(self, ingredient: IngredientDTO) -> Ingredient:
@@ -593,7 +1054,7 @@ class FoodRepository(IFoodRepository):
             "cholesterol": ingredient.cholesterol,
         }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if not result:
@@ -603,46 +1064,199 @@ class FoodRepository(IFoodRepository):
             
     def get_nutritional_values(self, food_id: Optional[int], extraFood_id: Optional[int]) -> Optional[dict]:
         query = text("""
-            SELECT 
-                SUM(i.calories * fi.quantity / 100.0) AS calories,
-                SUM(i.protein * fi.quantity / 100.0) AS protein,
-                SUM(i.carbs * fi.quantity / 100.0) AS carbs,
-                SUM(i.fiber * fi.quantity / 100.0) AS fiber,
-                SUM(i.saturated_fats * fi.quantity / 100.0) AS saturated_fats,
-                SUM(i.monounsaturated_fats * fi.quantity / 100.0) AS monounsaturated_fats,
-                SUM(i.polyunsaturated_fats * fi.quantity / 100.0) AS polyunsaturated_fats,
-                SUM(i.trans_fats * fi.quantity / 100.0) AS trans_fats,
-                SUM(i.cholesterol * fi.quantity / 100.0) AS cholesterol
-            FROM food_ingredients fi
-            JOIN ingredients i ON fi.ingredient_id = i.id
-            WHERE fi.food_id = :food_id
-            GROUP BY fi.food_id
+            SELECT
+                calories,
+                protein,
+                carbs,
+                fiber,
+                saturated_fats,
+                monounsaturated_fats,
+                polyunsaturated_fats,
+                trans_fats,
+                cholesterol
+            FROM food_nutrition
+            WHERE food_id = :food_id
         """)
         params = {"food_id": food_id}
         if extraFood_id:
             params = {"extraFood_id": extraFood_id}
             query = text("""
-            SELECT 
-                SUM(i.calories * efi.quantity / 100.0) AS calories,
-                SUM(i.protein * efi.quantity / 100.0) AS protein,
-                SUM(i.carbs * efi.quantity / 100.0) AS carbs,
-                SUM(i.fiber * efi.quantity / 100.0) AS fiber,
-                SUM(i.saturated_fats * efi.quantity / 100.0) AS saturated_fats,
-                SUM(i.monounsaturated_fats * efi.quantity / 100.0) AS monounsaturated_fats,
-                SUM(i.polyunsaturated_fats * efi.quantity / 100.0) AS polyunsaturated_fats,
-                SUM(i.trans_fats * efi.quantity / 100.0) AS trans_fats,
-                SUM(i.cholesterol * efi.quantity / 100.0) AS cholesterol
-            FROM extrafood_ingredient efi
-            JOIN ingredients i ON efi.ingredient_id = i.id
-            WHERE efi.id_extra_food = :extraFood_id
-            GROUP BY efi.id_extra_food
+            SELECT
+                calories,
+                protein,
+                carbs,
+                fiber,
+                saturated_fats,
+                monounsaturated_fats,
+                polyunsaturated_fats,
+                trans_fats,
+                cholesterol
+            FROM extra_food_nutrition
+            WHERE id_extra_food = :extraFood_id
             """)
-        with self.engine.connect() as conn:
+        with self._begin() as conn:
             result = conn.execute(query, params).fetchone()
             if result is None:
                 return None
             return dict(result._mapping)
 
+    def get_plan_ingredients(self, plan_id: int) -> Sequence[Row[Any]]:
+        """
+        Ingredients of every food assigned to the plan's weekly grid, one row
+        per food and ingredient
+        """
+        query = text("""
+            SELECT
+                fi.food_id,
+                i.measure_type,
+                fi.quantity,
+                i.calories,
+                i.protein,
+                i.carbs,
+                i.fiber,
+                i.saturated_fats,
+                i.monounsaturated_fats,
+                i.polyunsaturated_fats,
+                i.trans_fats,
+                i.cholesterol
+            FROM food_ingredients fi
+            JOIN ingredients i ON fi.ingredient_id = i.id
+            WHERE fi.food_id IN (
+                SELECT food_id FROM foodplanlink WHERE plan_id = :plan_id
+            )
+        """)
+
+        with self._begin() as connection:
+            return connection.execute(query, {"plan_id": plan_id}).fetchall()
+
+    def get_nutritional_values_by_ids(self, food_ids: Optional[list[int]], extraFood_ids: Optional[list[int]]) -> dict[int, dict]:
+        """
+        Batch version of get_nutritional_values, one query for every id.
+        Ids without nutrition data are left out of the result
+        """
+        query = text("""
+            SELECT
+                food_id AS id,
+                calories,
+                protein,
+                carbs,
+                fiber,
+                saturated_fats,
+                monounsaturated_fats,
+                polyunsaturated_fats,
+                trans_fats,
+                cholesterol
+            FROM food_nutrition
+            WHERE food_id = ANY(CAST(:ids AS INTEGER[]))
+        """)
+        params = {"ids": food_ids or []}
+        if extraFood_ids:
+            params = {"ids": extraFood_ids}
+            query = text("""
+            SELECT
+                id_extra_food AS id,
+                calories,
+                protein,
+                carbs,
+                fiber,
+                saturated_fats,
+                monounsaturated_fats,
+                polyunsaturated_fats,
+                trans_fats,
+                cholesterol
+            FROM extra_food_nutrition
+            WHERE id_extra_food = ANY(CAST(:ids AS INTEGER[]))
+            """)
+        with self._begin() as conn:
+            result = conn.execute(query, params).fetchall()
+
+            nutrition = dict()
+            for row in result:
+                values = dict(row._mapping)
+                nutrition[values.pop("id")] = values
+
+            return nutrition
+
+    def refresh_food_nutrition(self, food_ids: Optional[list[int]]) -> None:
+        """
+        Recompute the food_nutrition rows of the given foods, or of every food
+        when food_ids is None. Joins the caller's transaction when bound
+        """
+        with self._begin() as connection:
+            connection.execute(
+                text("SELECT refresh_food_nutrition(CAST(:food_ids AS INTEGER[]))"),
+                {"food_ids": food_ids}
+            )
+
+    def refresh_extra_food_nutrition(self, extra_food_ids: Optional[list[int]]) -> None:
+        """
+        Recompute the extra_food_nutrition rows of the given extra foods, or of
+        every extra food when extra_food_ids is None
+        """
+        with self._begin() as connection:
+            connection.execute(
+                text("SELECT refresh_extra_food_nutrition(CAST(:extra_food_ids AS INTEGER[]))"),
+                {"extra_food_ids": extra_food_ids}
+            )
+
+    def get_table_version(self, table_name: str) -> str:
+        """
+        Version of a whole table, bumped by every statement that writes to it
+        (see table_versions in init.sql)
+        """
+        query = text("""
+            SELECT CAST(version AS TEXT)
+            FROM table_versions
+            WHERE table_name = :table_name
+        """)
+
+        with self._begin() as connection:
+            return connection.execute(query, {"table_name": table_name}).scalar_one()
+
+    def get_plans_version(self) -> str:
+        """
+        Changes when a plan is added, updated or deleted
+        """
+        return self.get_table_version("plans")
+
+    def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        """
+        Version of the plan plus a digest of its slots, their foods' versions
+        and when each slot was last written. None when the plan does not exist
+        """
+        query = text("""
+            SELECT p.version || '-' || COALESCE((
+                SELECT md5(string_agg(
+                    l.day_id || ':' || l.meal_moment_id || ':' || l.food_id || ':' || f.version || ':' || l.updated_at,
+                    ',' ORDER BY l.day_id, l.meal_moment_id
+                ))
+                FROM foodplanlink l
+                JOIN foods f ON f.id = l.food_id
+                WHERE l.plan_id = p.id_plan
+            ), '')
+            FROM plans p
+            WHERE p.id_plan = :plan_id
+        """)
+
+        with self._begin() as connection:
+            return connection.execute(query, {"plan_id": plan_id}).scalar_one_or_none()
+
+    def get_food_version(self, food_id: int) -> Optional[str]:
+        query = text("""
+            SELECT CAST(version AS TEXT)
+            FROM foods
+            WHERE id = :food_id
+        """)
+
+        with self._begin() as connection:
+            return connection.execute(query, {"food_id": food_id}).scalar_one_or_none()
+
+    def get_ingredients_version(self) -> str:
+        """
+        Changes when an ingredient is added, updated or deleted
+        """
+        return self.get_table_version("ingredients")
+
     def get_ingredients_by_food_id(self, food_id: Optional[int], extraFoodId:Optional[int]) -> list[FoodIngredientDTO]:
         if food_id:
             query = text("""
@@ -664,7 +1278,7 @@ class FoodRepository(IFoodRepository):
                 JOIN ingredients i ON fi.ingredient_id = i.id
                 WHERE fi.food_id = :food_id
             """)
-            with engine.connect() as conn:
+            with self._begin() as conn:
                 result = conn.execute(query, {"food_id": food_id})
                 rows = result.fetchall()
 
@@ -688,7 +1302,7 @@ class FoodRepository(IFoodRepository):
             JOIN ingredients i ON efi.ingredient_id = i.id
             WHERE efi.id_extra_food = :id_extra_food
             """)
-            with engine.connect() as conn:
+            with self._begin() as conn:
                 result = conn.execute(query, {"id_extra_food": extraFoodId})
                 rows = result.fetchall()
 
@@ -718,7 +1332,7 @@ class FoodRepository(IFoodRepository):
             SELECT id, name
             FROM ingredients
         """)
-        with engine.connect() as conn:
+        with self._begin() as conn:
             result = conn.execute(query)
             ingredients = []
             for row in result.fetchall():
@@ -728,6 +1342,32 @@ class FoodRepository(IFoodRepository):
                 ))
         return ingredients
 
+
+    def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        """
+        Ranked ingredient search, see search_foods. Served by
+        ingredients_name_trgm_idx
+        """
+        query = text("""
+            SELECT id, name, measure_type
+            FROM ingredients
+            WHERE f_unaccent(lower(name)) LIKE f_unaccent(lower(:pattern))
+                OR f_unaccent(lower(:search_name)) <% f_unaccent(lower(name))
+            ORDER BY
+                word_similarity(f_unaccent(lower(:search_name)), f_unaccent(lower(name))) DESC,
+                id
+            LIMIT :limit
+        """)
+
+        with self._begin() as connection:
+            result = connection.execute(query, {
+                "search_name": search_name,
+                "pattern": f"%{search_name}%",
+                "limit": limit
+            }).fetchall()
+
+            return [dict(row._mapping) for row in result]
+
     def save_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> ExtraFood:
         query = text("""
             INSERT INTO extra_foods(name, description, image_url, day, moment, date)
@@ -743,7 +1383,7 @@ class FoodRepository(IFoodRepository):
             "date": extraFood.date
         }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
 
             if not result:
@@ -763,7 +1403,7 @@ class FoodRepository(IFoodRepository):
             "id_user": userid
         }
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, params).fetchone()
             if not result:
                 raise Exception("Error linking the food with user")
@@ -791,7 +1431,7 @@ class FoodRepository(IFoodRepository):
             (
                 (users.id_user = :user_id) 
                 AND 
-                (extra_foods.date >= :start_date AND extra_foods.date < (:end_date + INTERVAL '1 day'))
+                (extra_foods.date >= :start_date AND extra_foods.date < (CAST(:end_date AS TIMESTAMP) + INTERVAL '1 day'))
             )
         """)
 
@@ -819,12 +1459,12 @@ class FoodRepository(IFoodRepository):
             (
                 (users.id_user = :user_id) 
                 AND 
-                (extra_foods.date >= :start_date AND extra_foods.date < (:end_date + INTERVAL '1 day'))
+                (extra_foods.date >= :start_date AND extra_foods.date < (CAST(:end_date AS TIMESTAMP) + INTERVAL '1 day'))
                 AND
                 (extra_foods.moment = :moment)
             )
         """)
 
-        with self.engine.begin() as connection:
+        with self._begin() as connection:
             result = connection.execute(query, _params).fetchall()
             return [ExtraFood(**row._mapping) for row in result]
@@ -0,0 +1,177 @@
+from abc import ABCMeta, abstractmethod
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Engine, Row, text
+from sqlalchemy.exc import IntegrityError
+
+from database.database import engine
+from metrics.database import instrument_repository
+from models.errors.errors import NotFoundError
+
+# Spanish names of the ISO days of the week (1 is Monday), as in week_days
+ISO_WEEK_DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+class IReminderRepository(metaclass=ABCMeta):
+    @abstractmethod
+    def save_push_token(self, user_id: str, token: str) -> None:
+        pass
+
+    @abstractmethod
+    def delete_push_token(self, token: str) -> None:
+        pass
+
+    @abstractmethod
+    def schedule_reminders(self, horizon_minutes: int, lead_minutes: int) -> int:
+        pass
+
+    @abstractmethod
+    def claim_due_reminders(self, limit: int, lease_seconds: int, stale_minutes: int) -> Sequence[Row[Any]]:
+        pass
+
+    @abstractmethod
+    def mark_reminders_sent(self, reminder_ids: list[int]) -> None:
+        pass
+
+    @abstractmethod
+    def purge_reminders(self, older_than_hours: int) -> int:
+        pass
+
+
+@instrument_repository
+class ReminderRepository(IReminderRepository):
+    def __init__(self, engine_: Optional[Engine] = None):
+        self.engine = engine_ or engine
+
+    def save_push_token(self, user_id: str, token: str) -> None:
+        query = text("""
+            INSERT INTO user_push_tokens (id_user, token, updated_at)
+            VALUES (:user_id, :token, NOW())
+            ON CONFLICT (id_user) DO UPDATE
+            SET token = EXCLUDED.token, updated_at = EXCLUDED.updated_at
+        """)
+
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(query, {"user_id": user_id, "token": token})
+        except IntegrityError:
+            raise NotFoundError(f"User {user_id} not found")
+
+    def delete_push_token(self, token: str) -> None:
+        query = text("""
+            DELETE FROM user_push_tokens
+            WHERE token = :token
+        """)
+
+        with self.engine.begin() as connection:
+            connection.execute(query, {"token": token})
+
+    def schedule_reminders(self, horizon_minutes: int, lead_minutes: int) -> int:
+        """
+        Queue a reminder, lead_minutes before the meal, for every planned
+        meal of every user with a push token that is due in the next
+        horizon_minutes. Already queued reminders are left as they are, so
+        overlapping runs of several instances are harmless.
+
+        Returns:
+            int: Number of reminders queued
+        """
+        query = text("""
+            INSERT INTO meal_reminders (id_user, day_id, meal_moment_id, due_at)
+            SELECT u.id_user, l.day_id, l.meal_moment_id, r.due_at
+            FROM generate_series(0, CAST(:horizon_minutes AS INTEGER) / 1440 + 1) AS g(day_offset)
+            CROSS JOIN LATERAL (SELECT CURRENT_DATE + g.day_offset AS day) AS d
+            JOIN week_days wd
+                ON wd.name = (CAST(:week_days AS TEXT[]))[CAST(EXTRACT(ISODOW FROM d.day) AS INTEGER)]
+            JOIN foodplanlink l ON l.day_id = wd.id
+            JOIN meal_moments mm ON mm.id = l.meal_moment_id
+            CROSS JOIN LATERAL (
+                SELECT date_trunc('minute', d.day + mm.reminder_time - make_interval(mins => :lead_minutes)) AS due_at
+            ) AS r
+            JOIN users u ON u.id_plan = l.plan_id
+            JOIN user_push_tokens t ON t.id_user = u.id_user
+            WHERE mm.reminder_time IS NOT NULL
+                AND r.due_at >= date_trunc('minute', LOCALTIMESTAMP)
+                AND r.due_at < LOCALTIMESTAMP + make_interval(mins => :horizon_minutes)
+            ON CONFLICT (id_user, meal_moment_id, due_at) DO NOTHING
+        """)
+
+        params = {
+            "horizon_minutes": horizon_minutes,
+            "lead_minutes": lead_minutes,
+            "week_days": ISO_WEEK_DAYS
+        }
+
+        with self.engine.begin() as connection:
+            return connection.execute(query, params).rowcount
+
+    def claim_due_reminders(self, limit: int, lease_seconds: int, stale_minutes: int) -> Sequence[Row[Any]]:
+        """
+        Claim up to limit due reminders, skipping the rows other instances
+        are claiming. A claim that is not marked sent within lease_seconds
+        (e.g. the instance died) can be claimed again, and reminders more
+        than stale_minutes late are never claimed.
+
+        The user's current plan, food and push token are read at claim time,
+        token and food are None when the user has no token or the slot was
+        emptied since the reminder was queued.
+        """
+        query = text("""
+            WITH due AS (
+                SELECT id
+                FROM meal_reminders
+                WHERE sent_at IS NULL
+                    AND due_at <= LOCALTIMESTAMP
+                    AND due_at > LOCALTIMESTAMP - make_interval(mins => :stale_minutes)
+                    AND (claimed_at IS NULL OR claimed_at < LOCALTIMESTAMP - make_interval(secs => :lease_seconds))
+                ORDER BY due_at
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            ),
+            claimed AS (
+                UPDATE meal_reminders r
+                SET claimed_at = LOCALTIMESTAMP
+                FROM due
+                WHERE r.id = due.id
+                RETURNING r.id, r.id_user, r.day_id, r.meal_moment_id
+            )
+            SELECT c.id, c.id_user, c.day_id, c.meal_moment_id, mm.name AS moment, t.token, f.name AS food
+            FROM claimed c
+            JOIN meal_moments mm ON mm.id = c.meal_moment_id
+            LEFT JOIN users u ON u.id_user = c.id_user
+            LEFT JOIN user_push_tokens t ON t.id_user = c.id_user
+            LEFT JOIN foodplanlink l
+                ON l.plan_id = u.id_plan AND l.day_id = c.day_id AND l.meal_moment_id = c.meal_moment_id
+            LEFT JOIN foods f ON f.id = l.food_id
+        """)
+
+        params = {
+            "limit": limit,
+            "lease_seconds": lease_seconds,
+            "stale_minutes": stale_minutes
+        }
+
+        with self.engine.begin() as connection:
+            return connection.execute(query, params).fetchall()
+
+    def mark_reminders_sent(self, reminder_ids: list[int]) -> None:
+        query = text("""
+            UPDATE meal_reminders
+            SET sent_at = LOCALTIMESTAMP
+            WHERE id = ANY(CAST(:reminder_ids AS BIGINT[]))
+        """)
+
+        with self.engine.begin() as connection:
+            connection.execute(query, {"reminder_ids": reminder_ids})
+
+    def purge_reminders(self, older_than_hours: int) -> int:
+        """
+        Delete the reminders due more than older_than_hours ago, sent or not
+        """
+        query = text("""
+            DELETE FROM meal_reminders
+            WHERE due_at < LOCALTIMESTAMP - make_interval(hours => :older_than_hours)
+        """)
+
+        with self.engine.begin() as connection:
+            return connection.execute(query, {"older_than_hours": older_than_hours}).rowcount
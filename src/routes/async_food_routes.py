@@ -0,0 +1,939 @@
+from typing import Optional, Union
+from fastapi import APIRouter, HTTPException, Query, status, Path
+from fastapi.responses import StreamingResponse
+
+from controller.async_food_controller import AsyncFoodController
+from cache import tags
+from cache.conditional import conditional_get
+from cache.response_cache import cached_response
+from metrics.query_recorder import query_budget
+from models.errors.errors import ValidationError
+from models.foodPlans import Food, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, Plan, PlanAssignment, PlanAssignmentDTO, PlanCloneDTO, PlanNutrition, PlanSlotsBatchDTO, PlanTemplate, PlanTemplateDTO, TemplateInstance, TemplateInstanceDTO, TemplateInstancesDTO, WeeklyPlan, ExtraFood, ExtraFoodDTO
+from models.params import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, GetAllFoodsParams, PostPlanBody, PostFoodBody, PostExtraFoodBody, GetExtraFoodsParams
+from models.response import CustomResponse, ErrorDTO, PaginatedResponse
+from routes import food_routes
+from datetime import datetime
+
+router = APIRouter()
+
+
+@router.get(
+    "/plans",
+    summary="Retrieves all the differents plans",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[Plan]],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@conditional_get(version=lambda: AsyncFoodController().get_plans_version())
+@cached_response(tags=lambda: [tags.PLANS])
+@query_budget(2)
+async def get_food_plans() -> CustomResponse[list[Plan]]:
+    return await AsyncFoodController().get_plans()
+
+
+@router.get(
+    "/plans/{id}",
+    summary="Retrieves a specific detailed weekly plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[WeeklyPlan],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@conditional_get(version=lambda id: AsyncFoodController().get_weekly_plan_version(id))
+@cached_response(tags=lambda id: [tags.plan(id)])
+@query_budget(5)
+async def get_plan_by_id(id: int) -> CustomResponse[WeeklyPlan]:
+    return await AsyncFoodController().get_plan(id)
+
+
+@router.get(
+    "/plans/{id}/nutrition",
+    summary="Nutrition totals of a weekly plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[PlanNutrition],
+            "description": "Nutrition per meal, per day and for the whole week"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+    }
+)
+@cached_response(tags=lambda id: [tags.plan(id), tags.PLAN_NUTRITION])
+@query_budget(5)
+async def get_plan_nutrition(id: int) -> CustomResponse[PlanNutrition]:
+    return await AsyncFoodController().get_plan_nutrition(id)
+
+
+@router.post(
+    "/plans",
+    summary="Create a new food plan",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Plan],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def post_plan(
+    body: PostPlanBody,
+    from_preferences: bool = Query(
+        default=False,
+        description="If true, the plan will be created from user preferences",
+    )
+) -> CustomResponse[Plan]:
+    if from_preferences and body.preferences:
+        return await AsyncFoodController().create_plan_from_preferences(
+            body.preferences.user_id, body.preferences.preferences, body.plan
+        )
+
+    if not body.plan:
+        raise ValidationError(
+            detail="If you want to create a plan from preferences, you need to provide the user_id and preferences. If you want to create a plan from scratch, you need to provide the plan title, description and objective.",
+            title="Missing body or wrong body"
+        )
+
+    return await AsyncFoodController().add_plan(body.plan)
+
+
+@router.get(
+    "/users/{user_id}/plan",
+    summary="Retrieves the user's plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[Plan],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def get_user_plan(user_id: str) -> CustomResponse[Plan]:
+    return await AsyncFoodController().get_user_plan(user_id)
+
+
+@router.put(
+    "/users/{user_id}/plan",
+    summary="Replace the user's plan",
+    description="If the user already has a plan, it will be replaced. If not, a new plan will be created.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[PlanAssignment],
+            "description": "Update user's plans"
+        },
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[PlanAssignment],
+            "description": "Create user's plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(2)
+async def put_user_plan(assigment: PlanAssignmentDTO, user_id: str) -> CustomResponse[PlanAssignment]:
+    return await AsyncFoodController().put_user_plan(user_id, assigment)
+
+
+@router.put(
+    "/plans/{plan_id}/template",
+    summary="Flag or unflag a plan as template",
+    description="Templates are curated plans users get their own copy of.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[PlanTemplate],
+            "description": "Template flag updated"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def put_plan_template(plan_id: int, template: PlanTemplateDTO) -> CustomResponse[PlanTemplate]:
+    return await AsyncFoodController().set_plan_template(plan_id, template)
+
+
+@router.post(
+    "/plans/{plan_id}/clone",
+    summary="Copy a plan",
+    description="Creates a new plan with the same slots and general foods, in a single statement.",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Plan],
+            "description": "The copy"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(1)
+async def clone_plan(plan_id: int, data: PlanCloneDTO) -> CustomResponse[Plan]:
+    return await AsyncFoodController().clone_plan(plan_id, data)
+
+
+@router.post(
+    "/plans/{plan_id}/instances",
+    summary="Give many users their own copy of a template",
+    description=(
+        "Copies the template once per user and assigns every copy to its user, replacing their current "
+        "plan, in a single statement. Users are created when missing."
+    ),
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[list[TemplateInstance]],
+            "description": "The copy of every user"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Template not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(1)
+async def post_template_instances(plan_id: int, data: TemplateInstancesDTO) -> CustomResponse[list[TemplateInstance]]:
+    return await AsyncFoodController().instantiate_template(plan_id, data.user_ids)
+
+
+@router.post(
+    "/users/{user_id}/plan/template",
+    summary="Give the user their own copy of a template",
+    description="The copy replaces the user's current plan and can be edited without changing the template.",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Plan],
+            "description": "The user's new plan"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Template not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(2)
+async def post_user_plan_from_template(user_id: str, data: TemplateInstanceDTO) -> CustomResponse[Plan]:
+    return await AsyncFoodController().instantiate_template_for_user(user_id, data)
+
+
+# 2 formas de obtener las comidas de un plan: por ID de plan o ID de usuario
+@router.get(
+    "/plans/{plan_id}/foods",
+    summary="Get all foods in a plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[Food]],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def get_foods_from_plan(plan_id: int) -> CustomResponse[list[Food]]:
+    return await AsyncFoodController().get_foods_from_plan(plan_id)
+
+
+@router.get(
+    "/users/{user_id}/plan/foods",
+    summary="Get all foods from a user's plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[Food]],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def get_foods_from_user_plan(user_id: str) -> CustomResponse[list[Food]]:
+    return await AsyncFoodController().get_foods_from_user_plan(user_id)
+
+
+@router.post(
+    "/users/{user_id}/plan/foods",
+    summary="Adds a new food for the user's plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[WeeklyPlan],
+            "description": "List of food plans"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_409_CONFLICT: {
+            "model": ErrorDTO,
+            "description": "A food already exists at that moment in that day in the plan"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def add_food_to_user_plan(req: FoodLinkDTO, user_id: str) -> CustomResponse[WeeklyPlan]:
+    return await AsyncFoodController().add_food_to_user_plan(user_id, req)
+
+
+@router.put(
+    "/plans/{plan_id}/foods",
+    summary="Update a food item for a specific day and moment in plan",
+    description="Update a food item for a specific day and moment in plan, retrieves the updated weekly plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[WeeklyPlan],
+            "description": "Update a food from the user's plan"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Item not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def update_meal_in_plan(plan_id: int, data: FoodLinkDTO) -> CustomResponse[WeeklyPlan]:
+    return await AsyncFoodController().update_food_in_plan(plan_id, data)
+
+
+@router.patch(
+    "/plans/{plan_id}/foods",
+    summary="Edit many slots of a plan at once",
+    description=(
+        "Applies set, replace and clear operations to slots of the plan in one transaction and "
+        "retrieves the updated weekly plan. set fills an empty slot, replace changes the food of a "
+        "filled one and clear empties a slot. Nothing is changed when any operation fails."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[WeeklyPlan],
+            "description": "The plan after the operations"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "A slot edited twice, or a set or replace without food"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan, day, moment or food not found, or a replace of an empty slot"
+        },
+        status.HTTP_409_CONFLICT: {
+            "model": ErrorDTO,
+            "description": "A set of a slot that already has a food"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(7)
+async def edit_plan_slots(plan_id: int, batch: PlanSlotsBatchDTO) -> CustomResponse[WeeklyPlan]:
+    return await AsyncFoodController().edit_plan_slots(plan_id, batch)
+
+
+@router.delete(
+    "/users/{user_id}/plan/foods",
+    summary="remove a food from user's plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[WeeklyPlan],
+            "description": "Remove a food from the user's plan"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def remove_food_from_user_plan(data: FoodTimeDTO, user_id: str) -> CustomResponse[WeeklyPlan]:
+    return await AsyncFoodController().remove_food_from_user_plan(user_id, data)
+
+
+@router.get(
+    "/foods/nutrition",
+    summary="Get the nutritional values of many foods",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[dict[int, Optional[dict]]],
+            "description": "Nutritional values by food id, null for foods without nutritional data"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "Invalid ids"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+    }
+)
+@cached_response(tags=lambda ids: [tags.food(food_id) for food_id in food_routes.parse_ids(ids)])
+async def get_foods_nutrition(ids: str = Query(..., description="Comma separated food ids, e.g. 1,2,3")) -> CustomResponse[dict[int, Optional[dict]]]:
+    return await AsyncFoodController().get_foods_nutritional_values(food_routes.parse_ids(ids))
+
+
+@router.get(
+    "/extra/nutrition",
+    summary="Get the nutritional values of many extra foods",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[dict[int, Optional[dict]]],
+            "description": "Nutritional values by extra food id, null for extra foods without nutritional data"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "Invalid ids"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+    }
+)
+@cached_response(tags=lambda ids: [tags.extra_food(extra_food_id) for extra_food_id in food_routes.parse_ids(ids)])
+async def get_extra_foods_nutrition(ids: str = Query(..., description="Comma separated extra food ids, e.g. 1,2,3")) -> CustomResponse[dict[int, Optional[dict]]]:
+    return await AsyncFoodController().get_extra_foods_nutritional_values(food_routes.parse_ids(ids))
+
+
+@router.get(
+    "/foods/{food_id}",
+    summary="Get food by id",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[Food],
+            "description": "Food found"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Food not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@conditional_get(version=lambda food_id: AsyncFoodController().get_food_version(food_id))
+@cached_response(tags=lambda food_id: [tags.food(food_id)])
+async def get_food_by_id(food_id: int) -> CustomResponse[Food]:
+    return await AsyncFoodController().get_food_by_id(food_id)
+
+
+@router.get(
+    "/foods",
+    summary="Get all foods",
+    status_code=status.HTTP_200_OK,
+    response_model=PaginatedResponse[Food],
+    responses={
+        status.HTTP_200_OK: {
+            "model": PaginatedResponse[Food],
+            "description": "Page of foods ordered by id, or the whole list as NDJSON when stream=true",
+            "content": {"application/x-ndjson": {}}
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def get_all_foods(
+    search_name: str = Query(None, description="Search food by name, ignoring case and accents. Results are ranked by relevance, limited to limit and not paginated"),
+    cursor: Optional[int] = Query(None, description="Return foods after this id. Use the next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    stream: bool = Query(False, description="Stream every matching food as NDJSON instead of a page. Ignores limit")
+) -> Union[PaginatedResponse[Food], StreamingResponse]:
+    params = GetAllFoodsParams(search_name=search_name, cursor=cursor, limit=limit)
+
+    if stream:
+        return AsyncFoodController().stream_all_foods(params)
+
+    return await AsyncFoodController().get_all_foods(params)
+
+@router.post(
+    "/food",
+    summary="Create a new food",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Food],
+            "description": "List of foods"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def post_food(body: PostFoodBody) -> CustomResponse[Food]:
+    if not body.food:
+        raise ValidationError(
+            detail="If you want to create a food from scratch, you need to provide a long list of params...",
+            title="Missing body or wrong body"
+        )
+    return await AsyncFoodController().add_food_in_db(body)
+
+@router.post(
+    "/food/ingredients",
+    summary="Create a new ingredient",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Ingredient],
+            "description": "New ingredient created"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def post_ingredient(body: IngredientDTO) -> CustomResponse[Ingredient]:
+    return await AsyncFoodController().add_ingredient(body)
+
+@router.get(
+    "/foods/{food_id}/ingredients",
+    summary="Get ingredients for a specific food item",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[str]],
+            "description": "List of ingredients for the food"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Ingredients not found for the given food ID"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid food ID format"
+        },
+    }
+)
+async def get_ingredients_by_food_id(food_id: int) -> CustomResponse[list[FoodIngredientDTO]]:
+    ingredients = await AsyncFoodController().get_ingredients_by_food_id(food_id)
+    if not ingredients:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No ingredients found for food with ID {food_id}"
+        )
+    return CustomResponse(data=ingredients)
+
+@router.get("/foods/{food_id}/nutrition")
+@cached_response(tags=lambda food_id: [tags.food(food_id)])
+async def get_food_nutrition(food_id: int):
+    return await AsyncFoodController().get_nutritional_values(food_id = food_id)
+
+@router.get("/extra/{extraFood_id}/nutrition")
+@cached_response(tags=lambda extraFood_id: [tags.extra_food(extraFood_id)])
+async def get_extra_food_nutrition(extraFood_id: int):
+    return await AsyncFoodController().get_nutritional_values_extrafood(extraFood_id = extraFood_id)
+
+@router.get(
+    "/foods/ingredients/all",
+    summary="Get all ingredients",
+    status_code=status.HTTP_200_OK,
+    response_model=CustomResponse[list[Ingredient]],
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[Ingredient]],
+            "description": "List of all ingredients"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+    }
+)
+@conditional_get(version=lambda: AsyncFoodController().get_ingredients_version())
+@cached_response(tags=lambda: [tags.INGREDIENTS])
+async def get_all_ingredients() -> CustomResponse[list[Ingredient]]:
+    ingredients = await AsyncFoodController().get_all_ingredients()
+    return CustomResponse(data=ingredients)
+
+@router.post(
+    "/users/{user_id}/extrafood",
+    summary="Add a extra food in a user at specific day",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Food],
+            "description": "List of foods"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+async def post_extra_food(body: PostExtraFoodBody, user_id: str) -> CustomResponse[ExtraFood]:
+    if not (body.extraFood and user_id):
+        raise ValidationError(
+            detail="If you want to create a extra food from scratch, you need to provide a user id and a long list of params...",
+            title="Missing body or wrong body")
+    return await AsyncFoodController().add_extra_food(body.extraFood, user_id)
+
+@router.get(
+    "/extrafoods/{user_id}/",
+    summary="Get all extra foods from a user ID",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[Food]],
+            "description": "List of foods"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+    }
+)
+async def get_extra_foods(user_id: str, start_date: datetime, end_date: datetime, moment: str = Query(None, description="Search food by moment. Case insensitive. Anywhere match")) -> CustomResponse[list[ExtraFood]]:
+    params = GetExtraFoodsParams(user_id=user_id, start_date=start_date, end_date=end_date, moment=moment)
+    return await AsyncFoodController().get_extra_foods(params)
+
+
+@router.get("/foods/ingredients/{ingredient_search}")
+async def search_ingredients_by_name(
+    ingredient_search: str = Path(..., min_length=1, description="Partial name of the ingredient"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results")
+):
+    return await AsyncFoodController().search_ingredients(ingredient_search, limit)
+
+# Endpoints that still talk to the engine directly are shared with the sync
+# router, they keep running in the threadpool.
+router.add_api_route(
+    "/foods/{food_id}/ingredients/add/{ingredient_id}",
+    food_routes.add_ingredient_to_food,
+    methods=["POST"]
+)
+router.add_api_route(
+    "/foods/{food_id}/ingredients/remove/{ingredient_id}",
+    food_routes.remove_ingredient_from_food,
+    methods=["DELETE"]
+)
+
+
+@router.get(
+    "/extraFood/{extraFoodId}/ingredients",
+    summary="Get ingredients for a specific extra food item",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[list[FoodIngredientDTO]],
+            "description": "List of ingredients for the extra food"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Ingredients not found for the given extra food ID"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid food ID format"
+        },
+    }
+)
+async def get_ingredients_by_extra_food_id(extraFood_id: int) -> CustomResponse[list[FoodIngredientDTO]]:
+    ingredients = await AsyncFoodController().get_ingredients_by_extra_food_id(extraFood_id)
+    if not ingredients:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No ingredients found for food with ID {extraFood_id}"
+        )
+    return CustomResponse(data=ingredients)
+
+
+router.add_api_route(
+    "/users/{id_user}/water_consumption_goal/{water_goal}",
+    food_routes.add_water_goal_to_user,
+    methods=["POST"]
+)
+router.add_api_route(
+    "/users/{id_user}/water_consumption/{amount_ml}/",
+    food_routes.add_water_consumption_to_user,
+    methods=["POST"]
+)
+router.add_api_route(
+    "/users/{id_user}/water_consumption/",
+    food_routes.get_water_consumption_user,
+    methods=["GET"]
+)
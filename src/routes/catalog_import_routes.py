@@ -0,0 +1,70 @@
+from tempfile import SpooledTemporaryFile
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from controller.catalog_import_controller import CatalogImportController
+from models.catalog_import import ImportFormat, ImportKind, ImportResult
+from models.response import CustomResponse, ErrorDTO
+
+router = APIRouter()
+
+# Bodies up to this size are buffered in memory, larger ones on disk
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+@router.post(
+    "/import/{kind}",
+    summary="Bulk import ingredients, foods or the ingredients of foods",
+    description=(
+        "The body is a CSV file with a header row or NDJSON, one object per line, with the fields of "
+        "the kind. Rows are matched with the catalog by name, ignoring case: existing rows are updated "
+        "and the rest inserted, in one transaction. food_ingredients rows have food, ingredient and "
+        "quantity, and are imported once their food and ingredient exist. Invalid rows are rejected "
+        "and reported without failing the import."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[ImportResult],
+            "description": "Import done, with the rows inserted, updated and rejected"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "The body is not UTF-8 or not valid CSV"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Unknown kind or format"
+        },
+    }
+)
+async def import_catalog(
+    kind: ImportKind,
+    request: Request,
+    format: Optional[ImportFormat] = Query(None, description="Format of the body. By default csv for text/csv bodies and ndjson otherwise")
+) -> CustomResponse[ImportResult]:
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = ImportFormat.CSV if content_type.startswith("text/csv") else ImportFormat.NDJSON
+
+    # The body is streamed to a spooled file instead of read whole, the
+    # import itself blocks on COPY so it runs in the threadpool
+    body = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+
+        return await run_in_threadpool(CatalogImportController().import_catalog, kind, format, body)
+    finally:
+        body.close()
@@ -0,0 +1,58 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Query, status
+from fastapi.responses import StreamingResponse
+
+from controller.export_controller import ExportController
+from models.export import ExportFormat, ExportKind, ExportParams
+from models.response import ErrorDTO
+
+router = APIRouter()
+
+
+@router.get(
+    "/export/{kind}",
+    summary="Export foods, plans, extra foods or water consumption",
+    description=(
+        "Streams every row of the kind as NDJSON or CSV with a header row. foods include their "
+        "nutrition, plans their slots by day and meal moment and their general foods, which are JSON "
+        "in CSV cells. extra_foods and water_consumption can be filtered by user and by an inclusive "
+        "date range. The export is read with a server side cursor and encoded as it is sent."
+    ),
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The export, gzip compressed when gzip=true",
+            "content": {"application/x-ndjson": {}, "text/csv": {}, "application/gzip": {}}
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "Filters not supported by the kind, or an empty date range"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Unknown kind or format, or invalid dates"
+        },
+    }
+)
+def export(
+    kind: ExportKind,
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Format of the rows"),
+    gzip: bool = Query(False, description="Compress the export with gzip as it is streamed"),
+    user_id: Optional[str] = Query(None, description="Only rows of this user. extra_foods and water_consumption only"),
+    start_date: Optional[date] = Query(None, description="Only rows from this day. extra_foods and water_consumption only"),
+    end_date: Optional[date] = Query(None, description="Only rows up to this day, included. extra_foods and water_consumption only")
+) -> StreamingResponse:
+    params = ExportParams(user_id=user_id, start_date=start_date, end_date=end_date)
+
+    return ExportController().export(kind, format, params, gzip)
@@ -1,17 +1,45 @@
-from fastapi import APIRouter, Query, status, Path
+from typing import Optional, Union
+from fastapi import APIRouter, HTTPException, Query, status, Path
+from fastapi.responses import StreamingResponse
 
 from controller.food_controller import FoodController
+from cache import tags
+from cache.conditional import conditional_get
+from cache.response_cache import cached_response, response_cache
+from metrics.query_recorder import query_budget
 from models.errors.errors import ValidationError
-from models.foodPlans import Food, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, IngredientQuantityDTO, Plan, PlanAssignment, PlanAssignmentDTO, WeeklyPlan, ExtraFood, ExtraFoodDTO
-from models.params import GetAllFoodsParams, PostPlanBody, PostFoodBody, PostExtraFoodBody, GetExtraFoodsParams
-from models.response import CustomResponse, ErrorDTO
+from models.foodPlans import Food, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, IngredientQuantityDTO, Plan, PlanAssignment, PlanAssignmentDTO, PlanCloneDTO, PlanNutrition, PlanSlotsBatchDTO, PlanTemplate, PlanTemplateDTO, TemplateInstance, TemplateInstanceDTO, TemplateInstancesDTO, WeeklyPlan, ExtraFood, ExtraFoodDTO
+from models.params import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, GetAllFoodsParams, PostPlanBody, PostFoodBody, PostExtraFoodBody, GetExtraFoodsParams
+from models.response import CustomResponse, ErrorDTO, PaginatedResponse
 from sqlalchemy import Engine, Row, text
 from database.database import engine
+from repository.food_repository import FoodRepository
 from datetime import datetime
 
 router = APIRouter()
 
 
+def parse_ids(ids: str) -> list[int]:
+    """
+    Parses a comma separated list of ids, dropping duplicates
+    """
+    try:
+        _ids = list(dict.fromkeys(int(_id) for _id in ids.split(",") if _id.strip()))
+    except ValueError:
+        raise ValidationError(
+            detail=f"ids must be comma separated integers, got '{ids}'",
+            title="Invalid ids"
+        )
+
+    if not _ids or len(_ids) > MAX_PAGE_SIZE:
+        raise ValidationError(
+            detail=f"Between 1 and {MAX_PAGE_SIZE} ids must be requested",
+            title="Invalid ids"
+        )
+
+    return _ids
+
+
 @router.get(
     "/plans",
     summary="Retrieves all the differents plans",
@@ -35,6 +63,9 @@ router = APIRouter()
         },
     }
 )
+@conditional_get(version=lambda: FoodController().get_plans_version())
+@cached_response(tags=lambda: [tags.PLANS])
+@query_budget(2)
 def get_food_plans() -> CustomResponse[list[Plan]]:
     return FoodController().get_plans()
 
@@ -66,10 +97,42 @@ def get_food_plans() -> CustomResponse[list[Plan]]:
         },
     }
 )
+@conditional_get(version=lambda id: FoodController().get_weekly_plan_version(id))
+@cached_response(tags=lambda id: [tags.plan(id)])
+@query_budget(5)
 def get_plan_by_id(id: int) -> CustomResponse[WeeklyPlan]:
     return FoodController().get_plan(id)
 
 
+@router.get(
+    "/plans/{id}/nutrition",
+    summary="Nutrition totals of a weekly plan",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[PlanNutrition],
+            "description": "Nutrition per meal, per day and for the whole week"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+    }
+)
+@cached_response(tags=lambda id: [tags.plan(id), tags.PLAN_NUTRITION])
+@query_budget(5)
+def get_plan_nutrition(id: int) -> CustomResponse[PlanNutrition]:
+    return FoodController().get_plan_nutrition(id)
+
+
 @router.post(
     "/plans",
     summary="Create a new food plan",
@@ -173,10 +236,145 @@ def get_user_plan(user_id: str) -> CustomResponse[Plan]:
         },
     }
 )
+@query_budget(2)
 def put_user_plan(assigment: PlanAssignmentDTO, user_id: str) -> CustomResponse[PlanAssignment]:
     return FoodController().put_user_plan(user_id, assigment)
 
 
+@router.put(
+    "/plans/{plan_id}/template",
+    summary="Flag or unflag a plan as template",
+    description="Templates are curated plans users get their own copy of.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[PlanTemplate],
+            "description": "Template flag updated"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+def put_plan_template(plan_id: int, template: PlanTemplateDTO) -> CustomResponse[PlanTemplate]:
+    return FoodController().set_plan_template(plan_id, template)
+
+
+@router.post(
+    "/plans/{plan_id}/clone",
+    summary="Copy a plan",
+    description="Creates a new plan with the same slots and general foods, in a single statement.",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Plan],
+            "description": "The copy"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(1)
+def clone_plan(plan_id: int, data: PlanCloneDTO) -> CustomResponse[Plan]:
+    return FoodController().clone_plan(plan_id, data)
+
+
+@router.post(
+    "/plans/{plan_id}/instances",
+    summary="Give many users their own copy of a template",
+    description=(
+        "Copies the template once per user and assigns every copy to its user, replacing their current "
+        "plan, in a single statement. Users are created when missing."
+    ),
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[list[TemplateInstance]],
+            "description": "The copy of every user"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Template not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(1)
+def post_template_instances(plan_id: int, data: TemplateInstancesDTO) -> CustomResponse[list[TemplateInstance]]:
+    return FoodController().instantiate_template(plan_id, data.user_ids)
+
+
+@router.post(
+    "/users/{user_id}/plan/template",
+    summary="Give the user their own copy of a template",
+    description="The copy replaces the user's current plan and can be edited without changing the template.",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": CustomResponse[Plan],
+            "description": "The user's new plan"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Template not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(2)
+def post_user_plan_from_template(user_id: str, data: TemplateInstanceDTO) -> CustomResponse[Plan]:
+    return FoodController().instantiate_template_for_user(user_id, data)
+
+
 # def post_user_plan(userId:int, planId:int) -> None:
 #    return FoodController().post_user_plan(userId, planId)
 #
@@ -306,6 +504,51 @@ def update_meal_in_plan(plan_id: int, data: FoodLinkDTO) -> CustomResponse[Weekl
     return FoodController().update_food_in_plan(plan_id, data)
 
 
+@router.patch(
+    "/plans/{plan_id}/foods",
+    summary="Edit many slots of a plan at once",
+    description=(
+        "Applies set, replace and clear operations to slots of the plan in one transaction and "
+        "retrieves the updated weekly plan. set fills an empty slot, replace changes the food of a "
+        "filled one and clear empties a slot. Nothing is changed when any operation fails."
+    ),
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[WeeklyPlan],
+            "description": "The plan after the operations"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "A slot edited twice, or a set or replace without food"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "Plan, day, moment or food not found, or a replace of an empty slot"
+        },
+        status.HTTP_409_CONFLICT: {
+            "model": ErrorDTO,
+            "description": "A set of a slot that already has a food"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+@query_budget(7)
+def edit_plan_slots(plan_id: int, batch: PlanSlotsBatchDTO) -> CustomResponse[WeeklyPlan]:
+    return FoodController().edit_plan_slots(plan_id, batch)
+
+
 @router.delete(
     "/users/{user_id}/plan/foods",
     summary="remove a food from user's plan",
@@ -337,6 +580,62 @@ def remove_food_from_user_plan(data: FoodTimeDTO, user_id: str) -> CustomRespons
     return FoodController().remove_food_from_user_plan(user_id, data)
 
 
+@router.get(
+    "/foods/nutrition",
+    summary="Get the nutritional values of many foods",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[dict[int, Optional[dict]]],
+            "description": "Nutritional values by food id, null for foods without nutritional data"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "Invalid ids"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+    }
+)
+@cached_response(tags=lambda ids: [tags.food(food_id) for food_id in parse_ids(ids)])
+def get_foods_nutrition(ids: str = Query(..., description="Comma separated food ids, e.g. 1,2,3")) -> CustomResponse[dict[int, Optional[dict]]]:
+    return FoodController().get_foods_nutritional_values(parse_ids(ids))
+
+
+@router.get(
+    "/extra/nutrition",
+    summary="Get the nutritional values of many extra foods",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[dict[int, Optional[dict]]],
+            "description": "Nutritional values by extra food id, null for extra foods without nutritional data"
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": ErrorDTO,
+            "description": "Invalid ids"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+    }
+)
+@cached_response(tags=lambda ids: [tags.extra_food(extra_food_id) for extra_food_id in parse_ids(ids)])
+def get_extra_foods_nutrition(ids: str = Query(..., description="Comma separated extra food ids, e.g. 1,2,3")) -> CustomResponse[dict[int, Optional[dict]]]:
+    return FoodController().get_extra_foods_nutritional_values(parse_ids(ids))
+
+
 @router.get(
     "/foods/{food_id}",
     summary="Get food by id",
@@ -364,6 +663,8 @@ def remove_food_from_user_plan(data: FoodTimeDTO, user_id: str) -> CustomRespons
         },
     }
 )
+@conditional_get(version=lambda food_id: FoodController().get_food_version(food_id))
+@cached_response(tags=lambda food_id: [tags.food(food_id)])
 def get_food_by_id(food_id: int) -> CustomResponse[Food]:
     return FoodController().get_food_by_id(food_id)
 
@@ -372,10 +673,12 @@ def get_food_by_id(food_id: int) -> CustomResponse[Food]:
     "/foods",
     summary="Get all foods",
     status_code=status.HTTP_200_OK,
+    response_model=PaginatedResponse[Food],
     responses={
         status.HTTP_200_OK: {
-            "model": CustomResponse[list[Food]],
-            "description": "List of foods"
+            "model": PaginatedResponse[Food],
+            "description": "Page of foods ordered by id, or the whole list as NDJSON when stream=true",
+            "content": {"application/x-ndjson": {}}
         },
         status.HTTP_401_UNAUTHORIZED: {
             "model": ErrorDTO,
@@ -391,8 +694,17 @@ def get_food_by_id(food_id: int) -> CustomResponse[Food]:
         },
     }
 )
-def get_all_foods(search_name: str = Query(None, description="Search food by name. Case insensitive. Anywhere match")) -> CustomResponse[list[Food]]:
-    params = GetAllFoodsParams(search_name=search_name)
+def get_all_foods(
+    search_name: str = Query(None, description="Search food by name, ignoring case and accents. Results are ranked by relevance, limited to limit and not paginated"),
+    cursor: Optional[int] = Query(None, description="Return foods after this id. Use the next_cursor of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    stream: bool = Query(False, description="Stream every matching food as NDJSON instead of a page. Ignores limit")
+) -> Union[PaginatedResponse[Food], StreamingResponse]:
+    params = GetAllFoodsParams(search_name=search_name, cursor=cursor, limit=limit)
+
+    if stream:
+        return FoodController().stream_all_foods(params)
+
     return FoodController().get_all_foods(params)
 
 @router.post(
@@ -489,10 +801,12 @@ def get_ingredients_by_food_id(food_id: int) -> CustomResponse[list[FoodIngredie
     return CustomResponse(data=ingredients)
 
 @router.get("/foods/{food_id}/nutrition")
+@cached_response(tags=lambda food_id: [tags.food(food_id)])
 def get_food_nutrition(food_id: int):
     return FoodController().get_nutritional_values(food_id = food_id)
 
 @router.get("/extra/{extraFood_id}/nutrition")
+@cached_response(tags=lambda extraFood_id: [tags.extra_food(extraFood_id)])
 def get_extra_food_nutrition(extraFood_id: int):
     return FoodController().get_nutritional_values_extrafood(extraFood_id = extraFood_id)
 
@@ -516,6 +830,8 @@ def get_extra_food_nutrition(extraFood_id: int):
         },
     }
 )
+@conditional_get(version=lambda: FoodController().get_ingredients_version())
+@cached_response(tags=lambda: [tags.INGREDIENTS])
 def get_all_ingredients() -> CustomResponse[list[Ingredient]]:
     ingredients = FoodController().get_all_ingredients()
     return CustomResponse(data=ingredients)
@@ -588,7 +904,9 @@ def add_ingredient_to_food(food_id: int, ingredient_id: int, data: IngredientQua
                 "ingredient_id": ingredient_id,
                 "quantity": data.quantity
             })
+            FoodRepository(connection=conn).refresh_food_nutrition([food_id])
             conn.commit()
+            response_cache.invalidate(tags.food(food_id), tags.PLAN_NUTRITION)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
@@ -606,39 +924,24 @@ def remove_ingredient_from_food(food_id: int, ingredient_id: int):
                 "food_id": food_id,
                 "ingredient_id": ingredient_id
             })
-            conn.commit()
             if result.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Ingrediente no encontrado en la comida.")
+            FoodRepository(connection=conn).refresh_food_nutrition([food_id])
+            conn.commit()
+            response_cache.invalidate(tags.food(food_id), tags.PLAN_NUTRITION)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "Ingrediente eliminado de la comida exitosamente."}
 
 @router.get("/foods/ingredients/{ingredient_search}")
-def search_ingredients_by_name(ingredient_search: str = Path(..., min_length=1, description="Partial name of the ingredient")):
-    search_query = text("""
-        SELECT id, name, measure_type
-        FROM ingredients
-        WHERE name ILIKE :search_term
-    """)
-    
-    with engine.connect() as conn:
-        try:
-            result = conn.execute(search_query, {
-                "search_term": f"%{ingredient_search}%"
-            })
-            ingredients = [
-                {
-                    "id": row.id,
-                    "name": row.name,
-                    "measure_type": row.measure_type
-                }
-                for row in result.fetchall()
-            ]
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-
-    return ingredients
+def search_ingredients_by_name(
+    ingredient_search: str = Path(..., min_length=1, description="Partial name of the ingredient"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results")
+):
+    return FoodController().search_ingredients(ingredient_search, limit)
 
 @router.get(
     "/extraFood/{extraFoodId}/ingredients",
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, status
 
 from controller.health_controller import HealthController
-from models.health import Health, HealthDB
+from models.health import Health, HealthDB, LogPipelineStats, ResponseCacheStats, TokenCacheStats
 
 router = APIRouter()
 
@@ -22,3 +22,30 @@ def get_health() -> Health:
 )
 def get_health_db() -> HealthDB:
     return HealthController().get_health_db()
+
+
+@router.get(
+    "/cache",
+    summary="Response cache counters",
+    status_code=status.HTTP_200_OK
+)
+def get_cache_stats() -> ResponseCacheStats:
+    return HealthController().get_cache_stats()
+
+
+@router.get(
+    "/token-cache",
+    summary="Verified JWT cache counters",
+    status_code=status.HTTP_200_OK
+)
+def get_token_cache_stats() -> TokenCacheStats:
+    return HealthController().get_token_cache_stats()
+
+
+@router.get(
+    "/logs",
+    summary="Background logging counters",
+    status_code=status.HTTP_200_OK
+)
+def get_log_stats() -> LogPipelineStats:
+    return HealthController().get_log_stats()
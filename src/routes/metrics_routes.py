@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from metrics.registry import metrics_registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get(
+    "",
+    summary="Prometheus metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False
+)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, status
+
+from controller.reminder_controller import ReminderController
+from models.reminders import PushTokenDTO
+from models.response import CustomResponse, ErrorDTO
+
+router = APIRouter()
+
+
+@router.put(
+    "/users/{user_id}/push_token",
+    summary="Register the user's push token",
+    description="Meal reminders are sent to this token. Replaces the previous token of the user.",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "model": CustomResponse[PushTokenDTO],
+            "description": "Push token saved"
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": ErrorDTO,
+            "description": "User unauthorized"
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": ErrorDTO,
+            "description": "No authorization provided"
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "model": ErrorDTO,
+            "description": "User not found"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "model": ErrorDTO,
+            "description": "Invalid json body format"
+        },
+    }
+)
+def put_push_token(user_id: str, push_token: PushTokenDTO) -> CustomResponse[PushTokenDTO]:
+    return ReminderController().put_push_token(user_id, push_token)
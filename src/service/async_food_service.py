@@ -0,0 +1,518 @@
+from abc import ABCMeta, abstractmethod
+from typing import AsyncIterator, Optional
+
+from cache import tags
+from cache.response_cache import ResponseCache, cache_version, response_cache as default_response_cache
+from models.errors.errors import NotFoundError
+from models.foodPlans import Food, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO, Plan, PlanAssignment, PlanAssignmentDTO, PlanDTO, PlanNutrition, PlanCloneDTO, PlanSlotsBatchDTO, PlanTemplate, PlanTemplateDTO, TemplateInstance, TemplateInstanceDTO, WeeklyPlan, ExtraFoodDTO, ExtraFood
+from models.params import GetAllFoodsParams, PostFoodBody, GetExtraFoodsParams
+from repository.async_food_repository import AsyncFoodRepository, IAsyncFoodRepository
+from service.nutrition import build_plan_nutrition
+from service.plan_slots import resolve_slot_operations
+from service.reference_data import ReferenceDataRegistry, reference_data_registry
+from service.weekly_plan_cache import WeeklyPlanCache, food_slot, weekly_plan_cache
+
+
+class IAsyncFoodService(metaclass=ABCMeta):
+    @abstractmethod
+    async def get_plans(self) -> list[Plan]:
+        pass
+
+    @abstractmethod
+    async def get_plan(self, plan_id: int) -> Plan:
+        pass
+
+    @abstractmethod
+    async def get_weekly_plan_by_id(self, plan_id: int) -> WeeklyPlan:
+        pass
+
+    @abstractmethod
+    async def get_plan_nutrition(self, plan_id: int) -> PlanNutrition:
+        pass
+
+    @abstractmethod
+    async def save_food_plan(self, plan: PlanDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    async def get_food_plan_by_user_id(self, user_id: str) -> Plan:
+        pass
+
+    @abstractmethod
+    async def put_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
+        pass
+
+    @abstractmethod
+    async def get_foods_from_plan(self, plan_id: int) -> list[Food]:
+        pass
+
+    @abstractmethod
+    async def get_foods_from_user_plan(self, user_id: str) -> list[Food]:
+        pass
+
+    @abstractmethod
+    async def save_food_to_user_plan(self, user_id: str, data: FoodLinkDTO) -> WeeklyPlan:
+        pass
+
+    @abstractmethod
+    async def remove_food_from_user_plan(self, user_id: str, data: FoodTimeDTO) -> WeeklyPlan:
+        pass
+
+    @abstractmethod
+    async def update_food_in_plan(self, plan_id: int, data: FoodLinkDTO) -> WeeklyPlan:
+        pass
+
+    @abstractmethod
+    async def edit_plan_slots(self, plan_id: int, batch: PlanSlotsBatchDTO) -> WeeklyPlan:
+        pass
+
+    @abstractmethod
+    async def set_plan_template(self, plan_id: int, template: PlanTemplateDTO) -> PlanTemplate:
+        pass
+
+    @abstractmethod
+    async def clone_plan(self, plan_id: int, data: PlanCloneDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    async def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        pass
+
+    @abstractmethod
+    async def instantiate_template_for_user(self, user_id: str, data: TemplateInstanceDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    async def create_food_plan_by_preferences(self, user_id: str, preferences: list, plan: PlanDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    async def get_food_by_id(self, food_id: int) -> Food:
+        pass
+
+    @abstractmethod
+    async def get_all_foods(self, params: GetAllFoodsParams) -> tuple[list[Food], Optional[int]]:
+        pass
+
+    @abstractmethod
+    def stream_all_foods(self, params: GetAllFoodsParams) -> AsyncIterator[Food]:
+        pass
+
+    @abstractmethod
+    async def save_food_in_db(self, data: PostFoodBody) -> Food:
+        pass
+
+    @abstractmethod
+    async def save_ingredient(self, ingredient: IngredientDTO) -> Ingredient:
+        pass
+
+    @abstractmethod
+    async def save_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> ExtraFood:
+        pass
+
+    @abstractmethod
+    async def get_extra_foods(self, params: GetExtraFoodsParams) -> list[ExtraFood]:
+        pass
+
+    @abstractmethod
+    async def get_ingredients_by_extra_food_id(self, extra_food_id: int) -> list[FoodIngredientDTO]:
+        pass
+
+    @abstractmethod
+    async def get_ingredients_by_food_id(self, food_id: int) -> list[FoodIngredientDTO]:
+        pass
+
+    @abstractmethod
+    async def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def get_plans_version(self) -> str:
+        pass
+
+    @abstractmethod
+    async def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def get_food_version(self, food_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def get_ingredients_version(self) -> str:
+        pass
+
+
+class AsyncFoodService(IAsyncFoodService):
+    def __init__(self, repository: Optional[IAsyncFoodRepository] = None, reference_data: Optional[ReferenceDataRegistry] = None, plan_cache: Optional[WeeklyPlanCache] = None, response_cache: Optional[ResponseCache] = None):
+        self.repository = repository or AsyncFoodRepository()
+        self.reference_data = reference_data or reference_data_registry
+        self.plan_cache = plan_cache or weekly_plan_cache
+        self.response_cache = response_cache or default_response_cache
+
+    async def get_plans(self) -> list[Plan]:
+        return await self.repository.get_plans()
+
+    async def get_plan(self, plan_id: int) -> Plan:
+        _plan = await self.repository.get_plan_by_id(plan_id)
+
+        if not _plan:
+            raise NotFoundError(f"Plan with id {plan_id} not found")
+
+        return _plan
+
+    async def get_weekly_plan_by_id(self, plan_id: int) -> WeeklyPlan:
+        # Set by conditional GETs, the cached plan must match their ETag
+        _version = cache_version.get()
+
+        _cached = self.plan_cache.get(plan_id, _version)
+        if _cached is not None:
+            return _cached
+
+        plan = await self.get_plan(plan_id)
+
+        _slots = await self.repository.get_weekly_plan_by_id(plan_id)
+
+        await self.reference_data.ensure_loaded()
+        schedule = self.reference_data.empty_schedule()
+        for row in _slots:
+            day = self.reference_data.get_day_name(row.day_id)
+            moment = self.reference_data.get_moment_name(row.meal_moment_id)
+
+            if day is None or moment is None:
+                continue
+
+            schedule[day][moment] = food_slot(row)
+
+        _weekly_plan = WeeklyPlan(
+            **dict(plan),
+            weekly_plan=schedule
+        )
+        self.plan_cache.put(_weekly_plan, _version)
+
+        return _weekly_plan
+
+    async def _patch_weekly_plan(self, plan_id: int, day: str, moment: str, food: Optional[Food]) -> WeeklyPlan:
+        return await self._patch_weekly_plan_slots(plan_id, [(day, moment, food)])
+
+    async def _patch_weekly_plan_slots(self, plan_id: int, slots: list[tuple[str, str, Optional[Food]]]) -> WeeklyPlan:
+        """
+        Apply slot changes to the cached plan, the plan is only loaded when
+        it is not cached
+        """
+        await self.response_cache.invalidate_async(tags.plan(plan_id))
+
+        _weekly_plan = None
+        for day, moment, food in slots:
+            _weekly_plan = self.plan_cache.set_slot(
+                plan_id, day, moment, food_slot(food) if food else None
+            )
+
+            if _weekly_plan is None:
+                return await self.get_weekly_plan_by_id(plan_id)
+
+        return _weekly_plan or await self.get_weekly_plan_by_id(plan_id)
+
+    async def get_plan_nutrition(self, plan_id: int) -> PlanNutrition:
+        await self.get_plan(plan_id)
+
+        async with self.repository.transaction() as repository:
+            _slots = await repository.get_weekly_plan_by_id(plan_id)
+            _ingredients = await repository.get_plan_ingredients(plan_id)
+
+        await self.reference_data.ensure_loaded()
+        return build_plan_nutrition(
+            plan_id,
+            _slots,
+            _ingredients,
+            self.reference_data.get_days(),
+            self.reference_data.get_moments()
+        )
+
+    async def save_food_plan(self, plan: PlanDTO) -> Plan:
+        _plan = await self.repository.save_plan(plan)
+        await self.response_cache.invalidate_async(tags.PLANS)
+
+        return _plan
+
+    async def get_food_plan_by_user_id(self, user_id: str) -> Plan:
+        _plan = await self.repository.get_plan_by_user_id(user_id)
+
+        if not _plan:
+            raise NotFoundError(f"Plan for user {user_id} not found")
+
+        return _plan
+
+    async def put_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
+        async with self.repository.transaction() as repository:
+            _plan = await repository.get_plan_by_user_id(user_id)
+
+            if not _plan:
+                return await repository.save_user_plan(user_id, assignment)
+
+            return await repository.update_user_plan(user_id, assignment)
+
+    async def get_foods_from_plan(self, plan_id: int) -> list[Food]:
+        return await self.repository.get_foods_from_plan(plan_id)
+
+    async def get_foods_from_user_plan(self, user_id: str) -> list[Food]:
+        _plan = await self.repository.get_plan_by_user_id(user_id)
+
+        if not _plan:
+            raise NotFoundError(f"Plan for user {user_id} not found")
+
+        return await self.repository.get_foods_from_plan(_plan.id_plan)
+
+    async def save_food_to_user_plan(self, user_id: str, data: FoodLinkDTO) -> WeeklyPlan:
+        _plan = await self.repository.get_plan_by_user_id(user_id)
+
+        if not _plan:
+            raise NotFoundError(f"Plan for user {user_id} not found")
+
+        await self.reference_data.ensure_loaded()
+        _day = self.reference_data.get_day_id(data.day)
+        if not _day:
+            raise NotFoundError(f"Day {data.day} not found")
+
+        _moment = self.reference_data.get_moment_id(data.moment)
+        if not _moment:
+            raise NotFoundError(f"Moment {data.moment} not found")
+
+        _food = await self.repository.save_food_weekly_plan(
+            _plan.id_plan, _day, _moment, data.food_id
+        )
+
+        return await self._patch_weekly_plan(_plan.id_plan, data.day, data.moment, _food)
+
+    async def remove_food_from_user_plan(self, user_id: str, data: FoodTimeDTO) -> WeeklyPlan:
+        _plan = await self.repository.get_plan_by_user_id(user_id)
+        if not _plan:
+            raise NotFoundError(f"Plan for user {user_id} not found")
+
+        await self.reference_data.ensure_loaded()
+        _day = self.reference_data.get_day_id(data.day)
+        if not _day:
+            raise NotFoundError(f"Day {data.day} not found")
+
+        _moment = self.reference_data.get_moment_id(data.moment)
+        if not _moment:
+            raise NotFoundError(f"Moment {data.moment} not found")
+
+        _day_name, _moment_name = data.day, data.moment
+        data.day = str(_day)
+        data.moment = str(_moment)
+
+        await self.repository.remove_food_from_plan(_plan.id_plan, data)
+
+        return await self._patch_weekly_plan(_plan.id_plan, _day_name, _moment_name, None)
+
+    async def update_food_in_plan(self, plan_id: int, data: FoodLinkDTO) -> WeeklyPlan:
+        _plan = await self.repository.get_plan_by_id(plan_id)
+        if not _plan:
+            raise NotFoundError(f"Plan with id {plan_id} not found")
+
+        await self.reference_data.ensure_loaded()
+        _day = self.reference_data.get_day_id(data.day)
+        if not _day:
+            raise NotFoundError(f"Day {data.day} not found")
+
+        _moment = self.reference_data.get_moment_id(data.moment)
+        if not _moment:
+            raise NotFoundError(f"Moment {data.moment} not found")
+
+        _day_name, _moment_name = data.day, data.moment
+        data.day = str(_day)
+        data.moment = str(_moment)
+
+        _food = await self.repository.update_food_weekly_plan(plan_id, data)
+
+        return await self._patch_weekly_plan(plan_id, _day_name, _moment_name, _food)
+
+    async def edit_plan_slots(self, plan_id: int, batch: PlanSlotsBatchDTO) -> WeeklyPlan:
+        await self.reference_data.ensure_loaded()
+        _operations = resolve_slot_operations(batch, self.reference_data)
+
+        _written = await self.repository.apply_slot_operations(plan_id, [
+            (operation.op.value, operation.day_id, operation.meal_moment_id, operation.food_id)
+            for operation in _operations
+        ])
+        _foods = {(day_id, moment_id): food for day_id, moment_id, food in _written}
+
+        return await self._patch_weekly_plan_slots(plan_id, [
+            (operation.day, operation.moment, _foods.get((operation.day_id, operation.meal_moment_id)))
+            for operation in _operations
+        ])
+
+    async def set_plan_template(self, plan_id: int, template: PlanTemplateDTO) -> PlanTemplate:
+        _template = await self.repository.set_plan_template(plan_id, template.is_template)
+
+        if not _template:
+            raise NotFoundError(f"Plan with id {plan_id} not found")
+
+        return _template
+
+    async def clone_plan(self, plan_id: int, data: PlanCloneDTO) -> Plan:
+        _plan = await self.repository.clone_plan(plan_id, data.title)
+
+        if not _plan:
+            raise NotFoundError(f"Plan with id {plan_id} not found")
+
+        await self.response_cache.invalidate_async(tags.PLANS)
+
+        return _plan
+
+    async def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        # Each user gets one copy, a repeated id would be assigned twice
+        _user_ids = list(dict.fromkeys(user_ids))
+
+        _instances = await self.repository.instantiate_template(template_id, _user_ids)
+
+        if not _instances:
+            raise NotFoundError(f"Template with id {template_id} not found")
+
+        await self.response_cache.invalidate_async(tags.PLANS)
+
+        return _instances
+
+    async def instantiate_template_for_user(self, user_id: str, data: TemplateInstanceDTO) -> Plan:
+        _instance, = await self.instantiate_template(data.template_id, [user_id])
+
+        return await self.get_plan(_instance.plan_id)
+
+    async def create_food_plan_by_preferences(self, user_id: str, preferences: list, plan: PlanDTO) -> Plan:
+        food_id_placeholders = [str(int(fid)) for fid in preferences]
+        _matches = await self.repository.get_matching_food_ids(food_id_placeholders)
+        if not _matches:
+            raise NotFoundError("No matching foods found")
+
+        await self.reference_data.ensure_loaded()
+        _days = self.reference_data.get_days()
+        _moments = self.reference_data.get_moments()
+
+        slots: list[tuple[int, int, int]] = []
+        food_index = 0
+        total_foods = len(_matches)
+
+        for day in _days:
+            for moment in _moments:
+                food_id = _matches[food_index % total_foods]
+                slots.append((day["id"], moment["id"], food_id))
+                food_index += 1
+
+        _plan = await self.repository.materialize_plan(user_id, plan, slots)
+        await self.response_cache.invalidate_async(tags.PLANS)
+
+        return _plan
+
+    async def get_food_by_id(self, food_id: int) -> Food:
+        food = await self.repository.get_food_by_id(food_id)
+
+        if not food:
+            raise NotFoundError(f"Food with id {food_id} not found")
+
+        return food
+
+    async def get_all_foods(self, params: GetAllFoodsParams) -> tuple[list[Food], Optional[int]]:
+        page_size = params.limit
+
+        # Searches are ranked by relevance, so they return the best matches
+        # instead of an id ordered page
+        if params.search_name:
+            return await self.repository.search_foods(params.search_name, page_size), None
+
+        # One extra row tells whether there is a next page
+        _foods = await self.repository.get_all_foods(GetAllFoodsParams(
+            search_name=params.search_name,
+            cursor=params.cursor,
+            limit=page_size + 1
+        ))
+
+        if len(_foods) > page_size:
+            return _foods[:page_size], _foods[page_size - 1].id
+
+        return _foods, None
+
+    def stream_all_foods(self, params: GetAllFoodsParams) -> AsyncIterator[Food]:
+        return self.repository.stream_all_foods(params)
+
+    async def save_food_in_db(self, data: PostFoodBody) -> Food:
+        async with self.repository.transaction() as repository:
+            saved_food = await repository.save_food(food=data.food)
+
+            if data.food.ingredients:
+                await repository.save_food_ingredients(saved_food.id, data.food.ingredients)
+
+            await repository.link_food_to_plan(
+                food_id=saved_food.id,
+                plan_id=data.plan_id,
+                day_id=data.day_id,
+                meal_moment_id=data.meal_moment_id
+            )
+
+        self.plan_cache.invalidate(data.plan_id)
+        await self.response_cache.invalidate_async(tags.plan(data.plan_id), tags.food(saved_food.id))
+
+        return saved_food
+
+    async def save_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> ExtraFood:
+        async with self.repository.transaction() as repository:
+            extra_food: ExtraFood = await repository.save_extra_food(extraFood, userId)
+            await repository.link_extra_food_with_user(extra_food.id_extra_food, userId)
+
+            if extraFood.ingredients:
+                await repository.save_extra_food_ingredients(extra_food.id_extra_food, extraFood.ingredients)
+
+        await self.response_cache.invalidate_async(tags.extra_food(extra_food.id_extra_food))
+
+        return extra_food
+
+    async def save_ingredient(self, ingredient: IngredientDTO) -> Ingredient:
+        saved_ingredient = await self.repository.save_ingredient(ingredient)
+
+        if not saved_ingredient:
+            raise Exception("Failed to save ingredient")
+
+        await self.response_cache.invalidate_async(tags.INGREDIENTS)
+
+        return saved_ingredient
+
+    async def get_food_nutritional_values(self, food_id: int) -> Optional[dict]:
+        return await self.repository.get_nutritional_values(food_id, extraFood_id=None)
+
+    async def get_food_nutritional_values_extrafood(self, extra_food_id: int) -> Optional[dict]:
+        return await self.repository.get_nutritional_values(food_id=None, extraFood_id=extra_food_id)
+
+    async def get_foods_nutritional_values(self, food_ids: list[int]) -> dict[int, Optional[dict]]:
+        _nutrition = await self.repository.get_nutritional_values_by_ids(food_ids=food_ids, extraFood_ids=None)
+        return {food_id: _nutrition.get(food_id) for food_id in food_ids}
+
+    async def get_extra_foods_nutritional_values(self, extra_food_ids: list[int]) -> dict[int, Optional[dict]]:
+        _nutrition = await self.repository.get_nutritional_values_by_ids(food_ids=None, extraFood_ids=extra_food_ids)
+        return {extra_food_id: _nutrition.get(extra_food_id) for extra_food_id in extra_food_ids}
+
+    async def get_ingredients_by_food_id(self, food_id: int) -> list[FoodIngredientDTO]:
+        return await self.repository.get_ingredients_by_food_id(food_id=food_id, extraFoodId=None)
+
+    async def get_all_ingredients(self) -> list[Ingredient]:
+        return await self.repository.get_all_ingredients()
+
+    async def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        return await self.repository.search_ingredients(search_name, limit)
+
+    async def get_extra_foods(self, params: GetExtraFoodsParams) -> list[ExtraFood]:
+        return await self.repository.get_extra_foods(params)
+
+    async def get_ingredients_by_extra_food_id(self, extra_food_id: int) -> list[FoodIngredientDTO]:
+        return await self.repository.get_ingredients_by_food_id(food_id=None, extraFoodId=extra_food_id)
+
+    async def get_plans_version(self) -> str:
+        return await self.repository.get_plans_version()
+
+    async def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        return await self.repository.get_weekly_plan_version(plan_id)
+
+    async def get_food_version(self, food_id: int) -> Optional[str]:
+        return await self.repository.get_food_version(food_id)
+
+    async def get_ingredients_version(self) -> str:
+        return await self.repository.get_ingredients_version()
@@ -0,0 +1,194 @@
+import csv
+import json
+import logging
+from abc import ABCMeta, abstractmethod
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from pydantic import BaseModel
+from pydantic import ValidationError as PydanticValidationError
+
+from cache import tags
+from cache.response_cache import ResponseCache, response_cache as default_response_cache
+from models.catalog_import import FoodIngredientImportDTO, ImportFormat, ImportKind, ImportResult, ImportRowError, IngredientImportDTO
+from models.errors.errors import ValidationError
+from models.foodPlans import FoodDTO
+from repository.catalog_import_repository import STAGING, CatalogImportRepository, ICatalogImportRepository, MergeResult
+from service.weekly_plan_cache import WeeklyPlanCache, weekly_plan_cache
+
+# Model every row of a kind is validated with
+ROW_MODELS: dict[ImportKind, type[BaseModel]] = {
+    ImportKind.INGREDIENTS: IngredientImportDTO,
+    ImportKind.FOODS: FoodDTO,
+    ImportKind.FOOD_INGREDIENTS: FoodIngredientImportDTO,
+}
+
+
+class ImportProgress(NamedTuple):
+    kind: ImportKind
+    rows: int
+    rejected: int
+
+
+def read_records(source: TextIO, format: ImportFormat) -> Iterator[tuple[int, Any]]:
+    """
+    (line, record) of every row of source, a dict or, for rows that cannot
+    be parsed, the ValueError explaining why. CSV files start with a header
+    row and empty values are read as missing.
+    """
+    if format == ImportFormat.CSV:
+        reader = csv.DictReader(source)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, ValueError("More values than columns in the header")
+                continue
+
+            yield reader.line_num, {key: value for key, value in record.items() if value not in ("", None)}
+        return
+
+    for line, text in enumerate(source, start=1):
+        if not text.strip():
+            continue
+
+        try:
+            record = json.loads(text)
+        except ValueError as e:
+            yield line, ValueError(f"Invalid JSON: {e}")
+            continue
+
+        yield line, record if isinstance(record, dict) else ValueError("Expected a JSON object")
+
+
+def _describe(error: PydanticValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+class ICatalogImportService(metaclass=ABCMeta):
+    @abstractmethod
+    def import_catalog(self, kind: ImportKind, format: ImportFormat, source: TextIO, progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportResult:
+        pass
+
+
+class CatalogImportService(ICatalogImportService):
+    """
+    Bulk import of ingredients, foods and the ingredients of foods.
+
+    The input is read and validated chunk_size rows at a time, valid rows are
+    copied to a staging table and merged with the catalog by name at the
+    end, in one transaction. Invalid rows are rejected one by one, with
+    their line and the reason, without failing the import.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[ICatalogImportRepository] = None,
+        plan_cache: Optional[WeeklyPlanCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        chunk_size: int = 5000,
+        max_errors: int = 1000
+    ):
+        """
+        Args:
+            max_errors: Rejected rows reported in detail, the rest are only
+                counted
+        """
+        self.repository = repository or CatalogImportRepository()
+        self.plan_cache = plan_cache or weekly_plan_cache
+        self.response_cache = response_cache or default_response_cache
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def _validate(self, kind: ImportKind, chunk: Iterable[tuple[int, Any]], errors: list[ImportRowError]) -> tuple[list[tuple[Any, ...]], int]:
+        """
+        Staging rows of the valid records of chunk. Returns them with the
+        number of rejected records, whose errors are added to errors.
+        """
+        model = ROW_MODELS[kind]
+        columns = STAGING[kind][1]
+        rows = []
+        rejected = 0
+
+        for line, record in chunk:
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                row = model.model_validate(record).model_dump(mode="json")
+            except PydanticValidationError as e:
+                error = _describe(e)
+            except ValueError as e:
+                error = str(e)
+            else:
+                rows.append((line, *(row.get(column) for column in columns)))
+                continue
+
+            rejected += 1
+            if len(errors) < self.max_errors:
+                errors.append(ImportRowError(line=line, error=error))
+
+        return rows, rejected
+
+    def import_catalog(self, kind: ImportKind, format: ImportFormat, source: TextIO, progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportResult:
+        records = read_records(source, format)
+        errors: list[ImportRowError] = []
+        rows_read = 0
+        rejected = 0
+
+        try:
+            with self.repository.transaction() as repository:
+                repository.create_staging(kind)
+
+                while chunk := list(islice(records, self.chunk_size)):
+                    rows, chunk_rejected = self._validate(kind, chunk, errors)
+                    if rows:
+                        repository.copy_to_staging(kind, rows)
+
+                    rows_read += len(chunk)
+                    rejected += chunk_rejected
+
+                    if progress is not None:
+                        progress(ImportProgress(kind, rows_read, rejected))
+
+                merged = repository.merge(kind, self.max_errors)
+        except UnicodeDecodeError:
+            raise ValidationError(detail="The input is not UTF-8 text", title="Invalid import")
+        except csv.Error as e:
+            raise ValidationError(detail=f"Invalid CSV after {rows_read} rows: {e}", title="Invalid import")
+
+        errors = sorted(errors + merged.errors, key=lambda error: error.line)[:self.max_errors]
+
+        if merged.inserted or merged.updated:
+            self._invalidate(kind, merged)
+
+        logging.info(
+            f"Imported {kind.value}: {rows_read} rows, {merged.inserted} inserted, "
+            f"{merged.updated} updated, {rejected + merged.rejected} rejected")
+
+        return ImportResult(
+            kind=kind,
+            rows=rows_read,
+            inserted=merged.inserted,
+            updated=merged.updated,
+            rejected=rejected + merged.rejected,
+            errors=errors
+        )
+
+    def _invalidate(self, kind: ImportKind, merged: MergeResult) -> None:
+        if kind == ImportKind.INGREDIENTS:
+            self.response_cache.invalidate(tags.INGREDIENTS)
+
+        if merged.food_ids:
+            # Weekly plans embed the foods and their totals depend on them
+            for plan_id in merged.plan_ids:
+                self.plan_cache.invalidate(plan_id)
+
+            self.response_cache.invalidate(
+                tags.PLAN_NUTRITION,
+                *(tags.food(food_id) for food_id in merged.food_ids),
+                *(tags.plan(plan_id) for plan_id in merged.plan_ids)
+            )
+
+        if merged.extra_food_ids:
+            self.response_cache.invalidate(*(tags.extra_food(extra_food_id) for extra_food_id in merged.extra_food_ids))
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+import zlib
+from abc import ABCMeta, abstractmethod
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, Optional
+
+from pydantic_core import to_json
+
+from models.errors.errors import ValidationError
+from models.export import USER_EXPORTS, ExportFormat, ExportKind, ExportParams
+from repository.export_repository import EXPORTS, ExportRepository, IExportRepository
+
+# Bytes of encoded rows sent at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def encode_ndjson(columns: list[str], rows: Iterable[tuple[Any, ...]], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    buffer = bytearray()
+
+    for row in rows:
+        buffer += to_json(dict(zip(columns, row)))
+        buffer += b"\n"
+
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def _csv_value(value: Any) -> Any:
+    # Nested values, e.g. the slots of a plan, are written as JSON
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+
+    return value
+
+
+def encode_csv(columns: list[str], rows: Iterable[tuple[Any, ...]], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresses chunks as they come, the output is a single gzip member"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+
+    yield compressor.flush()
+
+
+class IExportService(metaclass=ABCMeta):
+    @abstractmethod
+    def export(self, kind: ExportKind, format: ExportFormat, params: ExportParams, gzip: bool = False) -> Iterator[bytes]:
+        pass
+
+
+class ExportService(IExportService):
+    """
+    Exports of the catalog, the plans and what users log, encoded as they are
+    read from the database so memory does not grow with the export.
+    """
+
+    def __init__(self, repository: Optional[IExportRepository] = None, chunk_size: int = CHUNK_SIZE):
+        self.repository = repository or ExportRepository()
+        self.chunk_size = chunk_size
+
+    def export(self, kind: ExportKind, format: ExportFormat, params: ExportParams, gzip: bool = False) -> Iterator[bytes]:
+        """
+        Chunks of the encoded export. Params are checked before returning,
+        the query only runs once the chunks are consumed.
+        """
+        if kind not in USER_EXPORTS and (params.user_id or params.start_date or params.end_date):
+            raise ValidationError(
+                detail=f"{kind.value} cannot be filtered by user or date", title="Invalid export")
+
+        if params.start_date and params.end_date and params.start_date > params.end_date:
+            raise ValidationError(detail="start_date is after end_date", title="Invalid export")
+
+        columns = EXPORTS[kind][1]
+        rows = self.repository.stream_rows(kind, params)
+        encode = encode_csv if format == ExportFormat.CSV else encode_ndjson
+        chunks = encode(columns, rows, self.chunk_size)
+
+        return gzip_chunks(chunks) if gzip else chunks
@@ -1,10 +1,16 @@
 from abc import ABCMeta, abstractmethod
-from typing import Optional
+from typing import Iterator, Optional
 
+from cache import tags
+from cache.response_cache import ResponseCache, cache_version, response_cache as default_response_cache
 from models.errors.errors import NotFoundError
-from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO,Plan, PlanAssignment, PlanAssignmentDTO, PlanDTO, WeeklyPlan, ExtraFoodDTO, ExtraFood
+from models.foodPlans import Food, FoodDTO, FoodLinkDTO, FoodIngredientDTO, FoodTimeDTO, Ingredient, IngredientDTO,Plan, PlanAssignment, PlanAssignmentDTO, PlanDTO, PlanNutrition, PlanCloneDTO, PlanSlotsBatchDTO, PlanTemplate, PlanTemplateDTO, TemplateInstance, TemplateInstanceDTO, WeeklyPlan, ExtraFoodDTO, ExtraFood
 from models.params import GetAllFoodsParams, PostFoodBody, GetExtraFoodsParams
 from repository.food_repository import FoodRepository, IFoodRepository
+from service.nutrition import build_plan_nutrition
+from service.plan_slots import resolve_slot_operations
+from service.reference_data import ReferenceDataRegistry, reference_data_registry
+from service.weekly_plan_cache import WeeklyPlanCache, food_slot, weekly_plan_cache
 
 
 class IFoodService(metaclass=ABCMeta):
@@ -20,6 +26,10 @@ class IFoodService(metaclass=ABCMeta):
     def get_weekly_plan_by_id(self, plan_id: int) -> WeeklyPlan:
         pass
 
+    @abstractmethod
+    def get_plan_nutrition(self, plan_id: int) -> PlanNutrition:
+        pass
+
     @abstractmethod
     def save_food_plan(self, plan: PlanDTO) -> Plan:
         pass
@@ -53,7 +63,27 @@ class IFoodService(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def create_food_plan_by_preferences(self, user_id: str, preferences: list) -> Plan:
+    def edit_plan_slots(self, plan_id: int, batch: PlanSlotsBatchDTO) -> WeeklyPlan:
+        pass
+
+    @abstractmethod
+    def set_plan_template(self, plan_id: int, template: PlanTemplateDTO) -> PlanTemplate:
+        pass
+
+    @abstractmethod
+    def clone_plan(self, plan_id: int, data: PlanCloneDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        pass
+
+    @abstractmethod
+    def instantiate_template_for_user(self, user_id: str, data: TemplateInstanceDTO) -> Plan:
+        pass
+
+    @abstractmethod
+    def create_food_plan_by_preferences(self, user_id: str, preferences: list, plan: PlanDTO) -> Plan:
         pass
 
     @abstractmethod
@@ -61,7 +91,11 @@ class IFoodService(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
+    def get_all_foods(self, params: GetAllFoodsParams) -> tuple[list[Food], Optional[int]]:
+        pass
+
+    @abstractmethod
+    def stream_all_foods(self, params: GetAllFoodsParams) -> Iterator[Food]:
         pass
 
     @abstractmethod
@@ -88,9 +122,32 @@ class IFoodService(metaclass=ABCMeta):
     def get_ingredients_by_food_id(self, food_id: int) -> list[FoodIngredientDTO]:
         pass
 
+    @abstractmethod
+    def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        pass
+
+    @abstractmethod
+    def get_plans_version(self) -> str:
+        pass
+
+    @abstractmethod
+    def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def get_food_version(self, food_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def get_ingredients_version(self) -> str:
+        pass
+
 class FoodService(IFoodService):
-    def __init__(self, repository: Optional[IFoodRepository] = None):
+    def __init__(self, repository: Optional[IFoodRepository] = None, reference_data: Optional[ReferenceDataRegistry] = None, plan_cache: Optional[WeeklyPlanCache] = None, response_cache: Optional[ResponseCache] = None):
         self.repository = repository or FoodRepository()
+        self.reference_data = reference_data or reference_data_registry
+        self.plan_cache = plan_cache or weekly_plan_cache
+        self.response_cache = response_cache or default_response_cache
 
     def get_plans(self) -> list[Plan]:
         return self.repository.get_plans()
@@ -104,41 +161,76 @@ class FoodService(IFoodService):
         return _plan
 
     def get_weekly_plan_by_id(self, plan_id: int) -> WeeklyPlan:
+        # Set by conditional GETs, the cached plan must match their ETag
+        _version = cache_version.get()
+
+        _cached = self.plan_cache.get(plan_id, _version)
+        if _cached is not None:
+            return _cached
+
         plan = self.get_plan(plan_id)
 
-        _plan = self.repository.get_weekly_plan_by_id(plan_id)
+        _slots = self.repository.get_weekly_plan_by_id(plan_id)
 
-        if not _plan:
-            raise NotFoundError(f"Plan with id {plan_id} not found")
+        schedule = self.reference_data.empty_schedule()
+        for row in _slots:
+            day = self.reference_data.get_day_name(row.day_id)
+            moment = self.reference_data.get_moment_name(row.meal_moment_id)
+
+            if day is None or moment is None:
+                continue
 
-        schedule = {}
-        for row in _plan:
-            day = row.day_name
-            moment = row.meal_moment_name
-            food = None
-            if row.food_id:
-                food = {
-                    "id": row.food_id,
-                    "name": row.food_name,
-                    "description": row.food_description,
-                    "price": float(row.food_price),
-                    "created_at": row.food_created_at
-                }
-            else:
-                food = None
-
-            if day not in schedule:
-                schedule[day] = {}
-
-            schedule[day][moment] = food
-
-        return WeeklyPlan(
+            schedule[day][moment] = food_slot(row)
+
+        _weekly_plan = WeeklyPlan(
             **dict(plan),
             weekly_plan=schedule
         )
+        self.plan_cache.put(_weekly_plan, _version)
+
+        return _weekly_plan
+
+    def _patch_weekly_plan(self, plan_id: int, day: str, moment: str, food: Optional[Food]) -> WeeklyPlan:
+        return self._patch_weekly_plan_slots(plan_id, [(day, moment, food)])
+
+    def _patch_weekly_plan_slots(self, plan_id: int, slots: list[tuple[str, str, Optional[Food]]]) -> WeeklyPlan:
+        """
+        Apply slot changes to the cached plan, the plan is only loaded when
+        it is not cached
+        """
+        self.response_cache.invalidate(tags.plan(plan_id))
+
+        _weekly_plan = None
+        for day, moment, food in slots:
+            _weekly_plan = self.plan_cache.set_slot(
+                plan_id, day, moment, food_slot(food) if food else None
+            )
+
+            if _weekly_plan is None:
+                return self.get_weekly_plan_by_id(plan_id)
+
+        return _weekly_plan or self.get_weekly_plan_by_id(plan_id)
+
+    def get_plan_nutrition(self, plan_id: int) -> PlanNutrition:
+        self.get_plan(plan_id)
+
+        with self.repository.transaction() as repository:
+            _slots = repository.get_weekly_plan_by_id(plan_id)
+            _ingredients = repository.get_plan_ingredients(plan_id)
+
+        return build_plan_nutrition(
+            plan_id,
+            _slots,
+            _ingredients,
+            self.reference_data.get_days(),
+            self.reference_data.get_moments()
+        )
 
     def save_food_plan(self, plan: PlanDTO) -> Plan:
-        return self.repository.save_plan(plan)
+        _plan = self.repository.save_plan(plan)
+        self.response_cache.invalidate(tags.PLANS)
+
+        return _plan
 
     def get_food_plan_by_user_id(self, user_id: str) -> Plan:
         _plan = self.repository.get_plan_by_user_id(user_id)
@@ -149,12 +241,13 @@ class FoodService(IFoodService):
         return _plan
 
     def put_user_plan(self, user_id: str, assignment: PlanAssignmentDTO) -> PlanAssignment:
-        _plan = self.repository.get_plan_by_user_id(user_id)
+        with self.repository.transaction() as repository:
+            _plan = repository.get_plan_by_user_id(user_id)
 
-        if not _plan:
-            return self.repository.save_user_plan(user_id, assignment)
+            if not _plan:
+                return repository.save_user_plan(user_id, assignment)
 
-        return self.repository.update_user_plan(user_id, assignment)
+            return repository.update_user_plan(user_id, assignment)
 
     def get_foods_from_plan(self, plan_id: int) -> list[Food]:
         return self.repository.get_foods_from_plan(plan_id)
@@ -173,97 +266,111 @@ class FoodService(IFoodService):
         if not _plan:
             raise NotFoundError(f"Plan for user {user_id} not found")
 
-        _day = self.repository.get_day_by_name(data.day)
+        _day = self.reference_data.get_day_id(data.day)
         if not _day:
             raise NotFoundError(f"Day {data.day} not found")
 
-        _moment = self.repository.get_moment_by_name(data.moment)
+        _moment = self.reference_data.get_moment_id(data.moment)
         if not _moment:
             raise NotFoundError(f"Moment {data.moment} not found")
 
-        self.repository.save_food_weekly_plan(
+        _food = self.repository.save_food_weekly_plan(
             _plan.id_plan, _day, _moment, data.food_id
         )
 
-        return self.get_weekly_plan_by_id(_plan.id_plan)
+        return self._patch_weekly_plan(_plan.id_plan, data.day, data.moment, _food)
 
     def remove_food_from_user_plan(self, user_id: str, data: FoodTimeDTO) -> WeeklyPlan:
         _plan = self.repository.get_plan_by_user_id(user_id)
         if not _plan:
             raise NotFoundError(f"Plan for user {user_id} not found")
 
-        _day = self.repository.get_day_by_name(data.day)
+        _day = self.reference_data.get_day_id(data.day)
         if not _day:
             raise NotFoundError(f"Day {data.day} not found")
 
-        _moment = self.repository.get_moment_by_name(data.moment)
+        _moment = self.reference_data.get_moment_id(data.moment)
         if not _moment:
             raise NotFoundError(f"Moment {data.moment} not found")
 
+        _day_name, _moment_name = data.day, data.moment
         data.day = str(_day)
         data.moment = str(_moment)
 
         self.repository.remove_food_from_plan(_plan.id_plan, data)
 
-        return self.get_weekly_plan_by_id(_plan.id_plan)
+        return self._patch_weekly_plan(_plan.id_plan, _day_name, _moment_name, None)
 
     def update_food_in_plan(self, plan_id: int, data: FoodLinkDTO) -> WeeklyPlan:
         _plan = self.repository.get_plan_by_id(plan_id)
         if not _plan:
             raise NotFoundError(f"Plan with id {plan_id} not found")
 
-        _day = self.repository.get_day_by_name(data.day)
+        _day = self.reference_data.get_day_id(data.day)
         if not _day:
             raise NotFoundError(f"Day {data.day} not found")
 
-        _moment = self.repository.get_moment_by_name(data.moment)
+        _moment = self.reference_data.get_moment_id(data.moment)
         if not _moment:
             raise NotFoundError(f"Moment {data.moment} not found")
 
+        _day_name, _moment_name = data.day, data.moment
         data.day = str(_day)
         data.moment = str(_moment)
 
-        self.repository.update_food_weekly_plan(plan_id, data)
+        _food = self.repository.update_food_weekly_plan(plan_id, data)
 
-        return self.get_weekly_plan_by_id(plan_id)
+        return self._patch_weekly_plan(plan_id, _day_name, _moment_name, _food)
 
-    def create_food_plan_by_preferences(self, user_id: str, preferences: list) -> Plan:
-        food_id_placeholders = [str(int(fid)) for fid in preferences]
-        _matches = self.repository.get_matching_food_ids(food_id_placeholders)
-        if not _matches:
-            raise NotFoundError("No matching foods found")
+    def edit_plan_slots(self, plan_id: int, batch: PlanSlotsBatchDTO) -> WeeklyPlan:
+        _operations = resolve_slot_operations(batch, self.reference_data)
 
-        _new_plan = PlanDTO(
-            title=f"Plan for user {user_id}",
-            plan_description=f"Generated from selected food IDs",
-            objetive="Automatically generated based on preferences"
-        )
+        _written = self.repository.apply_slot_operations(plan_id, [
+            (operation.op.value, operation.day_id, operation.meal_moment_id, operation.food_id)
+            for operation in _operations
+        ])
+        _foods = {(day_id, moment_id): food for day_id, moment_id, food in _written}
 
-        new_plan: Plan = self.save_food_plan(_new_plan)
+        return self._patch_weekly_plan_slots(plan_id, [
+            (operation.day, operation.moment, _foods.get((operation.day_id, operation.meal_moment_id)))
+            for operation in _operations
+        ])
 
-        _days = self.repository.get_days()
-        _moments = self.repository.get_moments()
+    def set_plan_template(self, plan_id: int, template: PlanTemplateDTO) -> PlanTemplate:
+        _template = self.repository.set_plan_template(plan_id, template.is_template)
 
-        food_index = 0
-        total_foods = len(_matches)
+        if not _template:
+            raise NotFoundError(f"Plan with id {plan_id} not found")
 
-        for day in _days:
-            for moment in _moments:
-                food_id = _matches[food_index % total_foods]
-                self.repository.save_food_weekly_plan(
-                    new_plan.id_plan, day["id"], moment["id"], food_id
-                )
-                food_index += 1
+        return _template
 
-        self.put_user_plan(user_id, PlanAssignmentDTO(
-            plan_id=new_plan.id_plan
-        ))
+    def clone_plan(self, plan_id: int, data: PlanCloneDTO) -> Plan:
+        _plan = self.repository.clone_plan(plan_id, data.title)
+
+        if not _plan:
+            raise NotFoundError(f"Plan with id {plan_id} not found")
+
+        self.response_cache.invalidate(tags.PLANS)
+
+        return _plan
+
+    def instantiate_template(self, template_id: int, user_ids: list[str]) -> list[TemplateInstance]:
+        # Each user gets one copy, a repeated id would be assigned twice
+        _user_ids = list(dict.fromkeys(user_ids))
+
+        _instances = self.repository.instantiate_template(template_id, _user_ids)
+
+        if not _instances:
+            raise NotFoundError(f"Template with id {template_id} not found")
+
+        self.response_cache.invalidate(tags.PLANS)
 
-        _ret = self.repository.get_plan_by_id(new_plan.id_plan)
-        if not _ret:
-            raise NotFoundError(f"Plan with id {new_plan.id_plan} not found")
+        return _instances
 
-        return _ret
+    def instantiate_template_for_user(self, user_id: str, data: TemplateInstanceDTO) -> Plan:
+        _instance, = self.instantiate_template(data.template_id, [user_id])
+
+        return self.get_plan(_instance.plan_id)
 
     def get_food_by_id(self, food_id: int) -> Food:
         food = self.repository.get_food_by_id(food_id)
@@ -273,30 +380,57 @@ class FoodService(IFoodService):
 
         return food
 
-    def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
-        return self.repository.get_all_foods(params)
+    def get_all_foods(self, params: GetAllFoodsParams) -> tuple[list[Food], Optional[int]]:
+        page_size = params.limit
+
+        # Searches are ranked by relevance, so they return the best matches
+        # instead of an id ordered page
+        if params.search_name:
+            return self.repository.search_foods(params.search_name, page_size), None
+
+        # One extra row tells whether there is a next page
+        _foods = self.repository.get_all_foods(GetAllFoodsParams(
+            search_name=params.search_name,
+            cursor=params.cursor,
+            limit=page_size + 1
+        ))
+
+        if len(_foods) > page_size:
+            return _foods[:page_size], _foods[page_size - 1].id
+
+        return _foods, None
+
+    def stream_all_foods(self, params: GetAllFoodsParams) -> Iterator[Food]:
+        return self.repository.stream_all_foods(params)
     
     def save_food_in_db(self, data: PostFoodBody) -> Food:
-        saved_food = self.repository.save_food(food=data.food)
-        
-        if data.food.ingredients:
-            self.repository.save_food_ingredients(saved_food.id, data.food.ingredients)
-
-        self.repository.link_food_to_plan(
-            food_id=saved_food.id,
-            plan_id=data.plan_id,
-            day_id=data.day_id,
-            meal_moment_id=data.meal_moment_id
-        )
-        
+        with self.repository.transaction() as repository:
+            saved_food = repository.save_food(food=data.food)
+
+            if data.food.ingredients:
+                repository.save_food_ingredients(saved_food.id, data.food.ingredients)
+
+            repository.link_food_to_plan(
+                food_id=saved_food.id,
+                plan_id=data.plan_id,
+                day_id=data.day_id,
+                meal_moment_id=data.meal_moment_id
+            )
+
+        self.plan_cache.invalidate(data.plan_id)
+        self.response_cache.invalidate(tags.plan(data.plan_id), tags.food(saved_food.id))
+
         return saved_food
 
     def save_extra_food(self, extraFood: ExtraFoodDTO, userId: str) -> ExtraFood:
-        extra_food: ExtraFood = self.repository.save_extra_food(extraFood, userId)
-        self.repository.link_extra_food_with_user(extra_food.id_extra_food, userId)
-        
-        if extraFood.ingredients:
-            self.repository.save_extra_food_ingredients(extra_food.id_extra_food, extraFood.ingredients)
+        with self.repository.transaction() as repository:
+            extra_food: ExtraFood = repository.save_extra_food(extraFood, userId)
+            repository.link_extra_food_with_user(extra_food.id_extra_food, userId)
+
+            if extraFood.ingredients:
+                repository.save_extra_food_ingredients(extra_food.id_extra_food, extraFood.ingredients)
+
+        self.response_cache.invalidate(tags.extra_food(extra_food.id_extra_food))
 
         return extra_food
 
@@ -306,31 +440,23 @@ class FoodService(IFoodService):
         if not _matches:
             raise NotFoundError("No matching foods found")
 
-        new_plan: Plan = self.save_food_plan(plan)
-
-        _days = self.repository.get_days()
-        _moments = self.repository.get_moments()
+        _days = self.reference_data.get_days()
+        _moments = self.reference_data.get_moments()
 
+        slots: list[tuple[int, int, int]] = []
         food_index = 0
         total_foods = len(_matches)
 
         for day in _days:
             for moment in _moments:
                 food_id = _matches[food_index % total_foods]
-                self.repository.save_food_weekly_plan(
-                    new_plan.id_plan, day["id"], moment["id"], food_id
-                )
+                slots.append((day["id"], moment["id"], food_id))
                 food_index += 1
 
-        self.put_user_plan(user_id, PlanAssignmentDTO(
-            plan_id=new_plan.id_plan
-        ))
-
-        _ret = self.repository.get_plan_by_id(new_plan.id_plan)
-        if not _ret:
-            raise NotFoundError(f"Plan with id {new_plan.id_plan} not found")
+        _plan = self.repository.materialize_plan(user_id, plan, slots)
+        self.response_cache.invalidate(tags.PLANS)
 
-        return _ret
+        return _plan
 
     def save_ingredient(self, ingredient: IngredientDTO) -> Ingredient:
         saved_ingredient = self.repository.save_ingredient(ingredient)
@@ -338,6 +464,8 @@ class FoodService(IFoodService):
         if not saved_ingredient:
             raise Exception("Failed to save ingredient")
 
+        self.response_cache.invalidate(tags.INGREDIENTS)
+
         return saved_ingredient
 
     def get_food_nutritional_values(self, food_id: int) -> Optional[dict]:
@@ -345,15 +473,38 @@ class FoodService(IFoodService):
 
     def get_food_nutritional_values_extrafood(self, extra_food_id: int) -> Optional[dict]:
         return self.repository.get_nutritional_values(food_id = None, extraFood_id=extra_food_id)
+
+    def get_foods_nutritional_values(self, food_ids: list[int]) -> dict[int, Optional[dict]]:
+        _nutrition = self.repository.get_nutritional_values_by_ids(food_ids=food_ids, extraFood_ids=None)
+        return {food_id: _nutrition.get(food_id) for food_id in food_ids}
+
+    def get_extra_foods_nutritional_values(self, extra_food_ids: list[int]) -> dict[int, Optional[dict]]:
+        _nutrition = self.repository.get_nutritional_values_by_ids(food_ids=None, extraFood_ids=extra_food_ids)
+        return {extra_food_id: _nutrition.get(extra_food_id) for extra_food_id in extra_food_ids}
     
     def get_ingredients_by_food_id(self, food_id: int) -> list[FoodIngredientDTO]:
         return self.repository.get_ingredients_by_food_id(food_id = food_id, extraFoodId=None)
 
     def get_all_ingredients(self) -> list[Ingredient]:
         return self.repository.get_all_ingredients()
+
+    def search_ingredients(self, search_name: str, limit: int) -> list[dict]:
+        return self.repository.search_ingredients(search_name, limit)
     
     def get_extra_foods(self, params: GetExtraFoodsParams) -> list[ExtraFood]:
         return self.repository.get_extra_foods(params)
     
     def get_ingredients_by_extra_food_id(self, extra_food_id: int) -> list[FoodIngredientDTO]:
-        return self.repository.get_ingredients_by_food_id(food_id = None, extraFoodId=extra_food_id)
\ No newline at end of file
+        return self.repository.get_ingredients_by_food_id(food_id = None, extraFoodId=extra_food_id)
+
+    def get_plans_version(self) -> str:
+        return self.repository.get_plans_version()
+
+    def get_weekly_plan_version(self, plan_id: int) -> Optional[str]:
+        return self.repository.get_weekly_plan_version(plan_id)
+
+    def get_food_version(self, food_id: int) -> Optional[str]:
+        return self.repository.get_food_version(food_id)
+
+    def get_ingredients_version(self) -> str:
+        return self.repository.get_ingredients_version()
@@ -1,8 +1,11 @@
 from abc import ABCMeta, abstractmethod
 from typing import Optional
 
-from models.health import Health, HealthDB
+from cache.response_cache import ResponseCache, response_cache
+from cache.token_cache import VerifiedTokenCache, verified_token_cache
+from models.health import Health, HealthDB, LogPipelineStats, ResponseCacheStats, TokenCacheStats
 from repository.health_repository import HealthRepository, IHealthRepository
+from utils.log_pipeline import LogPipeline, log_pipeline
 
 
 class IHealthService(metaclass=ABCMeta):
@@ -28,10 +31,43 @@ class IHealthService(metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def get_cache_stats(self) -> ResponseCacheStats:
+        """
+        Get the counters of the response cache.
+
+        Returns:
+            ResponseCacheStats: Hits, misses, evictions and size of the cache.
+        """
+        pass
+
+    @abstractmethod
+    def get_token_cache_stats(self) -> TokenCacheStats:
+        """
+        Get the counters of the verified JWT cache of the auth middleware.
+
+        Returns:
+            TokenCacheStats: Hits, misses, evictions and size of the cache.
+        """
+        pass
+
+    @abstractmethod
+    def get_log_stats(self) -> LogPipelineStats:
+        """
+        Get the counters of the background logging queue.
+
+        Returns:
+            LogPipelineStats: Queued, written and dropped records.
+        """
+        pass
+
 
 class HealthService(IHealthService):
-    def __init__(self, repository: Optional[IHealthRepository] = None):
+    def __init__(self, repository: Optional[IHealthRepository] = None, cache: Optional[ResponseCache] = None, token_cache: Optional[VerifiedTokenCache] = None, logs: Optional[LogPipeline] = None):
         self.repository = repository or HealthRepository()
+        self.cache = cache or response_cache
+        self.token_cache = token_cache or verified_token_cache
+        self.logs = logs or log_pipeline
 
     def get_health(self) -> Health:
         """
@@ -46,3 +82,12 @@ class HealthService(IHealthService):
         # If db is not healthy, it will raise an exception
         _ = self.repository.get_health()
         return HealthDB(db_health="😎")
+
+    def get_cache_stats(self) -> ResponseCacheStats:
+        return self.cache.stats()
+
+    def get_token_cache_stats(self) -> TokenCacheStats:
+        return self.token_cache.stats()
+
+    def get_log_stats(self) -> LogPipelineStats:
+        return self.logs.stats()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Optional
+
+from service.meal_reminder_service import IMealReminderService, meal_reminder_service_from_env
+from utils.push_dispatcher import ExpoPushDispatcher, push_dispatcher
+
+
+class MealReminderScheduler:
+    """
+    Background loop driving a MealReminderService: dispatches due reminders
+    every tick, queues upcoming ones every schedule_every seconds and purges
+    old ones every purge_every seconds. Database work runs in worker threads
+    so the event loop keeps serving requests.
+
+    Tokens the dispatcher reports as no longer registered are deleted, so
+    they stop getting reminders.
+    """
+
+    def __init__(
+        self,
+        service: Optional[IMealReminderService] = None,
+        tick: float = 5.0,
+        schedule_every: float = 10 * 60,
+        purge_every: float = 60 * 60,
+        dispatcher: Optional[ExpoPushDispatcher] = None
+    ):
+        self.service = service or meal_reminder_service_from_env()
+        self.dispatcher = dispatcher or push_dispatcher
+        self.tick = tick
+        self.schedule_every = schedule_every
+        self.purge_every = purge_every
+
+        self._task: Optional[asyncio.Task] = None
+        self._deletions: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self.dispatcher.on_invalid_token = self._forget_token
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, *self._deletions, return_exceptions=True)
+        self._task = None
+
+    def _forget_token(self, token: str) -> None:
+        # Called from the dispatcher's workers, the delete runs in a thread
+        task = asyncio.create_task(asyncio.to_thread(self.service.delete_push_token, token))
+        self._deletions.add(task)
+        task.add_done_callback(self._deletions.discard)
+
+    async def _run(self) -> None:
+        next_schedule = 0.0
+        next_purge = monotonic() + self.purge_every
+
+        while True:
+            try:
+                if monotonic() >= next_schedule:
+                    scheduled = await asyncio.to_thread(self.service.schedule_upcoming)
+                    logging.info(f"{scheduled} meal reminders scheduled")
+                    next_schedule = monotonic() + self.schedule_every
+
+                sent = await asyncio.to_thread(self.service.dispatch_due)
+                if sent:
+                    logging.info(f"{sent} meal reminders sent")
+
+                if monotonic() >= next_purge:
+                    await asyncio.to_thread(self.service.purge_old)
+                    next_purge = monotonic() + self.purge_every
+
+            except Exception:
+                # A database hiccup must not kill the loop
+                logging.exception("Meal reminder scheduler iteration failed")
+
+            await asyncio.sleep(self.tick)
@@ -0,0 +1,132 @@
+from abc import ABCMeta, abstractmethod
+from functools import partial
+from os import getenv
+from typing import Callable, Optional
+
+from repository.reminder_repository import IReminderRepository, ReminderRepository
+from utils.push_dispatcher import PushMessage
+from utils.sendNotification import send_push_notifications
+
+
+class IMealReminderService(metaclass=ABCMeta):
+    @abstractmethod
+    def save_push_token(self, user_id: str, token: str) -> None:
+        pass
+
+    @abstractmethod
+    def delete_push_token(self, token: str) -> None:
+        pass
+
+    @abstractmethod
+    def schedule_upcoming(self) -> int:
+        pass
+
+    @abstractmethod
+    def dispatch_due(self) -> int:
+        pass
+
+    @abstractmethod
+    def purge_old(self) -> int:
+        pass
+
+
+class MealReminderService(IMealReminderService):
+    """
+    Reminders of the meals of each user's weekly plan.
+
+    schedule_upcoming queues the reminders of the next horizon_minutes in one
+    statement and dispatch_due claims due reminders batch_size at a time and
+    hands each batch to the push sender at once. Both can run on every
+    instance at the same time.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[IReminderRepository] = None,
+        sender: Optional[Callable[[list[PushMessage]], int]] = None,
+        batch_size: int = 1000,
+        lead_minutes: int = 30,
+        horizon_minutes: int = 24 * 60,
+        lease_seconds: int = 120,
+        stale_minutes: int = 30,
+        keep_hours: int = 48
+    ):
+        self.repository = repository or ReminderRepository()
+        # dispatch_due runs in a worker thread and only completes what was
+        # queued, so it waits for the dispatcher to count it
+        self.sender = sender or partial(send_push_notifications, wait=True)
+        self.batch_size = batch_size
+        self.lead_minutes = lead_minutes
+        self.horizon_minutes = horizon_minutes
+        self.lease_seconds = lease_seconds
+        self.stale_minutes = stale_minutes
+        self.keep_hours = keep_hours
+
+    def save_push_token(self, user_id: str, token: str) -> None:
+        self.repository.save_push_token(user_id, token)
+
+    def delete_push_token(self, token: str) -> None:
+        self.repository.delete_push_token(token)
+
+    def schedule_upcoming(self) -> int:
+        return self.repository.schedule_reminders(self.horizon_minutes, self.lead_minutes)
+
+    def dispatch_due(self) -> int:
+        """
+        Send every due reminder, batch by batch
+
+        Returns:
+            int: Number of notifications handed to the sender
+        """
+        sent = 0
+
+        while True:
+            _reminders = self.repository.claim_due_reminders(
+                self.batch_size, self.lease_seconds, self.stale_minutes)
+            if not _reminders:
+                return sent
+
+            _sendable = [reminder for reminder in _reminders if reminder.token and reminder.food]
+            _messages = [
+                PushMessage(
+                    to=reminder.token,
+                    title=reminder.moment,
+                    body=f"Se acerca tu {reminder.moment.lower()}: {reminder.food}",
+                    data={
+                        "type": "meal_reminder",
+                        "day_id": reminder.day_id,
+                        "meal_moment_id": reminder.meal_moment_id
+                    }
+                )
+                for reminder in _sendable
+            ]
+
+            _queued = self.sender(_messages) if _messages else 0
+            sent += _queued
+
+            # Reminders whose user lost the token or the planned food are
+            # done too, there is nothing to send for them. The sender queues
+            # messages in order, so a saturated sender took a prefix.
+            _sendable_ids = {reminder.id for reminder in _sendable}
+            _done = [reminder.id for reminder in _reminders if reminder.id not in _sendable_ids]
+            _done.extend(reminder.id for reminder in _sendable[:_queued])
+            if _done:
+                self.repository.mark_reminders_sent(_done)
+
+            if _queued < len(_messages):
+                # The rest of the batch is claimed again once its lease expires
+                return sent
+
+            if len(_reminders) < self.batch_size:
+                return sent
+
+    def purge_old(self) -> int:
+        return self.repository.purge_reminders(self.keep_hours)
+
+
+def meal_reminder_service_from_env() -> MealReminderService:
+    return MealReminderService(
+        batch_size=int(getenv("MEAL_REMINDER_BATCH_SIZE", "1000")),
+        lead_minutes=int(getenv("MEAL_REMINDER_LEAD_MINUTES", "30")),
+        horizon_minutes=int(getenv("MEAL_REMINDER_HORIZON_MINUTES", str(24 * 60)))
+    )
@@ -0,0 +1,146 @@
+from typing import Any, NamedTuple, Sequence
+
+import numpy as np
+
+from models.foodPlans import DayNutrition, MeasureType, NutritionValues, PlanNutrition
+
+# Same order as the nutrient fields of IngredientDTO and NutritionValues
+NUTRIENTS = (
+    "calories",
+    "protein",
+    "carbs",
+    "fiber",
+    "saturated_fats",
+    "monounsaturated_fats",
+    "polyunsaturated_fats",
+    "trans_fats",
+    "cholesterol",
+)
+
+
+class FoodNutritionMatrix(NamedTuple):
+    food_ids: np.ndarray  # (foods,) sorted
+    values: np.ndarray  # (foods, nutrients)
+
+
+class PlanNutritionArrays(NamedTuple):
+    slots: np.ndarray  # (days, moments, nutrients)
+    filled: np.ndarray  # (days, moments) whether the slot has a food
+    days: np.ndarray  # (days, nutrients)
+    week: np.ndarray  # (nutrients,)
+
+
+def food_nutrition_matrix(ingredients: Sequence[Any]) -> FoodNutritionMatrix:
+    """
+    Nutrition of every food from its ingredients.
+
+    Args:
+        ingredients: Rows of (food_id, measure_type, quantity, *NUTRIENTS),
+            one per ingredient of a food
+
+    Returns:
+        FoodNutritionMatrix: Food ids and their nutrient totals, row aligned
+    """
+    if not ingredients:
+        return FoodNutritionMatrix(np.empty(0, dtype=np.int64), np.empty((0, len(NUTRIENTS))))
+
+    # Transposed in one pass, one tuple per column
+    columns = list(zip(*ingredients))
+    food_ids = np.array(columns[0], dtype=np.int64)
+    by_unit = np.fromiter((measure == MeasureType.UNIT.value for measure in columns[1]),
+                          dtype=bool, count=len(ingredients))
+    quantities = np.array(columns[2], dtype=np.float64)
+    values = np.array(columns[3:], dtype=np.float64).T
+
+    # Values are given per unit or per 100 grams
+    factors = np.where(by_unit, quantities, quantities / 100.0)
+    contributions = values * factors[:, np.newaxis]
+
+    order = np.argsort(food_ids, kind="stable")
+    sorted_ids = food_ids[order]
+    unique_ids, starts = np.unique(sorted_ids, return_index=True)
+
+    return FoodNutritionMatrix(unique_ids, np.add.reduceat(contributions[order], starts, axis=0))
+
+
+def plan_nutrition(slots: Sequence[Any], foods: FoodNutritionMatrix, day_ids: Sequence[int], moment_ids: Sequence[int]) -> PlanNutritionArrays:
+    """
+    Per slot, per day and per week totals of a weekly plan.
+
+    Args:
+        slots: Rows of FoodRepository.get_weekly_plan_by_id, with day_id,
+            meal_moment_id and the id of the slot's food
+        foods: Nutrition of the foods used by the plan
+        day_ids: Days of the week, in output order
+        moment_ids: Meal moments, in output order
+
+    Returns:
+        PlanNutritionArrays: Totals indexed by the position of the day and
+            moment in day_ids and moment_ids. Slots with a food without
+            ingredients count as zero
+    """
+    n_nutrients = len(NUTRIENTS)
+    slot_values = np.zeros((len(day_ids), len(moment_ids), n_nutrients))
+    filled = np.zeros((len(day_ids), len(moment_ids)), dtype=bool)
+
+    if slots:
+        day_index = {day_id: i for i, day_id in enumerate(day_ids)}
+        moment_index = {moment_id: i for i, moment_id in enumerate(moment_ids)}
+
+        known = [row for row in slots
+                 if row.day_id in day_index and row.meal_moment_id in moment_index]
+        days = np.fromiter((day_index[row.day_id] for row in known),
+                           dtype=np.int64, count=len(known))
+        moments = np.fromiter((moment_index[row.meal_moment_id] for row in known),
+                              dtype=np.int64, count=len(known))
+        slot_foods = np.fromiter((row.id for row in known),
+                                 dtype=np.int64, count=len(known))
+
+        # Row of each slot's food in the matrix, an extra zero row for foods
+        # without ingredients
+        n_foods = len(foods.food_ids)
+        padded = np.vstack([foods.values, np.zeros((1, n_nutrients))])
+
+        rows = np.searchsorted(foods.food_ids, slot_foods)
+        found = rows < n_foods
+        found[found] = foods.food_ids[rows[found]] == slot_foods[found]
+        rows[~found] = n_foods
+
+        slot_values[days, moments] = padded[rows]
+        filled[days, moments] = True
+
+    day_totals = slot_values.sum(axis=1)
+
+    return PlanNutritionArrays(slot_values, filled, day_totals, day_totals.sum(axis=0))
+
+
+def _nutrition_values(values: np.ndarray) -> NutritionValues:
+    return NutritionValues(**dict(zip(NUTRIENTS, values.tolist())))
+
+
+def build_plan_nutrition(plan_id: int, slots: Sequence[Any], ingredients: Sequence[Any], days: list[dict], moments: list[dict]) -> PlanNutrition:
+    """
+    PlanNutrition of a plan from its weekly grid rows and the ingredients of
+    its foods, with days and moments ({"id", "name"}) in output order
+    """
+    totals = plan_nutrition(
+        slots,
+        food_nutrition_matrix(ingredients),
+        [day["id"] for day in days],
+        [moment["id"] for moment in moments]
+    )
+
+    return PlanNutrition(
+        id_plan=plan_id,
+        week=_nutrition_values(totals.week),
+        days={
+            day["name"]: DayNutrition(
+                total=_nutrition_values(totals.days[d]),
+                moments={
+                    moment["name"]: _nutrition_values(totals.slots[d, m]) if totals.filled[d, m] else None
+                    for m, moment in enumerate(moments)
+                }
+            )
+            for d, day in enumerate(days)
+        }
+    )
@@ -0,0 +1,55 @@
+from typing import NamedTuple, Optional
+
+from models.errors.errors import NotFoundError, ValidationError
+from models.foodPlans import PlanSlotsBatchDTO, SlotOperationType
+from service.reference_data import ReferenceDataRegistry
+
+
+class SlotOperation(NamedTuple):
+    op: SlotOperationType
+    day: str
+    moment: str
+    day_id: int
+    meal_moment_id: int
+    food_id: Optional[int]
+
+
+def resolve_slot_operations(batch: PlanSlotsBatchDTO, reference_data: ReferenceDataRegistry) -> list[SlotOperation]:
+    """
+    Operations of the batch with their day and moment ids, checked before
+    anything is written: every slot exists and is edited once, and set and
+    replace have a food. Async callers load the reference data first.
+    """
+    operations: list[SlotOperation] = []
+    slots: set[tuple[int, int]] = set()
+
+    for index, operation in enumerate(batch.operations, start=1):
+        _day = reference_data.get_day_id(operation.day)
+        if not _day:
+            raise NotFoundError(f"Day {operation.day} not found")
+
+        _moment = reference_data.get_moment_id(operation.moment)
+        if not _moment:
+            raise NotFoundError(f"Moment {operation.moment} not found")
+
+        if (_day, _moment) in slots:
+            raise ValidationError(
+                detail=f"Operation {index} edits {operation.day} {operation.moment} again, each slot can be edited once",
+                title="Invalid slot operations")
+
+        if operation.op != SlotOperationType.CLEAR and operation.food_id is None:
+            raise ValidationError(
+                detail=f"Operation {index} is a {operation.op.value} without food_id",
+                title="Invalid slot operations")
+
+        slots.add((_day, _moment))
+        operations.append(SlotOperation(
+            operation.op,
+            operation.day,
+            operation.moment,
+            _day,
+            _moment,
+            None if operation.op == SlotOperationType.CLEAR else operation.food_id
+        ))
+
+    return operations
@@ -0,0 +1,117 @@
+import logging
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from repository.food_repository import FoodRepository, IFoodRepository
+
+
+class _Snapshot(NamedTuple):
+    days: list[dict]
+    moments: list[dict]
+    day_ids: dict[str, int]
+    moment_ids: dict[str, int]
+    day_names: dict[int, str]
+    moment_names: dict[int, str]
+    loaded_at: float
+
+
+class ReferenceDataRegistry:
+    """
+    In-process registry of the static week_days and meal_moments tables.
+
+    The tables are loaded once (at startup or on first use) and names and ids
+    are resolved from dictionaries afterwards. The registry is reloaded when
+    refresh() is called or, if a ttl is set, once the loaded data is older
+    than it.
+    """
+
+    def __init__(self, repository: Optional[IFoodRepository] = None, ttl: Optional[float] = None):
+        self.repository = repository or FoodRepository()
+        self.ttl = ttl
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = Lock()
+
+    def refresh(self) -> None:
+        """
+        Reload the week days and meal moments from the database
+        """
+        days = sorted(self.repository.get_days(), key=lambda day: day["id"])
+        moments = sorted(self.repository.get_moments(),
+                         key=lambda moment: moment["id"])
+
+        # Swapped as a whole so readers never see half a reload
+        self._snapshot = _Snapshot(
+            days=days,
+            moments=moments,
+            day_ids={day["name"]: day["id"] for day in days},
+            moment_ids={moment["name"]: moment["id"] for moment in moments},
+            day_names={day["id"]: day["name"] for day in days},
+            moment_names={moment["id"]: moment["name"] for moment in moments},
+            loaded_at=monotonic()
+        )
+
+        logging.info(
+            f"Reference data loaded: {len(days)} days, {len(moments)} moments")
+
+    def _is_fresh(self, snapshot: Optional[_Snapshot]) -> bool:
+        return snapshot is not None and (self.ttl is None or monotonic() - snapshot.loaded_at < self.ttl)
+
+    def _get_snapshot(self) -> _Snapshot:
+        snapshot = self._snapshot
+
+        if self._is_fresh(snapshot):
+            return snapshot  # type: ignore
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._snapshot is snapshot:
+                self.refresh()
+
+        return self._snapshot  # type: ignore
+
+    async def ensure_loaded(self) -> None:
+        """
+        Load or reload the data in a worker thread when it is missing or
+        expired, so async callers never run the sync query on the event loop.
+        Call it right before the lookups.
+        """
+        if not self._is_fresh(self._snapshot):
+            await run_in_threadpool(self._get_snapshot)
+
+    def get_days(self) -> list[dict]:
+        return self._get_snapshot().days
+
+    def get_moments(self) -> list[dict]:
+        return self._get_snapshot().moments
+
+    def empty_schedule(self) -> dict[str, dict[str, Optional[dict]]]:
+        """
+        Weekly grid with every day and moment, ordered by id, and no food
+        """
+        snapshot = self._get_snapshot()
+
+        return {
+            day["name"]: {moment["name"]: None for moment in snapshot.moments}
+            for day in snapshot.days
+        }
+
+    def get_day_id(self, day: str) -> Optional[int]:
+        return self._get_snapshot().day_ids.get(day)
+
+    def get_moment_id(self, moment: str) -> Optional[int]:
+        return self._get_snapshot().moment_ids.get(moment)
+
+    def get_day_name(self, day_id: int) -> Optional[str]:
+        return self._get_snapshot().day_names.get(day_id)
+
+    def get_moment_name(self, moment_id: int) -> Optional[str]:
+        return self._get_snapshot().moment_names.get(moment_id)
+
+
+_ttl = float(getenv("REFERENCE_DATA_TTL_SECONDS", "3600"))
+
+reference_data_registry = ReferenceDataRegistry(ttl=_ttl if _ttl > 0 else None)
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Any, Optional
+
+from models.foodPlans import WeeklyPlan
+
+
+def food_slot(food: Any) -> dict:
+    """
+    Value of a WeeklyPlan slot for a Food or a food row
+    """
+    return {
+        "id": food.id,
+        "name": food.name,
+        "description": food.description,
+        "price": float(food.price),
+        "created_at": food.created_at
+    }
+
+
+class WeeklyPlanCache:
+    """
+    In-process LRU of built WeeklyPlan objects by plan id.
+
+    Slot mutations patch the cached plan in place instead of rebuilding it, so
+    a write does not have to read the whole plan back. Entries expire after
+    ttl seconds, which bounds how stale a plan changed by another process can
+    get.
+
+    Plans can be stored with the database version they were built from.
+    Readers that know the current version (conditional GETs) only get a plan
+    of that version, so a plan changed by another process is never served
+    under its new ETag. Patched plans lose their version.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._plans: OrderedDict[int, tuple[WeeklyPlan, float, Optional[str]]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, plan_id: int, version: Optional[str] = None) -> Optional[WeeklyPlan]:
+        """
+        Cached plan, if version is given only when it was built from that
+        version
+        """
+        with self._lock:
+            entry = self._plans.get(plan_id)
+
+            if entry is None:
+                return None
+
+            weekly_plan, loaded_at, _version = entry
+            if self.ttl is not None and monotonic() - loaded_at >= self.ttl:
+                del self._plans[plan_id]
+                return None
+
+            if version is not None and _version != version:
+                return None
+
+            self._plans.move_to_end(plan_id)
+            return weekly_plan
+
+    def put(self, weekly_plan: WeeklyPlan, version: Optional[str] = None) -> None:
+        with self._lock:
+            self._plans[weekly_plan.id_plan] = (weekly_plan, monotonic(), version)
+            self._plans.move_to_end(weekly_plan.id_plan)
+
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def set_slot(self, plan_id: int, day: str, moment: str, food: Optional[dict]) -> Optional[WeeklyPlan]:
+        """
+        Set the food of a slot of a cached plan, None empties it.
+
+        Returns:
+            Optional[WeeklyPlan]: The patched plan, None when the plan is not
+                cached and has to be loaded
+        """
+        weekly_plan = self.get(plan_id)
+        if weekly_plan is None:
+            return None
+
+        with self._lock:
+            moments = weekly_plan.weekly_plan.get(day)
+
+            if moments is None or moment not in moments:
+                self._plans.pop(plan_id, None)
+                return None
+
+            moments[moment] = food
+            # The patch is not a version read from the database
+            self._plans[plan_id] = (weekly_plan, self._plans[plan_id][1], None)
+            return weekly_plan
+
+    def invalidate(self, plan_id: int) -> None:
+        with self._lock:
+            self._plans.pop(plan_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+
+_ttl = float(getenv("WEEKLY_PLAN_CACHE_TTL_SECONDS", "300"))
+
+weekly_plan_cache = WeeklyPlanCache(
+    max_size=int(getenv("WEEKLY_PLAN_CACHE_SIZE", "1024")),
+    ttl=_ttl if _ttl > 0 else None
+)
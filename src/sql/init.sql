@@ -281,6 +281,266 @@ CREATE TABLE user_water_goals (
 );
 -- ------------------------------------------------------------------------------------
 
+-- --------------------------------BUSQUEDA-----------------------------------
+-- Trigram indexes for the food and ingredient search. Names are compared
+-- lowercased and without accents, so 'miercoles' matches 'Miércoles'.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() is only STABLE, an IMMUTABLE wrapper is needed to index it
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+$func$
+SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$func$;
+
+CREATE INDEX IF NOT EXISTS foods_name_trgm_idx
+    ON foods USING GIN (f_unaccent(lower(name)) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS ingredients_name_trgm_idx
+    ON ingredients USING GIN (f_unaccent(lower(name)) gin_trgm_ops);
+-- ------------------------------------------------------------------------------------
+
+-- --------------------------------NUTRICION-----------------------------------
+-- Nutrition summary per food and per extra food, so reads are a primary key
+-- lookup instead of an aggregate over the ingredients. Rows are refreshed by
+-- the repository in the same transaction that changes the ingredients of a
+-- food (NULL ids rebuilds everything) and by a trigger when an ingredient's
+-- values change. Foods without ingredients have no row. Ingredient values are
+-- per 100 grams, or per unit for 'unit' ingredients.
+CREATE TABLE IF NOT EXISTS food_nutrition (
+    food_id INTEGER PRIMARY KEY REFERENCES foods(id) ON DELETE CASCADE,
+    calories DOUBLE PRECISION NOT NULL,
+    protein DOUBLE PRECISION NOT NULL,
+    carbs DOUBLE PRECISION NOT NULL,
+    fiber DOUBLE PRECISION NOT NULL,
+    saturated_fats DOUBLE PRECISION NOT NULL,
+    monounsaturated_fats DOUBLE PRECISION NOT NULL,
+    polyunsaturated_fats DOUBLE PRECISION NOT NULL,
+    trans_fats DOUBLE PRECISION NOT NULL,
+    cholesterol DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS extra_food_nutrition (
+    id_extra_food INTEGER PRIMARY KEY REFERENCES extra_foods(id_extra_food) ON DELETE CASCADE,
+    calories DOUBLE PRECISION NOT NULL,
+    protein DOUBLE PRECISION NOT NULL,
+    carbs DOUBLE PRECISION NOT NULL,
+    fiber DOUBLE PRECISION NOT NULL,
+    saturated_fats DOUBLE PRECISION NOT NULL,
+    monounsaturated_fats DOUBLE PRECISION NOT NULL,
+    polyunsaturated_fats DOUBLE PRECISION NOT NULL,
+    trans_fats DOUBLE PRECISION NOT NULL,
+    cholesterol DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION refresh_food_nutrition(ids INTEGER[]) RETURNS VOID
+LANGUAGE sql AS
+$func$
+    INSERT INTO food_nutrition (food_id, calories, protein, carbs, fiber, saturated_fats, monounsaturated_fats, polyunsaturated_fats, trans_fats, cholesterol, updated_at)
+    SELECT
+        fi.food_id,
+        SUM(i.calories * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.protein * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.carbs * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.fiber * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.saturated_fats * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.monounsaturated_fats * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.polyunsaturated_fats * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.trans_fats * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.cholesterol * fi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        NOW()
+    FROM food_ingredients fi
+    JOIN ingredients i ON fi.ingredient_id = i.id
+    WHERE ids IS NULL OR fi.food_id = ANY(ids)
+    GROUP BY fi.food_id
+    ON CONFLICT (food_id) DO UPDATE SET
+        calories = EXCLUDED.calories,
+        protein = EXCLUDED.protein,
+        carbs = EXCLUDED.carbs,
+        fiber = EXCLUDED.fiber,
+        saturated_fats = EXCLUDED.saturated_fats,
+        monounsaturated_fats = EXCLUDED.monounsaturated_fats,
+        polyunsaturated_fats = EXCLUDED.polyunsaturated_fats,
+        trans_fats = EXCLUDED.trans_fats,
+        cholesterol = EXCLUDED.cholesterol,
+        updated_at = EXCLUDED.updated_at;
+
+    DELETE FROM food_nutrition n
+    WHERE (ids IS NULL OR n.food_id = ANY(ids))
+        AND NOT EXISTS (SELECT 1 FROM food_ingredients fi WHERE fi.food_id = n.food_id);
+$func$;
+
+CREATE OR REPLACE FUNCTION refresh_extra_food_nutrition(ids INTEGER[]) RETURNS VOID
+LANGUAGE sql AS
+$func$
+    INSERT INTO extra_food_nutrition (id_extra_food, calories, protein, carbs, fiber, saturated_fats, monounsaturated_fats, polyunsaturated_fats, trans_fats, cholesterol, updated_at)
+    SELECT
+        efi.id_extra_food,
+        SUM(i.calories * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.protein * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.carbs * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.fiber * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.saturated_fats * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.monounsaturated_fats * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.polyunsaturated_fats * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.trans_fats * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        SUM(i.cholesterol * efi.quantity / CASE WHEN i.measure_type = 'unit' THEN 1.0 ELSE 100.0 END),
+        NOW()
+    FROM extrafood_ingredient efi
+    JOIN ingredients i ON efi.ingredient_id = i.id
+    WHERE ids IS NULL OR efi.id_extra_food = ANY(ids)
+    GROUP BY efi.id_extra_food
+    ON CONFLICT (id_extra_food) DO UPDATE SET
+        calories = EXCLUDED.calories,
+        protein = EXCLUDED.protein,
+        carbs = EXCLUDED.carbs,
+        fiber = EXCLUDED.fiber,
+        saturated_fats = EXCLUDED.saturated_fats,
+        monounsaturated_fats = EXCLUDED.monounsaturated_fats,
+        polyunsaturated_fats = EXCLUDED.polyunsaturated_fats,
+        trans_fats = EXCLUDED.trans_fats,
+        cholesterol = EXCLUDED.cholesterol,
+        updated_at = EXCLUDED.updated_at;
+
+    DELETE FROM extra_food_nutrition n
+    WHERE (ids IS NULL OR n.id_extra_food = ANY(ids))
+        AND NOT EXISTS (SELECT 1 FROM extrafood_ingredient efi WHERE efi.id_extra_food = n.id_extra_food);
+$func$;
+
+CREATE OR REPLACE FUNCTION refresh_nutrition_on_ingredient_update() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$func$
+BEGIN
+    PERFORM refresh_food_nutrition(
+        ARRAY(SELECT food_id FROM food_ingredients WHERE ingredient_id = NEW.id));
+    PERFORM refresh_extra_food_nutrition(
+        ARRAY(SELECT id_extra_food FROM extrafood_ingredient WHERE ingredient_id = NEW.id));
+    RETURN NULL;
+END
+$func$;
+
+CREATE TRIGGER ingredients_nutrition_refresh
+    AFTER UPDATE OF measure_type, calories, protein, carbs, fiber, saturated_fats, monounsaturated_fats, polyunsaturated_fats, trans_fats, cholesterol
+    ON ingredients
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_nutrition_on_ingredient_update();
+
+SELECT refresh_food_nutrition(NULL);
+SELECT refresh_extra_food_nutrition(NULL);
+-- ------------------------------------------------------------------------------------
+
+-- --------------------------------VERSIONES-----------------------------------
+-- Row versions behind the ETags of plans, foods and ingredients. Every UPDATE
+-- bumps the row's version, so conditional GETs only have to read versions
+-- instead of the whole payload.
+ALTER TABLE plans ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE foods ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE ingredients ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$func$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END
+$func$;
+
+CREATE TRIGGER plans_bump_version
+    BEFORE UPDATE ON plans
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_row_version();
+
+CREATE TRIGGER foods_bump_version
+    BEFORE UPDATE ON foods
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_row_version();
+
+CREATE TRIGGER ingredients_bump_version
+    BEFORE UPDATE ON ingredients
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_row_version();
+
+-- Version of whole tables, for the ETags of list endpoints. A statement level
+-- trigger bumps it on every write, so reading it is a primary key lookup
+-- whatever the size of the table.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1
+);
+
+INSERT INTO table_versions (table_name) VALUES ('plans'), ('ingredients')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$func$
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$func$;
+
+CREATE TRIGGER plans_bump_table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON plans
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_version();
+
+CREATE TRIGGER ingredients_bump_table_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ingredients
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_version();
+-- ------------------------------------------------------------------------------------
+
+-- --------------------------------PLANTILLAS-----------------------------------
+-- Curated plans users get a copy of. Copies are made with INSERT ... SELECT
+-- by the repository and are not templates themselves.
+ALTER TABLE plans ADD COLUMN IF NOT EXISTS is_template BOOLEAN NOT NULL DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS plans_template_idx ON plans (id_plan) WHERE is_template;
+-- ------------------------------------------------------------------------------------
+
+-- --------------------------------RECORDATORIOS-----------------------------------
+-- Meal reminders. The scheduler precomputes the reminders of the next hours
+-- into meal_reminders (one row per user and planned meal, due_at truncated
+-- to the minute so each minute is a bucket) and every instance claims due
+-- rows with FOR UPDATE SKIP LOCKED, so several of them can share the work.
+CREATE TABLE IF NOT EXISTS user_push_tokens (
+    id_user VARCHAR(36) PRIMARY KEY REFERENCES users(id_user) ON DELETE CASCADE,
+    token VARCHAR(255) NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Local time of each meal, reminders are sent some minutes before it
+ALTER TABLE meal_moments ADD COLUMN IF NOT EXISTS reminder_time TIME;
+
+UPDATE meal_moments SET reminder_time = '08:00' WHERE name = 'Desayuno' AND reminder_time IS NULL;
+UPDATE meal_moments SET reminder_time = '13:00' WHERE name = 'Almuerzo' AND reminder_time IS NULL;
+UPDATE meal_moments SET reminder_time = '17:00' WHERE name = 'Merienda' AND reminder_time IS NULL;
+UPDATE meal_moments SET reminder_time = '21:00' WHERE name = 'Cena' AND reminder_time IS NULL;
+
+CREATE INDEX IF NOT EXISTS users_id_plan_idx ON users (id_plan);
+
+CREATE TABLE IF NOT EXISTS meal_reminders (
+    id BIGSERIAL PRIMARY KEY,
+    id_user VARCHAR(36) NOT NULL REFERENCES users(id_user) ON DELETE CASCADE,
+    day_id INTEGER NOT NULL REFERENCES week_days(id),
+    meal_moment_id INTEGER NOT NULL REFERENCES meal_moments(id),
+    due_at TIMESTAMP NOT NULL,
+    claimed_at TIMESTAMP,
+    sent_at TIMESTAMP,
+    UNIQUE (id_user, meal_moment_id, due_at)
+);
+
+-- Only pending reminders are ever claimed, in due order
+CREATE INDEX IF NOT EXISTS meal_reminders_pending_idx
+    ON meal_reminders (due_at)
+    WHERE sent_at IS NULL;
+-- ------------------------------------------------------------------------------------
+
 -- Link foods used in Plan 1 (Subir de Peso)
 -- INSERT INTO foodplanlink (food_id, plan_id, day_id, meal_moment_id, updated_at) VALUES
 -- (1, 1, NOW()),  -- Pasta con salsa cremosa
@@ -422,4 +682,5 @@ INSERT INTO extrafood_user_link (id_extra_food, id_user)
 VALUES (1, '4d6e8f0a-3456-4h7i-e8f9-4a5b6c7d8e9f');
 -- ---------------------------------------------------------------------
 
-
+-- The two mock plans with a full week are the initial templates
+UPDATE plans SET is_template = TRUE WHERE id_plan IN (1, 2);
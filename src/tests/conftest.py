@@ -0,0 +1,58 @@
+from typing import TYPE_CHECKING
+
+import pytest
+
+# Services are imported by the fixtures that use them, importing them connects
+# the repositories to DATABASE_URL and tests without a database must not need it
+if TYPE_CHECKING:
+    from service.food_service import FoodService
+    from service.reference_data import ReferenceDataRegistry
+    from service.weekly_plan_cache import WeeklyPlanCache
+
+
+class FakeReferenceRepository:
+    def get_days(self) -> list[dict]:
+        return [{"id": 1, "name": "Lunes"}, {"id": 2, "name": "Martes"}]
+
+    def get_moments(self) -> list[dict]:
+        return [{"id": 1, "name": "Desayuno"}, {"id": 2, "name": "Almuerzo"}]
+
+
+class FakeResponseCache:
+    """Records the invalidated tags instead of dropping cached responses"""
+
+    def __init__(self):
+        self.invalidated: list[str] = []
+
+    def invalidate(self, *tags):
+        self.invalidated.extend(tags)
+
+    async def invalidate_async(self, *tags):
+        self.invalidated.extend(tags)
+
+
+@pytest.fixture
+def response_cache() -> FakeResponseCache:
+    return FakeResponseCache()
+
+
+@pytest.fixture
+def reference_data() -> "ReferenceDataRegistry":
+    from service.reference_data import ReferenceDataRegistry
+
+    return ReferenceDataRegistry(FakeReferenceRepository())  # type: ignore
+
+
+@pytest.fixture
+def plan_cache() -> "WeeklyPlanCache":
+    from service.weekly_plan_cache import WeeklyPlanCache
+
+    return WeeklyPlanCache()
+
+
+@pytest.fixture
+def food_service(repository, reference_data, plan_cache, response_cache) -> "FoodService":
+    """FoodService over the repository fixture of the test module"""
+    from service.food_service import FoodService
+
+    return FoodService(repository, reference_data, plan_cache, response_cache)
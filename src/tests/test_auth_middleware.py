@@ -0,0 +1,75 @@
+from typing import Optional, Union
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from cache.token_cache import VerifiedTokenCache
+from middleware.auth_middleware import JWTMiddleware
+from models.errors.errors import AuthenticationError
+from service.jwt_service import JWTService
+
+
+class RecordingJWTService(JWTService):
+    def __init__(self):
+        self.tokens = []
+
+    def verify(self, token: str) -> Union[dict, str]:
+        self.tokens.append(token)
+        if token != "valid":
+            raise AuthenticationError()
+
+        return {"userId": "1"}
+
+    def decode(self, token: str) -> Optional[Union[dict, str]]:
+        return None
+
+
+@pytest.fixture
+def jwt_service() -> RecordingJWTService:
+    return RecordingJWTService()
+
+
+@pytest.fixture
+def client(jwt_service: RecordingJWTService) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/")
+    @app.get("/private")
+    @app.get("/health/db")
+    @app.get("/foods/1")
+    def echo(request: Request):
+        return {"user": getattr(request.state, "user", None)}
+
+    app.add_middleware(JWTMiddleware, jwt_service=jwt_service,
+                       token_cache=VerifiedTokenCache(max_size=10))
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/", "/health/db", "/foods/1"])
+def test_public_paths_skip_authentication(client: TestClient, jwt_service: RecordingJWTService, path: str):
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.json() == {"user": None}
+    assert jwt_service.tokens == []
+
+
+def test_local_docs_referer_skips_authentication(client: TestClient):
+    response = client.get(
+        "/private", headers={"Referer": "http://localhost:8081/docs"})
+
+    assert response.status_code == 200
+
+
+def test_private_paths_need_a_valid_token(client: TestClient, jwt_service: RecordingJWTService):
+    with pytest.raises(AuthenticationError):
+        client.get("/private", headers={"Authorization": "Bearer invalid"})
+
+    first = client.get("/private", headers={"Authorization": "Bearer valid"})
+    second = client.get("/private", headers={"Authorization": "Bearer valid"})
+
+    assert first.json() == {"user": {"userId": "1"}}
+    assert second.json() == {"user": {"userId": "1"}}
+    assert jwt_service.tokens == ["invalid", "valid"]
@@ -0,0 +1,115 @@
+import io
+from contextlib import contextmanager
+
+import pytest
+
+from cache import tags
+from models.catalog_import import ImportFormat, ImportKind, ImportRowError
+from models.errors.errors import ValidationError
+from repository.catalog_import_repository import ICatalogImportRepository, MergeResult
+from service.catalog_import_service import CatalogImportService, read_records
+
+INGREDIENT = ("gram", "52", "0.3", "14", "2.4", "0", "0", "0", "0", "0")
+
+
+class FakeRepository(ICatalogImportRepository):
+    def __init__(self, merged: MergeResult):
+        self.merged = merged
+        self.staged: list[tuple] = []
+        self.copies = 0
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+    def create_staging(self, kind):
+        self.kind = kind
+
+    def copy_to_staging(self, kind, rows):
+        self.copies += 1
+        self.staged.extend(rows)
+
+    def merge(self, kind, max_errors):
+        return self.merged
+
+
+class FakePlanCache:
+    def __init__(self):
+        self.invalidated: list[int] = []
+
+    def invalidate(self, plan_id):
+        self.invalidated.append(plan_id)
+
+
+@pytest.fixture
+def repository() -> FakeRepository:
+    return FakeRepository(MergeResult(inserted=0, updated=0, rejected=0, errors=[], food_ids=[], plan_ids=[], extra_food_ids=[]))
+
+
+@pytest.fixture
+def plan_cache() -> FakePlanCache:
+    return FakePlanCache()
+
+
+def test_read_records_reports_unparseable_rows_by_line():
+    csv_source = io.StringIO('name,price\n"Arroz, con leche",2.5\nPan,\nSopa,1,extra\n')
+    ndjson_source = io.StringIO('{"name": "Pan"}\n\nnot json\n[1, 2]\n')
+
+    csv_records = list(read_records(csv_source, ImportFormat.CSV))
+    ndjson_records = list(read_records(ndjson_source, ImportFormat.NDJSON))
+
+    assert csv_records[0] == (2, {"name": "Arroz, con leche", "price": "2.5"})
+    # Empty values are missing, not empty strings
+    assert csv_records[1] == (3, {"name": "Pan"})
+    assert csv_records[2][0] == 4 and isinstance(csv_records[2][1], ValueError)
+
+    assert ndjson_records[0] == (1, {"name": "Pan"})
+    assert [line for line, _ in ndjson_records[1:]] == [3, 4]
+    assert all(isinstance(record, ValueError) for _, record in ndjson_records[1:])
+
+
+def test_valid_rows_are_staged_in_chunks_and_invalid_ones_rejected(repository, plan_cache, response_cache):
+    rows = ["name,measure_type,calories,protein,carbs,fiber,saturated_fats,monounsaturated_fats,polyunsaturated_fats,trans_fats,cholesterol"]
+    rows += [",".join((f"Manzana {index}", *INGREDIENT)) for index in range(5)]
+    rows.append(",".join(("Pera", "litre", *INGREDIENT[1:])))
+    rows.append(",".join(("Uva", "gram", "-1", *INGREDIENT[2:])))
+    progress = []
+
+    repository.merged = MergeResult(inserted=4, updated=1, rejected=0, errors=[], food_ids=[], plan_ids=[], extra_food_ids=[])
+    import_service = CatalogImportService(repository, plan_cache, response_cache, chunk_size=3)
+    result = import_service.import_catalog(ImportKind.INGREDIENTS, ImportFormat.CSV, io.StringIO("\n".join(rows)), progress.append)
+
+    assert repository.copies == 2
+    assert [row[:3] for row in repository.staged[:2]] == [(2, "Manzana 0", "gram"), (3, "Manzana 1", "gram")]
+    assert repository.staged[0][3] == 52.0
+    assert [progress.rows for progress in progress] == [3, 6, 7]
+
+    assert (result.rows, result.inserted, result.updated, result.rejected) == (7, 4, 1, 2)
+    assert [error.line for error in result.errors] == [7, 8]
+    assert "measure_type" in result.errors[0].error and "calories" in result.errors[1].error
+    assert response_cache.invalidated == [tags.INGREDIENTS]
+
+
+def test_merge_errors_are_reported_and_changed_foods_invalidated(repository, plan_cache, response_cache):
+    source = io.StringIO('{"food": "Pan", "ingredient": "Harina", "quantity": 100}\n'
+                         '{"food": "Pan", "ingredient": "Sal"}\n'
+                         '{"food": "Sopa", "ingredient": "Agua", "quantity": 500}\n')
+    repository.merged = MergeResult(inserted=1, updated=0, rejected=1, errors=[ImportRowError(line=3, error="Unknown food 'Sopa'")],
+                                    food_ids=[8], plan_ids=[3, 4], extra_food_ids=[])
+
+    import_service = CatalogImportService(repository, plan_cache, response_cache, max_errors=10)
+    result = import_service.import_catalog(ImportKind.FOOD_INGREDIENTS, ImportFormat.NDJSON, source)
+
+    assert repository.staged == [(1, "Pan", "Harina", 100.0), (3, "Sopa", "Agua", 500.0)]
+    assert result.rejected == 2
+    assert [(error.line, error.error) for error in result.errors] == [(2, "quantity: Field required"), (3, "Unknown food 'Sopa'")]
+    assert plan_cache.invalidated == [3, 4]
+    assert set(response_cache.invalidated) == {tags.PLAN_NUTRITION, tags.food(8), tags.plan(3), tags.plan(4)}
+
+
+def test_malformed_input_fails_the_import(repository, plan_cache, response_cache):
+    import_service = CatalogImportService(repository, plan_cache, response_cache)
+    source = io.TextIOWrapper(io.BytesIO(b'{"name": "Pan"}\n\xff\xfe\n'), encoding="utf-8")
+
+    with pytest.raises(ValidationError):
+        import_service.import_catalog(ImportKind.FOODS, ImportFormat.NDJSON, source)
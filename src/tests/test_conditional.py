@@ -0,0 +1,79 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from cache.conditional import conditional_get, etag_matches
+from cache.lru import LRUCache
+from cache.response_cache import ResponseCache, cached_response
+from models.response import CustomResponse
+
+
+def test_etag_matches_lists_wildcards_and_weak_tags():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_conditional_get_answers_304_without_running_the_handler():
+    versions = {1: "1"}
+    calls = []
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    @conditional_get(version=lambda item_id: versions.get(item_id))
+    def get_item(item_id: int) -> CustomResponse[dict]:
+        calls.append(item_id)
+        return CustomResponse(data={"id": item_id})
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    first = client.get("/items/1")
+    etag = first.headers["ETag"]
+    second = client.get("/items/1", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert first.json() == {"data": {"id": 1}}
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert calls == [1]
+
+    versions[1] = "2"
+    third = client.get("/items/1", headers={"If-None-Match": etag})
+
+    assert third.status_code == 200
+    assert third.headers["ETag"] != etag
+    assert calls == [1, 1]
+
+
+def test_conditional_get_keys_cached_responses_by_version():
+    versions = {"items": "1"}
+    cache = ResponseCache(LRUCache(max_size=10))
+    calls = []
+    router = APIRouter()
+
+    async def items_version():
+        return versions["items"]
+
+    @router.get("/items")
+    @conditional_get(version=items_version)
+    @cached_response(tags=lambda: ["items"], cache=cache)
+    async def get_items() -> CustomResponse[list[int]]:
+        calls.append(versions["items"])
+        return CustomResponse(data=[len(calls)])
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    client.get("/items")
+    cached = client.get("/items")
+    versions["items"] = "2"
+    changed = client.get("/items")
+
+    assert cached.headers["X-Cache"] == "HIT"
+    assert changed.headers["X-Cache"] == "MISS"
+    assert changed.json() == {"data": [2]}
+    assert calls == ["1", "2"]
@@ -0,0 +1,85 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime
+
+import pytest
+
+from models.errors.errors import ValidationError
+from models.export import ExportFormat, ExportKind, ExportParams
+from repository.export_repository import EXPORTS, IExportRepository
+from service.export_service import ExportService, gzip_chunks
+
+PLAN = (1, "Plan", None, "Mantener", datetime(2024, 1, 1, 8, 30),
+        {"Lunes": {"Desayuno": {"id": 3, "name": "Avena, con leche"}}}, [4, 5])
+
+
+class FakeRepository(IExportRepository):
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def stream_rows(self, kind, params):
+        self.calls.append((kind, params))
+        yield from self.rows
+
+
+def test_ndjson_rows_are_objects_in_chunks():
+    rows = [(index, f"Food {index}", None, 2.5, None, datetime(2024, 1, 1), *([1.0] * 9)) for index in range(50)]
+    repository = FakeRepository(rows)
+
+    chunks = list(ExportService(repository, chunk_size=256).export(ExportKind.FOODS, ExportFormat.NDJSON, ExportParams()))
+    lines = b"".join(chunks).decode().splitlines()
+
+    assert len(chunks) > 1
+    assert len(lines) == 50
+    assert json.loads(lines[1]) == {
+        "id": 1, "name": "Food 1", "description": None, "price": 2.5, "image_url": None,
+        "created_at": "2024-01-01T00:00:00", **{column: 1.0 for column in EXPORTS[ExportKind.FOODS][1][6:]}
+    }
+
+
+def test_csv_has_a_header_and_nested_values_as_json():
+    service = ExportService(FakeRepository([PLAN]))
+
+    content = b"".join(service.export(ExportKind.PLANS, ExportFormat.CSV, ExportParams())).decode()
+    header, row = list(csv.reader(io.StringIO(content)))
+
+    assert header == EXPORTS[ExportKind.PLANS][1]
+    assert row[:5] == ["1", "Plan", "", "Mantener", "2024-01-01T08:30:00"]
+    assert json.loads(row[5])["Lunes"]["Desayuno"]["name"] == "Avena, con leche"
+    assert json.loads(row[6]) == [4, 5]
+
+
+def test_empty_csv_exports_only_have_the_header():
+    service = ExportService(FakeRepository([]))
+
+    content = b"".join(service.export(ExportKind.WATER_CONSUMPTION, ExportFormat.CSV, ExportParams())).decode()
+
+    assert content.splitlines() == [",".join(EXPORTS[ExportKind.WATER_CONSUMPTION][1])]
+
+
+def test_gzip_output_decompresses_to_the_plain_export():
+    rows = [("user", index, date(2025, 1, 1), 250, datetime(2025, 1, 1)) for index in range(1000)]
+    params = ExportParams(user_id="user", start_date=date(2025, 1, 1), end_date=date(2025, 1, 1))
+
+    plain = b"".join(ExportService(FakeRepository(rows)).export(ExportKind.WATER_CONSUMPTION, ExportFormat.NDJSON, params))
+    compressed = b"".join(ExportService(FakeRepository(rows)).export(ExportKind.WATER_CONSUMPTION, ExportFormat.NDJSON, params, gzip=True))
+
+    assert gzip.decompress(compressed) == plain
+    assert len(compressed) < len(plain)
+    assert gzip.decompress(b"".join(gzip_chunks([]))) == b""
+
+
+def test_invalid_filters_fail_before_querying():
+    repository = FakeRepository([])
+    service = ExportService(repository)
+
+    with pytest.raises(ValidationError):
+        service.export(ExportKind.FOODS, ExportFormat.CSV, ExportParams(user_id="user"))
+    with pytest.raises(ValidationError):
+        service.export(ExportKind.EXTRA_FOODS, ExportFormat.CSV,
+                       ExportParams(start_date=date(2025, 2, 1), end_date=date(2025, 1, 1)))
+
+    assert repository.calls == []
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime
+from typing import Iterator
+
+from controller.food_controller import FoodController
+from models.foodPlans import Food
+from models.params import GetAllFoodsParams
+from service.food_service import FoodService
+
+
+class FakeFoodRepository:
+    """
+    Keyset pages over an in-memory catalog, like FoodRepository.all_foods_query
+    """
+
+    def __init__(self, count: int):
+        self.foods = [Food(id=i, name=f"Food {i}", price=1.0, created_at=datetime(2024, 1, 1))
+                      for i in range(1, count + 1)]
+        self.limits: list[int] = []
+
+    def _after(self, params: GetAllFoodsParams) -> list[Food]:
+        return [food for food in self.foods if params.cursor is None or food.id > params.cursor]
+
+    def get_all_foods(self, params: GetAllFoodsParams) -> list[Food]:
+        self.limits.append(params.limit)
+        return self._after(params)[:params.limit]
+
+    def stream_all_foods(self, params: GetAllFoodsParams) -> Iterator[Food]:
+        yield from self._after(params)
+
+
+def pages(service: FoodService, limit: int) -> list[tuple[list[int], object]]:
+    result = []
+    cursor = None
+
+    while True:
+        foods, cursor = service.get_all_foods(GetAllFoodsParams(cursor=cursor, limit=limit))
+        result.append(([food.id for food in foods], cursor))
+        if cursor is None:
+            return result
+
+
+def test_get_all_foods_walks_the_catalog_by_keyset():
+    repository = FakeFoodRepository(12)
+    service = FoodService(repository)  # type: ignore
+
+    assert pages(service, 5) == [
+        ([1, 2, 3, 4, 5], 5),
+        ([6, 7, 8, 9, 10], 10),
+        ([11, 12], None)
+    ]
+    # One extra row tells whether there is a next page
+    assert repository.limits == [6, 6, 6]
+
+
+def test_get_all_foods_has_no_cursor_on_an_exactly_full_last_page():
+    service = FoodService(FakeFoodRepository(10))  # type: ignore
+
+    assert pages(service, 5) == [
+        ([1, 2, 3, 4, 5], 5),
+        ([6, 7, 8, 9, 10], None)
+    ]
+    assert service.get_all_foods(GetAllFoodsParams(cursor=10, limit=5)) == ([], None)
+
+
+def test_stream_all_foods_writes_one_json_line_per_food():
+    controller = FoodController(FoodService(FakeFoodRepository(3)))  # type: ignore
+    response = controller.stream_all_foods(GetAllFoodsParams(cursor=1))
+
+    async def body() -> str:
+        return "".join([chunk async for chunk in response.body_iterator])  # type: ignore
+
+    lines = asyncio.run(body()).splitlines()
+
+    assert response.media_type == "application/x-ndjson"
+    assert [Food.model_validate_json(line).id for line in lines] == [2, 3]
@@ -0,0 +1,73 @@
+from collections import Counter
+from datetime import date
+
+from cli.generate_data import USER_PREFIX, DatasetGenerator, _line
+
+
+def generate_all(generator: DatasetGenerator) -> dict[str, list[str]]:
+    tables = {
+        "ingredients": list(generator.ingredients()),
+        "foods": list(generator.foods()),
+        "food_ingredients": list(generator.food_ingredients()),
+        "plans": list(generator.plans()),
+        "foodplanlink": list(generator.food_plan_links()),
+        "users": list(generator.users()),
+    }
+    for user_id in generator.user_ids:
+        for table, rows in generator.user_activity(user_id).items():
+            tables.setdefault(table, []).extend(rows)
+
+    return tables
+
+
+def columns(rows: list[str], index: int) -> list[str]:
+    return [row.rstrip("\n").split("\t")[index] for row in rows]
+
+
+def test_same_seed_generates_the_same_rows():
+    first = generate_all(DatasetGenerator(scale=0.05, seed=3, days=7, end_date=date(2025, 5, 1)))
+    second = generate_all(DatasetGenerator(scale=0.05, seed=3, days=7, end_date=date(2025, 5, 1)))
+    other = generate_all(DatasetGenerator(scale=0.05, seed=4, days=7, end_date=date(2025, 5, 1)))
+
+    assert first == second
+    assert first != other
+
+
+def test_rows_reference_generated_ids():
+    generator = DatasetGenerator(scale=0.05, seed=1, days=7, end_date=date(2025, 5, 1),
+                                 first_ids={"foods": 101, "ingredients": 51, "extra_foods": 1001})
+    tables = generate_all(generator)
+
+    food_ids = set(columns(tables["foods"], 0))
+    ingredient_ids = set(columns(tables["ingredients"], 0))
+    extra_food_ids = columns(tables["extra_foods"], 0)
+
+    assert min(map(int, food_ids)) == 101
+    assert set(columns(tables["food_ingredients"], 0)) <= food_ids
+    assert set(columns(tables["food_ingredients"], 1)) <= ingredient_ids
+    assert set(columns(tables["foodplanlink"], 0)) <= food_ids
+    assert int(extra_food_ids[0]) == 1001 and len(set(extra_food_ids)) == len(extra_food_ids)
+    assert columns(tables["extrafood_user_link"], 0) == extra_food_ids
+    assert set(columns(tables["extrafood_user_link"], 1)) <= set(generator.user_ids)
+    assert all(user_id.startswith(USER_PREFIX) and len(user_id) <= 36 for user_id in generator.user_ids)
+
+    # One ingredient at most once per food
+    pairs = list(zip(columns(tables["food_ingredients"], 0), columns(tables["food_ingredients"], 1)))
+    assert len(pairs) == len(set(pairs))
+
+    # Only the current goal of each user is open
+    open_goals = [row for row in tables["user_water_goals"] if row.endswith("\\N\n")]
+    assert len(open_goals) == len(generator.user_ids)
+
+
+def test_food_popularity_is_skewed():
+    tables = generate_all(DatasetGenerator(scale=0.5, seed=2, days=1))
+    uses = Counter(columns(tables["foodplanlink"], 0))
+
+    # The most used tenth of the foods fills over half of the plan slots
+    top = sum(count for _, count in uses.most_common(len(tables["foods"]) // 10))
+    assert top > len(tables["foodplanlink"]) / 2
+
+
+def test_lines_use_the_copy_text_format():
+    assert _line(1, "Pollo", None, 2.5) == "1\tPollo\t\\N\t2.5\n"
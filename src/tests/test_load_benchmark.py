@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from benchmarks.load_benchmark import (EDIT_SLOT, WEEKLY_PLAN, EndpointTimings, Targets, build_report, drive,
+                                  percentile)
+
+TARGETS = Targets(plan_ids=[1, 2], user_ids=["carga-1"], food_ids=[10, 11], extra_food_ids=[5],
+                  ingredient_ids=[7])
+
+
+def test_percentiles_interpolate_between_ranks():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) == 99.01
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 95) == 0.0
+
+
+def test_report_counts_errors_by_endpoint():
+    ok = EndpointTimings()
+    for latency in (0.01, 0.02, 0.03):
+        ok.add(latency, 200)
+    failing = EndpointTimings()
+    failing.add(0.1, 500)
+    failing.add(0.2, 0)
+
+    report = build_report({"GET /plans/{id}": ok, "PUT /plans/{plan_id}/foods": failing}, 2.0, {"mix": "write"})
+
+    assert report["mix"] == "write"
+    assert report["endpoints"]["GET /plans/{id}"]["errors"] == 0
+    assert report["endpoints"]["GET /plans/{id}"]["rps"] == 1.5
+    assert report["endpoints"]["GET /plans/{id}"]["p50_ms"] == 20.0
+    assert report["endpoints"]["PUT /plans/{plan_id}/foods"]["statuses"] == {"0": 1, "500": 1}
+    assert report["total"]["requests"] == 5
+    assert report["total"]["errors"] == 2
+
+
+def test_drive_times_every_operation_of_the_mix():
+    app = FastAPI()
+    edited = []
+
+    @app.get("/plans/{plan_id}")
+    async def get_plan(plan_id: int):
+        return {"id": plan_id}
+
+    @app.put("/plans/{plan_id}/foods")
+    async def edit_slot(plan_id: int, body: dict):
+        edited.append(body)
+        if plan_id == 2:
+            raise HTTPException(status_code=404)
+        return {"id": plan_id}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await drive(client, [(WEEKLY_PLAN, 1), (EDIT_SLOT, 1)], TARGETS, duration=0.2, concurrency=4)
+
+    timings, window = asyncio.run(run())
+
+    assert window >= 0.2
+    assert timings[WEEKLY_PLAN.name].latencies
+    assert timings[WEEKLY_PLAN.name].errors == 0
+    assert set(timings[EDIT_SLOT.name].statuses) <= {200, 404}
+    assert all(body["food_id"] in TARGETS.food_ids for body in edited)
@@ -0,0 +1,88 @@
+import json
+import logging
+import threading
+from time import perf_counter
+
+from utils.log_pipeline import JSONFormatter, LogPipeline
+
+
+class BlockedHandler(logging.Handler):
+    """
+    Handler stuck on I/O until released
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.unblock.wait()
+        self.records.append(record)
+
+
+def test_log_pipeline_drops_instead_of_blocking_when_full():
+    handler = BlockedHandler()
+    pipeline = LogPipeline(queue_size=10, handlers=[handler], stop_timeout=0.01)
+    logger = logging.getLogger("test_log_pipeline.full")
+    logger.propagate = False
+    pipeline.install(logger)
+
+    try:
+        start = perf_counter()
+        for i in range(100):
+            logger.error("request %d failed", i)
+        elapsed = perf_counter() - start
+
+        assert elapsed < 0.5
+        # The listener holds one record and the queue ten more
+        assert pipeline.stats().dropped >= 89
+    finally:
+        # Stopping with a full queue must not fail nor hang
+        threading.Timer(0.1, handler.unblock.set).start()
+        pipeline.stop()
+
+    stats = pipeline.stats()
+    assert stats.written + stats.dropped == 100
+    assert handler.records[0].getMessage() == "request 0 failed"
+    assert not stats.running
+
+
+def test_log_pipeline_writes_json_lines_to_a_rotating_file(tmp_path):
+    path = tmp_path / "logs.log"
+    pipeline = LogPipeline(filename=str(path), max_bytes=2000, backup_count=2)
+    logger = logging.getLogger("test_log_pipeline.file")
+    logger.propagate = False
+    pipeline.install(logger)
+
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        logger.error("unexpected error", exc_info=e, extra={"status": 500, "path": "/foods"})
+
+    for i in range(100):
+        logger.info("line %d", i)
+    pipeline.stop()
+
+    rotated = sorted(p.name for p in tmp_path.iterdir())
+    assert rotated == ["logs.log", "logs.log.1", "logs.log.2"]
+
+    entry = json.loads(path.read_text().splitlines()[-1])
+    assert entry["message"] == "line 99"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test_log_pipeline.file"
+
+
+def test_json_formatter_keeps_extra_fields_and_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test").makeRecord(
+            "test", logging.ERROR, __file__, 1, "failed %s", ("GET",), __import__("sys").exc_info(),
+            extra={"status": 500})
+
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["message"] == "failed GET"
+    assert entry["status"] == 500
+    assert "ValueError: boom" in entry["exc_info"]
@@ -12,7 +12,6 @@ from routes.health_routes import router
 
 from middleware.auth_middleware import JWTMiddleware
 from middleware.error_handler import error_handler
-from starlette.middleware.base import BaseHTTPMiddleware
 from service.jwt_service import JWTService
 from models.jwt import JwtCustomPayload
 
@@ -70,8 +69,8 @@ def sample_message_data():
 
 app = FastAPI()
 
-app.add_middleware(BaseHTTPMiddleware,
-                   dispatch=JWTMiddleware(MockJWTService(), MockHTTPBearer()))
+app.add_middleware(JWTMiddleware, jwt_service=MockJWTService(),
+                   security=MockHTTPBearer())
 
 
 app.include_router(router, prefix="/health", tags=["health"])
@@ -175,8 +174,8 @@ class TestAuthentication:
 
         app_aux = FastAPI()
 
-        app_aux.add_middleware(BaseHTTPMiddleware,
-                               dispatch=JWTMiddleware(MockJWTService(), MockHTTPBearer()))
+        app_aux.add_middleware(JWTMiddleware, jwt_service=MockJWTService(),
+                               security=MockHTTPBearer())
 
         app_aux.include_router(router, prefix="/health", tags=["health"])
 
@@ -0,0 +1,102 @@
+import asyncio
+from collections import namedtuple
+from functools import partial
+from typing import Any, Sequence
+
+from repository.reminder_repository import IReminderRepository
+from service.meal_reminder_service import MealReminderService
+from tests.test_push_dispatcher import MockExpo
+from utils.push_dispatcher import PushMessage
+
+Reminder = namedtuple(
+    "Reminder", ["id", "id_user", "day_id", "meal_moment_id", "moment", "token", "food"])
+
+
+class FakeReminderRepository(IReminderRepository):
+    def __init__(self, reminders: list[Reminder]):
+        self.pending = list(reminders)
+        self.sent: list[int] = []
+
+    def save_push_token(self, user_id: str, token: str) -> None:
+        pass
+
+    def delete_push_token(self, token: str) -> None:
+        pass
+
+    def schedule_reminders(self, horizon_minutes: int, lead_minutes: int) -> int:
+        return 0
+
+    def claim_due_reminders(self, limit: int, lease_seconds: int, stale_minutes: int) -> Sequence[Any]:
+        claimed, self.pending = self.pending[:limit], self.pending[limit:]
+        return claimed
+
+    def mark_reminders_sent(self, reminder_ids: list[int]) -> None:
+        self.sent.extend(reminder_ids)
+
+    def purge_reminders(self, older_than_hours: int) -> int:
+        return 0
+
+
+def reminders(count: int) -> list[Reminder]:
+    return [Reminder(i, f"user-{i}", 1, 2, "Almuerzo", f"token-{i}", "Ensalada de pollo")
+            for i in range(count)]
+
+
+def test_dispatch_due_sends_claimed_batches_in_bulk():
+    repository = FakeReminderRepository(reminders(25))
+    batches: list[list[PushMessage]] = []
+
+    def sender(messages: list[PushMessage]) -> int:
+        batches.append(messages)
+        return len(messages)
+
+    sent = MealReminderService(repository, sender, batch_size=10).dispatch_due()
+
+    assert sent == 25
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert batches[0][0].body == "Se acerca tu almuerzo: Ensalada de pollo"
+    assert sorted(repository.sent) == list(range(25))
+
+
+def test_dispatch_due_completes_reminders_with_nothing_to_send():
+    repository = FakeReminderRepository([
+        *reminders(1),
+        Reminder(1, "no-token", 1, 2, "Cena", None, "Sopa"),
+        Reminder(2, "empty-slot", 1, 2, "Cena", "token", None),
+    ])
+    batches: list[list[PushMessage]] = []
+
+    def sender(messages: list[PushMessage]) -> int:
+        batches.append(messages)
+        return len(messages)
+
+    sent = MealReminderService(repository, sender).dispatch_due()
+
+    assert sent == 1
+    assert sorted(repository.sent) == [0, 1, 2]
+
+
+def test_dispatch_due_leaves_what_a_full_sender_did_not_take_claimed():
+    repository = FakeReminderRepository(reminders(5))
+
+    sent = MealReminderService(repository, lambda messages: 2).dispatch_due()
+
+    assert sent == 2
+    assert repository.sent == [0, 1]
+
+
+def test_dispatch_due_in_a_worker_thread_only_completes_what_the_dispatcher_queued():
+    repository = FakeReminderRepository(reminders(8))
+    expo = MockExpo()
+
+    async def run() -> int:
+        dispatcher = expo.dispatcher(concurrency=1, max_queue_size=5)
+        await dispatcher.start()
+        # As the scheduler runs it
+        service = MealReminderService(repository, partial(dispatcher.enqueue_many, wait=True))
+        sent = await asyncio.to_thread(service.dispatch_due)
+        await dispatcher.stop()
+        return sent
+
+    assert asyncio.run(run()) == 5
+    assert repository.sent == [0, 1, 2, 3, 4]
@@ -0,0 +1,82 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from metrics.database import (InstrumentedQueuePool, instrument_engine, instrument_repository,
+                              metrics_registry, pool_checkout, query_duration)
+from metrics.http import MetricsMiddleware
+from metrics.registry import MetricsRegistry
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.gauge("queue_size", "Queued", callback=lambda: {(): 3})
+
+    requests.inc(route='/plans/{plan_id}')
+    requests.inc(route='/plans/{plan_id}')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/plans/{plan_id}"} 2' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_sum 5.55" in lines
+    assert "latency_seconds_count 3" in lines
+    assert "queue_size 3" in lines
+
+
+def test_middleware_labels_requests_with_the_route_template():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/plans/{plan_id}")
+    def get_plan(plan_id: int):
+        if plan_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": plan_id}
+
+    client = TestClient(app)
+    for plan_id in (1, 2, 0):
+        client.get(f"/plans/{plan_id}")
+    client.get("/wp-login.php")
+
+    middleware = MetricsMiddleware(app, registry)
+    assert middleware.requests.value(route="/plans/{plan_id}", method="GET", status="200") == 2
+    assert middleware.requests.value(route="/plans/{plan_id}", method="GET", status="404") == 1
+    assert middleware.requests.value(route="unmatched", method="GET", status="404") == 1
+    assert middleware.duration.count(route="/plans/{plan_id}", method="GET") == 3
+    assert middleware.in_flight.value() == 0
+
+
+def test_statements_are_timed_by_repository_method(tmp_path):
+    engine = instrument_engine(create_engine(
+        f"sqlite:///{tmp_path / 'metrics.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name="test"
+    ), "test")
+
+    @instrument_repository
+    class PlanRepository:
+        def count_plans(self) -> int:
+            with engine.begin() as connection:
+                connection.execute(text("CREATE TABLE IF NOT EXISTS plans (id INTEGER)"))
+                return connection.execute(text("SELECT COUNT(*) FROM plans")).scalar_one()
+
+        def count_twice(self) -> int:
+            return self.count_plans() + self.count_plans()
+
+    PlanRepository().count_twice()
+
+    # Nested calls are reported under the outermost method
+    assert query_duration.count(query="PlanRepository.count_twice") == 4
+    assert query_duration.count(query="PlanRepository.count_plans") == 0
+    assert pool_checkout.count(pool="test") == 2
+    assert 'db_pool_checked_out{pool="test"} 0' in metrics_registry.render()
@@ -0,0 +1,129 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from models.foodPlans import Plan
+from service.nutrition import NUTRIENTS, build_plan_nutrition, food_nutrition_matrix, plan_nutrition
+
+IngredientRow = namedtuple(
+    "IngredientRow", ["food_id", "measure_type", "quantity", *NUTRIENTS])
+# Columns of FoodRepository.get_weekly_plan_by_id
+WeeklyPlanRow = namedtuple(
+    "WeeklyPlanRow", ["day_id", "meal_moment_id", "id", "name", "description", "price", "created_at"])
+
+
+def ingredient(food_id: int, measure_type: str, quantity: float, calories: float, protein: float = 0.0) -> IngredientRow:
+    return IngredientRow(food_id, measure_type, quantity, calories, protein, *([0.0] * (len(NUTRIENTS) - 2)))
+
+
+def slot(day_id: int, meal_moment_id: int, food_id: int) -> WeeklyPlanRow:
+    return WeeklyPlanRow(day_id, meal_moment_id, food_id, f"Food {food_id}", None, 1.0, datetime(2024, 1, 1))
+
+
+class FakeRepository:
+    def __init__(self, slots: list[WeeklyPlanRow], ingredients: list[IngredientRow]):
+        self.slots = slots
+        self.ingredients = ingredients
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+    def get_plan_by_id(self, plan_id):
+        return Plan(id_plan=plan_id, title="Plan", plan_description="Plan de prueba", objetive="Mantener",
+                    created_at=datetime(2024, 1, 1))
+
+    def get_weekly_plan_by_id(self, plan_id):
+        return self.slots
+
+    def get_plan_ingredients(self, plan_id):
+        return self.ingredients
+
+
+@pytest.fixture
+def repository() -> FakeRepository:
+    return FakeRepository(
+        [slot(1, 1, 1), slot(1, 2, 2), slot(2, 2, 1)],
+        [ingredient(1, "gram", 200, 100, protein=10), ingredient(2, "unit", 1, 80)]
+    )
+
+
+def test_food_nutrition_scales_grams_per_100g_and_units_per_unit():
+    matrix = food_nutrition_matrix([
+        ingredient(2, "gram", 250, 130, protein=5),
+        ingredient(1, "unit", 3, 17, protein=3.6),
+        ingredient(2, "unit", 2, 17),
+    ])
+
+    assert matrix.food_ids.tolist() == [1, 2]
+    assert matrix.values[0, 0] == pytest.approx(51)
+    assert matrix.values[0, 1] == pytest.approx(10.8)
+    assert matrix.values[1, 0] == pytest.approx(325 + 34)
+    assert matrix.values[1, 1] == pytest.approx(12.5)
+
+
+def test_plan_nutrition_totals_per_slot_day_and_week():
+    foods = food_nutrition_matrix([
+        ingredient(1, "gram", 100, 200),
+        ingredient(2, "unit", 2, 50),
+    ])
+
+    totals = plan_nutrition(
+        [
+            slot(1, 1, 1),
+            slot(1, 2, 2),
+            slot(2, 1, 3),  # Food without ingredients
+            slot(9, 1, 1),  # Unknown day
+        ],
+        foods,
+        day_ids=[1, 2, 3],
+        moment_ids=[1, 2]
+    )
+
+    assert totals.slots[0, :, 0].tolist() == [200, 100]
+    assert totals.filled.tolist() == [[True, True], [True, False], [False, False]]
+    assert totals.days[:, 0].tolist() == [300, 0, 0]
+    assert totals.week[0] == 300
+    assert np.all(totals.week[2:] == 0)
+
+
+def test_plan_nutrition_without_slots_is_zero():
+    totals = plan_nutrition([], food_nutrition_matrix([]), [1, 2], [1])
+
+    assert totals.week.tolist() == [0.0] * len(NUTRIENTS)
+    assert not totals.filled.any()
+
+
+def test_build_plan_nutrition_from_weekly_plan_rows():
+    slots = [
+        WeeklyPlanRow(1, 1, 7, "Avena", None, 2.5, datetime(2024, 1, 1)),
+        WeeklyPlanRow(2, 2, 7, "Avena", None, 2.5, datetime(2024, 1, 1)),
+    ]
+    ingredients = [ingredient(7, "gram", 50, 380, protein=13)]
+
+    nutrition = build_plan_nutrition(
+        3,
+        slots,
+        ingredients,
+        days=[{"id": 1, "name": "Lunes"}, {"id": 2, "name": "Martes"}],
+        moments=[{"id": 1, "name": "Desayuno"}, {"id": 2, "name": "Almuerzo"}]
+    )
+
+    assert nutrition.id_plan == 3
+    assert nutrition.days["Lunes"].moments["Desayuno"].calories == pytest.approx(190)
+    assert nutrition.days["Lunes"].moments["Almuerzo"] is None
+    assert nutrition.days["Martes"].total.protein == pytest.approx(6.5)
+    assert nutrition.week.calories == pytest.approx(380)
+
+
+def test_plan_nutrition_of_the_service_uses_the_repository_rows(food_service):
+    nutrition = food_service.get_plan_nutrition(1)
+
+    assert nutrition.days["Lunes"].moments["Desayuno"].calories == pytest.approx(200)
+    assert nutrition.days["Lunes"].moments["Almuerzo"].calories == pytest.approx(80)
+    assert nutrition.days["Martes"].moments["Desayuno"] is None
+    assert nutrition.days["Martes"].total.protein == pytest.approx(20)
+    assert nutrition.week.calories == pytest.approx(480)
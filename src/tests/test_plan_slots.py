@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from models.errors.errors import NotFoundError, ValidationError
+from models.foodPlans import Food, Plan, PlanSlotsBatchDTO, WeeklyPlan
+from service.async_food_service import AsyncFoodService
+from service.weekly_plan_cache import WeeklyPlanCache
+
+
+class FakeRepository:
+    def __init__(self):
+        self.batches: list[list[tuple]] = []
+        self.weekly_plan_loads = 0
+
+    def apply_slot_operations(self, plan_id, operations):
+        self.batches.append(operations)
+        return [
+            (day_id, moment_id, Food(id=food_id, name=f"Food {food_id}", price=1.0, created_at=datetime(2024, 1, 1)))
+            for op, day_id, moment_id, food_id in operations if op != "clear"
+        ]
+
+    def get_plan_by_id(self, plan_id):
+        self.weekly_plan_loads += 1
+        return Plan(id_plan=plan_id, title="Plan", plan_description="Plan de prueba", objetive="Mantener", created_at=datetime(2024, 1, 1))
+
+    def get_weekly_plan_by_id(self, plan_id):
+        return []
+
+
+class AsyncFakeRepository(FakeRepository):
+    async def apply_slot_operations(self, plan_id, operations):
+        return FakeRepository.apply_slot_operations(self, plan_id, operations)
+
+
+def batch(*operations: dict) -> PlanSlotsBatchDTO:
+    return PlanSlotsBatchDTO.model_validate({"operations": list(operations)})
+
+
+def cached_plan(plan_cache: WeeklyPlanCache) -> None:
+    plan_cache.put(WeeklyPlan(
+        id_plan=1, title="Plan", plan_description="Plan de prueba", objetive="Mantener", created_at=datetime(2024, 1, 1),
+        weekly_plan={
+            "Lunes": {"Desayuno": {"id": 9, "name": "Food 9"}, "Almuerzo": None},
+            "Martes": {"Desayuno": None, "Almuerzo": None}
+        }
+    ))
+
+
+@pytest.fixture
+def repository() -> FakeRepository:
+    return FakeRepository()
+
+
+def test_batch_is_written_at_once_and_patches_the_cached_plan(food_service, repository, plan_cache, response_cache):
+    cached_plan(plan_cache)
+
+    weekly_plan = food_service.edit_plan_slots(1, batch(
+        {"op": "clear", "day": "Lunes", "moment": "Desayuno", "food_id": 4},
+        {"op": "set", "day": "Lunes", "moment": "Almuerzo", "food_id": 5},
+        {"op": "replace", "day": "Martes", "moment": "Desayuno", "food_id": 6},
+    ))
+
+    assert repository.batches == [[("clear", 1, 1, None), ("set", 1, 2, 5), ("replace", 2, 1, 6)]]
+    assert repository.weekly_plan_loads == 0
+    assert weekly_plan.weekly_plan["Lunes"]["Desayuno"] is None
+    assert weekly_plan.weekly_plan["Lunes"]["Almuerzo"]["id"] == 5  # type: ignore
+    assert weekly_plan.weekly_plan["Martes"]["Desayuno"]["id"] == 6  # type: ignore
+    assert response_cache.invalidated == ["plan:1"]
+
+
+def test_uncached_plans_are_loaded_once_after_the_batch(food_service, repository):
+
+    food_service.edit_plan_slots(1, batch(
+        {"op": "set", "day": "Lunes", "moment": "Almuerzo", "food_id": 5},
+        {"op": "set", "day": "Martes", "moment": "Almuerzo", "food_id": 5},
+    ))
+
+    assert repository.weekly_plan_loads == 1
+
+
+@pytest.mark.parametrize("operations, error", [
+    ([{"op": "set", "day": "Lunes", "moment": "Cena", "food_id": 5}], NotFoundError),
+    ([{"op": "replace", "day": "Lunes", "moment": "Desayuno"}], ValidationError),
+    ([{"op": "clear", "day": "Lunes", "moment": "Desayuno"},
+      {"op": "set", "day": "Lunes", "moment": "Desayuno", "food_id": 5}], ValidationError),
+])
+def test_invalid_batches_write_nothing(operations, error, food_service, repository):
+
+    with pytest.raises(error):
+        food_service.edit_plan_slots(1, batch(*operations))
+
+    assert repository.batches == []
+
+
+def test_async_batch_matches_the_sync_one(reference_data, plan_cache, response_cache):
+    cached_plan(plan_cache)
+    async_service = AsyncFoodService(AsyncFakeRepository(), reference_data, plan_cache, response_cache)  # type: ignore
+
+    weekly_plan = asyncio.run(async_service.edit_plan_slots(1, batch(
+        {"op": "clear", "day": "Lunes", "moment": "Desayuno"},
+        {"op": "set", "day": "Martes", "moment": "Almuerzo", "food_id": 7},
+    )))
+
+    assert weekly_plan.weekly_plan["Lunes"]["Desayuno"] is None
+    assert weekly_plan.weekly_plan["Martes"]["Almuerzo"]["id"] == 7  # type: ignore
+    assert response_cache.invalidated == ["plan:1"]
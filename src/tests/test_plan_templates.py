@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+from models.errors.errors import NotFoundError
+from models.foodPlans import Plan, PlanCloneDTO, TemplateInstance, TemplateInstanceDTO
+from repository.food_repository import _clone_plans_query
+
+
+class FakeRepository:
+    def __init__(self, templates: set[int]):
+        self.templates = templates
+        self.instantiated: list[list[str]] = []
+        self.next_plan_id = 100
+
+    def instantiate_template(self, template_id, user_ids):
+        self.instantiated.append(user_ids)
+        if template_id not in self.templates:
+            return []
+
+        instances = [TemplateInstance(user_id=user_id, plan_id=self.next_plan_id + index) for index, user_id in enumerate(user_ids)]
+        self.next_plan_id += len(user_ids)
+        return instances
+
+    def clone_plan(self, plan_id, title):
+        return None
+
+    def get_plan_by_id(self, plan_id):
+        return Plan(id_plan=plan_id, title="Copia", plan_description="Plan de prueba", objetive="Mantener",
+                    created_at=datetime(2024, 1, 1))
+
+
+@pytest.fixture
+def repository() -> FakeRepository:
+    return FakeRepository(templates={1})
+
+
+def test_every_user_gets_one_copy_in_a_single_call(food_service, repository, response_cache):
+
+    instances = food_service.instantiate_template(1, ["ana", "luis", "ana", "eva"])
+
+    assert repository.instantiated == [["ana", "luis", "eva"]]
+    assert [(instance.user_id, instance.plan_id) for instance in instances] == [("ana", 100), ("luis", 101), ("eva", 102)]
+    assert response_cache.invalidated == ["plans"]
+
+
+def test_only_templates_are_instantiated(food_service, response_cache):
+
+    with pytest.raises(NotFoundError):
+        food_service.instantiate_template(2, ["ana"])
+    with pytest.raises(NotFoundError):
+        food_service.clone_plan(2, PlanCloneDTO())
+
+    assert response_cache.invalidated == []
+
+
+def test_instantiating_for_a_user_returns_the_copy(food_service):
+
+    plan = food_service.instantiate_template_for_user("ana", TemplateInstanceDTO(template_id=1))
+
+    assert plan.id_plan == 100
+
+
+def test_clone_query_only_assigns_and_filters_templates_when_asked():
+    clone = str(_clone_plans_query(templates_only=False, assign=False))
+    instantiate = str(_clone_plans_query(templates_only=True, assign=True))
+
+    assert "is_template" not in clone and "INSERT INTO users" not in clone
+    assert "AND is_template" in instantiate and "INSERT INTO users" in instantiate
+    for table in ("INSERT INTO plans", "INSERT INTO foodplanlink ", "INSERT INTO foodplanlink_general"):
+        assert table in clone and table in instantiate
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+from itertools import count
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.push_dispatcher import ExpoPushDispatcher, PushMessage
+
+
+class MockExpo:
+    """
+    Local Expo push API, served to the dispatcher through an ASGI transport
+    """
+
+    def __init__(self, fail_first: int = 0, unregistered: tuple[str, ...] = ()):
+        self.batches: list[list[dict]] = []
+        self.receipt_requests: list[list[str]] = []
+        self.fail_first = fail_first
+        self.unregistered = unregistered
+        self.ids = count()
+        self.app = FastAPI()
+
+        @self.app.post("/push/send")
+        async def send(request: Request):
+            if self.fail_first:
+                self.fail_first -= 1
+                return JSONResponse({"errors": []}, status_code=503)
+
+            messages = await request.json()
+            self.batches.append(messages)
+
+            return {"data": [
+                {"status": "error", "message": "not registered", "details": {"error": "DeviceNotRegistered"}}
+                if message["to"] in self.unregistered else
+                {"status": "ok", "id": f"ticket-{next(self.ids)}"}
+                for message in messages
+            ]}
+
+        @self.app.post("/push/getReceipts")
+        async def receipts(request: Request):
+            ids = (await request.json())["ids"]
+            self.receipt_requests.append(ids)
+
+            return {"data": {ticket_id: {"status": "ok"} for ticket_id in ids}}
+
+    def dispatcher(self, **kwargs) -> ExpoPushDispatcher:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://expo")
+        return ExpoPushDispatcher(
+            push_url="http://expo/push/send",
+            receipts_url="http://expo/push/getReceipts",
+            client=client,
+            backoff=0.001,
+            linger=0.01,
+            **kwargs
+        )
+
+
+def message(i: int) -> PushMessage:
+    return PushMessage(to=f"ExponentPushToken[{i}]", title="Almuerzo", body="Es hora de almorzar")
+
+
+def test_dispatcher_sends_queued_messages_in_batches_of_100():
+    expo = MockExpo()
+
+    async def run():
+        dispatcher = expo.dispatcher(concurrency=2)
+        await dispatcher.start()
+        for i in range(250):
+            assert dispatcher.enqueue(message(i))
+        await dispatcher.stop()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+
+    assert sorted(len(batch) for batch in expo.batches)[-1] == 100
+    assert sum(len(batch) for batch in expo.batches) == 250
+    assert stats.sent == 250
+    assert stats.pending_receipts == 250
+
+
+def test_dispatcher_retries_unavailable_expo():
+    expo = MockExpo(fail_first=2)
+
+    async def run():
+        dispatcher = expo.dispatcher(concurrency=1)
+        await dispatcher.start()
+        dispatcher.enqueue(message(1))
+        await dispatcher.stop()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats.retries == 2
+    assert stats.sent == 1
+
+
+def test_dispatcher_reports_unregistered_tokens_and_checks_receipts():
+    expo = MockExpo(unregistered=("ExponentPushToken[2]",))
+    invalid_tokens = []
+
+    async def run():
+        dispatcher = expo.dispatcher(concurrency=1, on_invalid_token=invalid_tokens.append)
+        await dispatcher.start()
+        for i in range(3):
+            dispatcher.enqueue(message(i))
+        await dispatcher.join()
+        await dispatcher.check_receipts(older_than=0)
+        await dispatcher.stop()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+
+    assert invalid_tokens == ["ExponentPushToken[2]"]
+    assert stats.failed == 1
+    assert stats.receipts_ok == 2
+    assert stats.pending_receipts == 0
+    assert len(expo.receipt_requests[0]) == 2
+
+
+def test_enqueue_without_a_running_dispatcher_drops_the_message():
+    dispatcher = ExpoPushDispatcher()
+
+    assert not dispatcher.enqueue(message(1))
+    assert dispatcher.stats().dropped == 1
+
+
+def test_enqueue_many_from_another_thread_returns_without_waiting_for_the_loop():
+    expo = MockExpo()
+
+    async def run():
+        dispatcher = expo.dispatcher(concurrency=1, max_queue_size=5)
+        await dispatcher.start()
+        # The loop is blocked on this thread's join, only a hand-off returns
+        worker = threading.Thread(target=lambda: queued.append(dispatcher.enqueue_many([message(i) for i in range(8)])))
+        worker.start()
+        worker.join(timeout=1)
+        # Let the loop run the hand-off before draining
+        await asyncio.sleep(0)
+        await dispatcher.stop()
+        return dispatcher.stats()
+
+    queued: list[int] = []
+    stats = asyncio.run(run())
+
+    assert queued == [8]
+    assert stats.dropped == 3
+    assert stats.sent == 5
+
+
+def test_enqueue_many_waiting_from_another_thread_counts_what_fit_in_the_queue():
+    expo = MockExpo()
+
+    async def run():
+        dispatcher = expo.dispatcher(concurrency=1, max_queue_size=5)
+        await dispatcher.start()
+        queued = await asyncio.to_thread(dispatcher.enqueue_many, [message(i) for i in range(8)], True)
+        await dispatcher.stop()
+        return queued, dispatcher.stats()
+
+    queued, stats = asyncio.run(run())
+
+    assert queued == 5
+    assert stats.dropped == 3
+    assert stats.sent == 5
+    assert [m["to"] for batch in expo.batches for m in batch] == [message(i).to for i in range(5)]
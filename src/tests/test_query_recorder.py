@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from metrics.database import instrument_engine, instrument_repository
+from metrics.query_recorder import QueryBudgetExceeded, QueryRecorderMiddleware, query_budget, record_queries
+
+engine = instrument_engine(create_engine("sqlite://"), "query-recorder-test")
+
+
+@instrument_repository
+class ItemRepository:
+    def get_items(self) -> list[int]:
+        with engine.connect() as connection:
+            return list(connection.execute(text("SELECT 1 UNION SELECT 2")).scalars())
+
+    def get_item(self, item_id: int) -> int:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT :item_id"), {"item_id": item_id}).scalar_one()
+
+
+def items_one_by_one() -> list[int]:
+    repository = ItemRepository()
+    return [repository.get_item(item_id) for item_id in repository.get_items()]
+
+
+def test_record_queries_finds_repeated_statements():
+    with record_queries() as recording:
+        items_one_by_one()
+
+    assert recording.queries() == ["ItemRepository.get_items", "ItemRepository.get_item", "ItemRepository.get_item"]
+    assert recording.repeated(threshold=2) == {"SELECT ?": 2}
+    assert recording.total_time > 0
+
+
+def test_record_queries_with_a_budget_fails_the_statement_over_it():
+    with pytest.raises(QueryBudgetExceeded):
+        with record_queries(budget=2):
+            items_one_by_one()
+
+
+def app(**settings) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(QueryRecorderMiddleware, **settings)
+
+    @app.get("/items")
+    @query_budget(2)
+    def get_items():
+        return items_one_by_one()
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_middleware_logs_requests_with_an_n_plus_one(caplog):
+    with caplog.at_level(logging.WARNING):
+        response = app(repeat_threshold=2).get("/items")
+
+    assert response.json() == [1, 2]
+
+    record = caplog.records[-1]
+    assert "GET /items ran 3 statements" in record.getMessage()
+    assert "over its budget of 2 statements" in record.getMessage()
+    assert "possible N+1" in record.getMessage()
+    assert record.statements == 3  # type: ignore
+    assert record.repeated == {"SELECT ?": 2}  # type: ignore
+
+
+def test_middleware_enforcing_budgets_fails_requests_over_them():
+    assert app(enforce_budgets=True).get("/items").status_code == 500
@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+from service.reference_data import ReferenceDataRegistry
+
+
+class FakeRepository:
+    def __init__(self):
+        self.threads: list[int] = []
+
+    def get_days(self) -> list[dict]:
+        self.threads.append(threading.get_ident())
+        return [{"id": 2, "name": "Martes"}, {"id": 1, "name": "Lunes"}]
+
+    def get_moments(self) -> list[dict]:
+        return [{"id": 1, "name": "Desayuno"}]
+
+
+def test_ensure_loaded_reloads_off_the_event_loop():
+    repository = FakeRepository()
+    registry = ReferenceDataRegistry(repository, ttl=0.01)  # type: ignore
+
+    async def resolve() -> tuple[int, list[str]]:
+        await registry.ensure_loaded()
+        await asyncio.sleep(0.02)
+        await registry.ensure_loaded()
+        return threading.get_ident(), [day["name"] for day in registry.get_days()]
+
+    loop_thread, days = asyncio.run(resolve())
+
+    assert days == ["Lunes", "Martes"]
+    assert len(repository.threads) == 2
+    assert loop_thread not in repository.threads
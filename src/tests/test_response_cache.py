@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from time import sleep
+
+from fastapi import APIRouter, FastAPI, Query
+from fastapi.testclient import TestClient
+
+from cache.backend import InMemoryCacheBackend
+from cache.lru import LRUCache
+from cache.response_cache import ResponseCache, cached_response
+from models.response import CustomResponse
+
+
+def test_lru_evicts_least_recently_used():
+    cache: LRUCache[int] = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats().evictions == 1
+
+
+def test_lru_expires_entries_and_invalidates_by_tag():
+    cache: LRUCache[int] = LRUCache(max_size=10, ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("plan", 2, tags=["plan:1"])
+    cache.set("other", 3, tags=["plan:2"])
+    sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.invalidate_tags(["plan:1"]) == 1
+    assert cache.get("plan") is None
+    assert cache.get("other") == 3
+
+    stats = cache.stats()
+    assert stats.expirations == 1
+    assert stats.invalidations == 1
+
+
+def test_response_cache_fills_local_tier_from_shared_tier():
+    shared = InMemoryCacheBackend()
+    writer = ResponseCache(LRUCache(max_size=10), shared)
+    reader = ResponseCache(LRUCache(max_size=10), shared)
+
+    writer.set("key", b"{}", tags=["plans"])
+
+    assert reader.get("key", ["plans"]) == b"{}"
+    assert reader.local.get("key") == b"{}"
+    assert reader.stats().shared_hits == 1
+
+    writer.invalidate("plans")
+
+    assert shared.get("key") is None
+    assert writer.get("key") is None
+
+
+def test_cached_response_serves_hits_until_invalidated():
+    cache = ResponseCache(LRUCache(max_size=10))
+    calls = []
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    @cached_response(tags=lambda item_id, q: [f"item:{item_id}"], cache=cache)
+    async def get_item(item_id: int, q: str = Query("x")) -> CustomResponse[dict]:
+        calls.append(item_id)
+        return CustomResponse(data={"id": item_id, "q": q})
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    first = client.get("/items/1")
+    second = client.get("/items/1")
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == {"data": {"id": 1, "q": "x"}}
+    assert calls == [1]
+
+    cache.invalidate("item:1")
+    client.get("/items/1")
+
+    assert calls == [1, 1]
+
+
+def test_invalidate_async_reaches_the_shared_tier_off_the_event_loop():
+    class ThreadRecordingBackend(InMemoryCacheBackend):
+        def invalidate_tags(self, tags):
+            self.thread = threading.get_ident()
+            super().invalidate_tags(tags)
+
+    shared = ThreadRecordingBackend()
+    cache = ResponseCache(shared=shared)
+    cache.set("plan", b"{}", tags=["plan:1"])
+
+    async def invalidate() -> int:
+        await cache.invalidate_async("plan:1")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(invalidate())
+
+    assert shared.thread != loop_thread
+    assert cache.get("plan") is None
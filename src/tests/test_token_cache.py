@@ -0,0 +1,35 @@
+from time import sleep, time
+
+from cache.token_cache import VerifiedTokenCache
+
+
+def test_token_cache_returns_a_copy_of_the_payload():
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("token", {"userId": 1, "exp": time() + 60})
+
+    payload = cache.get("token")
+    assert payload is not None
+    payload["userId"] = 2
+
+    assert cache.get("token")["userId"] == 1  # type: ignore
+    assert cache.get("other") is None
+    assert cache.stats().hit_ratio == 2 / 3
+
+
+def test_token_cache_never_outlives_the_token_exp():
+    cache = VerifiedTokenCache(max_size=10, ttl=60)
+    cache.put("expired", {"exp": time() - 1})
+    cache.put("expiring", {"exp": time() + 0.01})
+    sleep(0.02)
+
+    assert cache.get("expired") is None
+    assert cache.get("expiring") is None
+    assert cache.stats().expirations == 1
+
+
+def test_token_cache_with_no_size_is_disabled():
+    cache = VerifiedTokenCache(max_size=0)
+    cache.put("token", {"userId": 1})
+
+    assert cache.get("token") is None
+    assert cache.stats().size == 0
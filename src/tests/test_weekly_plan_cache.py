@@ -0,0 +1,86 @@
+from datetime import datetime
+from time import sleep
+from types import SimpleNamespace
+
+from models.foodPlans import WeeklyPlan
+from service.weekly_plan_cache import WeeklyPlanCache, food_slot
+
+
+def weekly_plan(plan_id: int) -> WeeklyPlan:
+    return WeeklyPlan(
+        id_plan=plan_id,
+        title=f"Plan {plan_id}",
+        plan_description="Plan de prueba",
+        objetive="Mantener",
+        created_at=datetime(2024, 1, 1),
+        weekly_plan={
+            "Lunes": {"Desayuno": None, "Almuerzo": None},
+            "Martes": {"Desayuno": None, "Almuerzo": None}
+        }
+    )
+
+
+def food(food_id: int) -> dict:
+    return food_slot(SimpleNamespace(
+        id=food_id, name=f"Food {food_id}", description=None, price=2, created_at=datetime(2024, 1, 1)))
+
+
+def test_set_slot_patches_the_cached_plan():
+    cache = WeeklyPlanCache()
+    cache.put(weekly_plan(1))
+
+    patched = cache.set_slot(1, "Martes", "Almuerzo", food(7))
+
+    assert patched is not None
+    assert patched.weekly_plan["Martes"]["Almuerzo"]["id"] == 7  # type: ignore
+    assert cache.get(1).weekly_plan["Martes"]["Almuerzo"]["price"] == 2.0  # type: ignore
+
+    assert cache.set_slot(1, "Martes", "Almuerzo", None) is patched
+    assert cache.get(1).weekly_plan["Martes"]["Almuerzo"] is None  # type: ignore
+
+    # Plans that are not cached are left for the caller to load
+    assert cache.set_slot(2, "Lunes", "Desayuno", food(7)) is None
+    assert cache.get(2) is None
+
+
+def test_set_slot_on_an_unknown_day_or_moment_evicts_the_plan():
+    cache = WeeklyPlanCache()
+    cache.put(weekly_plan(1))
+    cache.put(weekly_plan(2))
+
+    assert cache.set_slot(1, "Domingo", "Desayuno", food(7)) is None
+    assert cache.get(1) is None
+
+    assert cache.set_slot(2, "Lunes", "Merienda", food(7)) is None
+    assert cache.get(2) is None
+
+
+def test_plans_expire_after_the_ttl_and_the_oldest_is_evicted_first():
+    cache = WeeklyPlanCache(max_size=2, ttl=0.05)
+    cache.put(weekly_plan(1))
+    cache.put(weekly_plan(2))
+    cache.get(1)
+    cache.put(weekly_plan(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+
+    sleep(0.06)
+
+    assert cache.get(1) is None
+    assert cache.set_slot(3, "Lunes", "Desayuno", food(7)) is None
+
+
+def test_versioned_reads_only_get_a_plan_of_their_version():
+    cache = WeeklyPlanCache()
+    cache.put(weekly_plan(1), version="v1")
+
+    assert cache.get(1, "v1") is not None
+    assert cache.get(1) is not None
+    # Changed by another process since it was cached
+    assert cache.get(1, "v2") is None
+
+    # A patched plan is no longer the plan of any version
+    cache.set_slot(1, "Lunes", "Desayuno", food(7))
+    assert cache.get(1, "v1") is None
+    assert cache.get(1) is not None
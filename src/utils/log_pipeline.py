@@ -0,0 +1,205 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from os import getenv
+from typing import Optional
+
+from models.health import LogPipelineStats
+
+# Attributes every LogRecord has, anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line with the time, level, logger and message of the
+    record, the fields passed with extra= and the traceback, if any
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def __init__(self, queue_: queue.Queue, pipeline: "LogPipeline"):
+        super().__init__(queue_)
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments here, the traceback is formatted by the
+        # listener so the caller does not read source files either
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline._dropped += 1
+
+
+class _CountingQueueListener(QueueListener):
+    def __init__(self, queue_: queue.Queue, *handlers: logging.Handler, pipeline: "LogPipeline"):
+        super().__init__(queue_, *handlers, respect_handler_level=True)
+        self.pipeline = pipeline
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self.pipeline._written += 1
+
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full when stopping during an error storm, wait for
+        # the writer to make room instead of failing with queue.Full
+        self.queue.put(self._sentinel, timeout=self.pipeline.stop_timeout)
+
+
+class LogPipeline:
+    """
+    Logging that never waits on disk in the caller.
+
+    Records go to a bounded in-memory queue and a background thread writes
+    them as JSON lines to a size-rotated file. When the queue is full, e.g.
+    during an error storm, new records are dropped and counted instead of
+    slowing down the requests that log them.
+    """
+
+    def __init__(
+        self,
+        filename: str = "logs.log",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        queue_size: int = 10_000,
+        level: int = logging.INFO,
+        handlers: Optional[list[logging.Handler]] = None,
+        stop_timeout: float = 5.0
+    ):
+        """
+        Args:
+            handlers: Where the listener writes the records, a rotating
+                JSON file at filename by default
+            stop_timeout: Seconds stop waits for room in a full queue, the
+                records still queued after that are dropped
+        """
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.level = level
+        self.handlers = handlers
+        self.stop_timeout = stop_timeout
+
+        self._queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=queue_size)
+        self._handler = _DroppingQueueHandler(self._queue, self)
+        self._listener: Optional[_CountingQueueListener] = None
+        self._logger: Optional[logging.Logger] = None
+
+        self._dropped = 0
+        self._written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None
+
+    def _default_handlers(self) -> list[logging.Handler]:
+        handler = RotatingFileHandler(
+            self.filename,
+            maxBytes=self.max_bytes,
+            backupCount=self.backup_count,
+            encoding="utf-8",
+            delay=True
+        )
+        handler.setFormatter(JSONFormatter())
+        return [handler]
+
+    def install(self, logger: Optional[logging.Logger] = None) -> None:
+        """
+        Route the records of logger (the root logger by default) through the
+        queue and start the writer thread, which is stopped at exit
+        """
+        if self.running:
+            return
+
+        if self.handlers is None:
+            self.handlers = self._default_handlers()
+
+        self._logger = logger or logging.getLogger()
+        self._logger.setLevel(self.level)
+        self._logger.addHandler(self._handler)
+
+        self._listener = _CountingQueueListener(self._queue, *self.handlers, pipeline=self)
+        self._listener.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """
+        Write what is still queued and stop the writer thread
+        """
+        if self._listener is None:
+            return
+
+        if self._logger is not None:
+            self._logger.removeHandler(self._handler)
+            self._logger = None
+
+        try:
+            self._listener.stop()
+        except queue.Full:
+            # The writer is stuck, drop what is left so the sentinel fits
+            self._discard_queued()
+            self._listener.stop()
+        self._listener = None
+
+        for handler in self.handlers or []:
+            handler.close()
+
+        atexit.unregister(self.stop)
+
+    def _discard_queued(self) -> None:
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._dropped += 1
+
+    def stats(self) -> LogPipelineStats:
+        return LogPipelineStats(
+            queued=self._queue.qsize(),
+            queue_size=self.queue_size,
+            written=self._written,
+            dropped=self._dropped,
+            running=self.running
+        )
+
+
+log_pipeline = LogPipeline(
+    filename=getenv("LOG_FILE", "logs.log"),
+    max_bytes=int(getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    backup_count=int(getenv("LOG_BACKUP_COUNT", "5")),
+    queue_size=int(getenv("LOG_QUEUE_SIZE", "10000"))
+)
@@ -0,0 +1,410 @@
+import asyncio
+import concurrent.futures
+import logging
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from os import getenv
+from time import monotonic
+from typing import Any, Callable, NamedTuple, Optional
+
+import httpx
+
+EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+EXPO_RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
+
+# Limits of the Expo push API per request
+EXPO_PUSH_BATCH_SIZE = 100
+EXPO_RECEIPTS_BATCH_SIZE = 1000
+
+# Expo error that means the token will never work again
+DEVICE_NOT_REGISTERED = "DeviceNotRegistered"
+
+
+@dataclass
+class PushMessage:
+    to: str
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+    sound: str = "default"
+
+    def to_json(self) -> dict:
+        return {
+            "to": self.to,
+            "sound": self.sound,
+            "title": self.title,
+            "body": self.body,
+            "data": self.data
+        }
+
+
+class PushDispatcherStats(NamedTuple):
+    queued: int
+    sent: int
+    failed: int
+    dropped: int
+    batches: int
+    retries: int
+    pending_receipts: int
+    receipts_ok: int
+    receipts_failed: int
+
+
+class _RetryableError(Exception):
+    pass
+
+
+class ExpoPushDispatcher:
+    """
+    Background sender of Expo push notifications.
+
+    Callers enqueue messages and return immediately. Workers drain the queue
+    in batches of up to 100 messages per request over a pooled HTTP client,
+    retrying transport errors, 429 and 5xx with exponential backoff. Ticket
+    ids are kept to check their receipts later, as Expo asks, and tokens
+    Expo reports as no longer registered are handed to on_invalid_token.
+    """
+
+    def __init__(
+        self,
+        push_url: str = EXPO_PUSH_URL,
+        receipts_url: str = EXPO_RECEIPTS_URL,
+        access_token: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        batch_size: int = EXPO_PUSH_BATCH_SIZE,
+        concurrency: int = 4,
+        max_queue_size: int = 100_000,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        linger: float = 0.05,
+        receipt_delay: float = 15 * 60,
+        max_pending_receipts: int = 100_000,
+        enqueue_timeout: float = 10.0,
+        on_invalid_token: Optional[Callable[[str], Any]] = None
+    ):
+        """
+        Args:
+            linger: Seconds a worker waits for a batch to fill up once it
+                has a first message
+            receipt_delay: Seconds after which the receipt of a ticket is
+                checked, Expo recommends about 15 minutes
+            enqueue_timeout: Seconds enqueue_many(wait=True) waits for the
+                event loop when called from another thread
+            on_invalid_token: Called with every push token Expo reports as
+                DeviceNotRegistered
+        """
+        self.push_url = push_url
+        self.receipts_url = receipts_url
+        self.access_token = access_token
+        self.batch_size = min(batch_size, EXPO_PUSH_BATCH_SIZE)
+        self.concurrency = concurrency
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.linger = linger
+        self.receipt_delay = receipt_delay
+        self.max_pending_receipts = max_pending_receipts
+        self.enqueue_timeout = enqueue_timeout
+        self.on_invalid_token = on_invalid_token
+
+        self._client = client
+        self._owns_client = client is None
+        self._queue: Optional[asyncio.Queue[PushMessage]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: list[asyncio.Task] = []
+        self._receipts_task: Optional[asyncio.Task] = None
+        # ticket id -> (push token, when it was sent), oldest first
+        self._pending_receipts: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._sent = 0
+        self._failed = 0
+        self._dropped = 0
+        self._batches = 0
+        self._retries = 0
+        self._receipts_ok = 0
+        self._receipts_failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=self.concurrency,
+                                    max_keepalive_connections=self.concurrency)
+            )
+
+        self._workers = [asyncio.create_task(self._worker())
+                         for _ in range(self.concurrency)]
+        self._receipts_task = asyncio.create_task(self._receipts_loop())
+
+    async def stop(self, drain: bool = True) -> None:
+        """
+        Stop the workers, sending what is still queued first when drain is
+        True
+        """
+        if not self.running:
+            return
+
+        if drain:
+            await self.join()
+
+        for task in [*self._workers, self._receipts_task]:
+            task.cancel()  # type: ignore
+        await asyncio.gather(*self._workers, self._receipts_task, return_exceptions=True)
+        self._workers = []
+        self._receipts_task = None
+
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def join(self) -> None:
+        """
+        Wait until every queued message has been sent or given up on
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    def enqueue(self, message: PushMessage) -> bool:
+        """
+        Queue a message without blocking, safe to call from any thread.
+
+        Returns:
+            bool: False when the dispatcher is not running or the queue is
+                full, the message is dropped
+        """
+        return self.enqueue_many([message]) == 1
+
+    def enqueue_many(self, messages: list[PushMessage], wait: bool = False) -> int:
+        """
+        Queue several messages with a single hand-off to the event loop,
+        safe to call from any thread. From another thread it returns
+        immediately unless wait is True, then it waits, up to enqueue_timeout
+        seconds, for the loop to queue them and counts what fit.
+
+        Returns:
+            int: Number of messages queued, the first ones of the list. The
+                rest did not fit in the queue and were dropped. From another
+                thread without wait every message is counted, those that do
+                not fit in the queue are dropped later.
+        """
+        if not self.running or self._loop is None:
+            logging.warning(f"Push dispatcher is not running, {len(messages)} notifications dropped")
+            self._dropped += len(messages)
+            return 0
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            return self._put_many(messages)
+
+        if not wait:
+            self._loop.call_soon_threadsafe(self._put_many, messages)
+            return len(messages)
+
+        future = asyncio.run_coroutine_threadsafe(self._put_many_async(messages), self._loop)
+        try:
+            return future.result(timeout=self.enqueue_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logging.warning(f"Push dispatcher did not answer, {len(messages)} notifications may be dropped")
+            return 0
+
+    async def _put_many_async(self, messages: list[PushMessage]) -> int:
+        return self._put_many(messages)
+
+    def _put_many(self, messages: list[PushMessage]) -> int:
+        queue: asyncio.Queue[PushMessage] = self._queue  # type: ignore
+
+        for queued, message in enumerate(messages):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                dropped = len(messages) - queued
+                logging.warning(f"Push notification queue is full, {dropped} notifications dropped")
+                self._dropped += dropped
+                return queued
+
+        return len(messages)
+
+    async def _next_batch(self) -> list[PushMessage]:
+        queue: asyncio.Queue[PushMessage] = self._queue  # type: ignore
+        batch = [await queue.get()]
+        deadline = monotonic() + self.linger
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _worker(self) -> None:
+        queue: asyncio.Queue[PushMessage] = self._queue  # type: ignore
+
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.send_batch(batch)
+            except Exception:
+                logging.exception("Push notification batch failed")
+                self._failed += len(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _post(self, url: str, payload: Any) -> dict:
+        headers = {"Accept": "application/json"}
+        if self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.post(url, json=payload, headers=headers)  # type: ignore
+
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise _RetryableError(f"Expo answered {response.status_code}")
+
+                response.raise_for_status()
+                return response.json()
+
+            except (httpx.TransportError, _RetryableError) as e:
+                if attempt == self.max_retries:
+                    raise
+
+                self._retries += 1
+                # Full jitter, so retrying workers do not hit Expo in step
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                logging.warning(f"Expo request failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        raise AssertionError("unreachable")
+
+    async def send_batch(self, messages: list[PushMessage]) -> None:
+        """
+        Send up to 100 messages in one request and record their tickets
+        """
+        body = await self._post(self.push_url, [message.to_json() for message in messages])
+        self._batches += 1
+
+        tickets = body.get("data", [])
+        now = monotonic()
+
+        for message, ticket in zip(messages, tickets):
+            if ticket.get("status") == "ok":
+                self._sent += 1
+                if ticket.get("id"):
+                    self._track_receipt(ticket["id"], message.to, now)
+                continue
+
+            self._failed += 1
+            self._handle_error(message.to, ticket)
+
+        # Expo answers one ticket per message, anything else is a failure
+        if len(tickets) < len(messages):
+            self._failed += len(messages) - len(tickets)
+
+    def _track_receipt(self, ticket_id: str, token: str, sent_at: float) -> None:
+        with self._lock:
+            self._pending_receipts[ticket_id] = (token, sent_at)
+            while len(self._pending_receipts) > self.max_pending_receipts:
+                self._pending_receipts.popitem(last=False)
+
+    def _handle_error(self, token: str, ticket_or_receipt: dict) -> None:
+        error = (ticket_or_receipt.get("details") or {}).get("error")
+        logging.warning(
+            f"Push notification to {token} failed: {ticket_or_receipt.get('message')} ({error})")
+
+        if error == DEVICE_NOT_REGISTERED and self.on_invalid_token is not None:
+            try:
+                self.on_invalid_token(token)
+            except Exception:
+                logging.exception("on_invalid_token failed")
+
+    async def check_receipts(self, older_than: Optional[float] = None) -> None:
+        """
+        Fetch the receipts of the tickets sent more than older_than seconds
+        ago (receipt_delay by default) and forget them
+        """
+        cutoff = monotonic() - (self.receipt_delay if older_than is None else older_than)
+
+        with self._lock:
+            due = [(ticket_id, token) for ticket_id, (token, sent_at) in self._pending_receipts.items()
+                   if sent_at <= cutoff]
+            for ticket_id, _ in due:
+                del self._pending_receipts[ticket_id]
+
+        for start in range(0, len(due), EXPO_RECEIPTS_BATCH_SIZE):
+            chunk = dict(due[start:start + EXPO_RECEIPTS_BATCH_SIZE])
+            try:
+                body = await self._post(self.receipts_url, {"ids": list(chunk)})
+            except Exception:
+                logging.exception("Fetching push receipts failed")
+                continue
+
+            for ticket_id, receipt in body.get("data", {}).items():
+                token = chunk.get(ticket_id)
+                if token is None:
+                    continue
+
+                if receipt.get("status") == "ok":
+                    self._receipts_ok += 1
+                else:
+                    self._receipts_failed += 1
+                    self._handle_error(token, receipt)
+
+    async def _receipts_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.receipt_delay, 60.0))
+            try:
+                await self.check_receipts()
+            except Exception:
+                logging.exception("Push receipts check failed")
+
+    def stats(self) -> PushDispatcherStats:
+        with self._lock:
+            pending = len(self._pending_receipts)
+
+        return PushDispatcherStats(
+            queued=self._queue.qsize() if self._queue is not None else 0,
+            sent=self._sent,
+            failed=self._failed,
+            dropped=self._dropped,
+            batches=self._batches,
+            retries=self._retries,
+            pending_receipts=pending,
+            receipts_ok=self._receipts_ok,
+            receipts_failed=self._receipts_failed
+        )
+
+
+push_dispatcher = ExpoPushDispatcher(
+    access_token=getenv("EXPO_ACCESS_TOKEN"),
+    concurrency=int(getenv("PUSH_DISPATCHER_CONCURRENCY", "4"))
+)
@@ -1,25 +1,30 @@
-import requests
-import logging
+from utils.push_dispatcher import PushMessage, push_dispatcher
 
 
-def send_push_notification(expoPushToken: str, title: str, body: str, data: dict = {}, sound: str = 'default') -> None:
-    message: dict = {
-        "to": expoPushToken,
-        "sound": sound,
-        "title": title,
-        "body": body,
-        "data": data
-    }
+def send_push_notification(expoPushToken: str, title: str, body: str, data: dict = {}, sound: str = 'default') -> bool:
+    """
+    Queue a push notification on the background dispatcher and return
+    immediately, it is sent in a batch with other queued notifications
 
-    headers: dict = {
-        "host": "exp.host",
-        "Accept": "application/json",
-        'Accept-encoding': 'gzip, deflate',
-        'Content-Type': 'application/json'
-    }
+    Returns:
+        bool: False when the notification could not be queued
+    """
+    return push_dispatcher.enqueue(PushMessage(
+        to=expoPushToken,
+        title=title,
+        body=body,
+        data=dict(data),
+        sound=sound
+    ))
 
-    r = requests.post('https://exp.host/--/api/v2/push/send',
-                      json=message, headers=headers)
 
-    if r.ok:
-        logging.debug("notification sent to, ", expoPushToken)
+def send_push_notifications(messages: list[PushMessage], wait: bool = False) -> int:
+    """
+    Queue many push notifications at once, for bulk senders. With wait the
+    caller blocks until the dispatcher has queued them, so the count is
+    exact, see ExpoPushDispatcher.enqueue_many
+
+    Returns:
+        int: Number of notifications queued
+    """
+    return push_dispatcher.enqueue_many(messages, wait)